@@ -0,0 +1,93 @@
+# Loading dependencies
+import os
+
+import pandas as pd
+
+
+class ChunkReader:
+
+    def __init__(self, source, chunk_size=100_000, single_pass=False):
+        """Read a dataset as a sequence of pandas DataFrame chunks.
+
+        The chunked resamplers read their source several times, so the
+        source must be re-readable, unless single_pass is set.
+
+        Args:
+            source: Path to a .csv or .parquet file, a list/tuple of
+                DataFrames, or a callable returning a fresh iterator of
+                DataFrames on every call. With single_pass, any iterable
+                of DataFrames.
+            chunk_size: Number of rows per chunk when reading files.
+            single_pass: Whether the source is read only once.
+        """
+        if isinstance(source, (str, os.PathLike)):
+            extension = os.path.splitext(os.fspath(source))[1].lower()
+            if extension not in ('.csv', '.parquet', '.pq'):
+                raise ValueError("Only .csv and .parquet files can be read in chunks.")
+
+        elif isinstance(source, pd.DataFrame):
+            source = [source]
+
+        elif callable(source) or isinstance(source, (list, tuple)):
+            pass
+
+        elif single_pass:
+            source = _OneShot(source)
+
+        else:
+            raise TypeError("The source must be a file path, a list of dataframes "\
+                                "or a callable returning an iterator of dataframes. "\
+                                "One-shot iterators cannot be read more than once.")
+
+        if not isinstance(chunk_size, int) or chunk_size < 1:
+            raise ValueError("The chunk_size must be a positive integer")
+
+        self.source = source
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+
+        if isinstance(self.source, _OneShot):
+            chunks = self.source.consume()
+        elif callable(self.source):
+            chunks = self.source()
+        elif isinstance(self.source, (list, tuple)):
+            chunks = iter(self.source)
+        elif os.fspath(self.source).lower().endswith('.csv'):
+            chunks = pd.read_csv(self.source, chunksize = self.chunk_size)
+        else:
+            chunks = self._read_parquet(self.source, self.chunk_size)
+
+        for chunk in chunks:
+            if not isinstance(chunk, pd.DataFrame):
+                raise TypeError("Every chunk must be a pandas dataframe.")
+            if len(chunk):
+                yield chunk
+
+    # Reading a parquet file batch by batch
+    @staticmethod
+    def _read_parquet(path, chunk_size):
+
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Reading parquet files in chunks requires pyarrow.") from e
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size = chunk_size):
+            yield batch.to_pandas()
+
+
+class _OneShot:
+
+    def __init__(self, iterable):
+        """Wrap an iterable that may only be read once."""
+        if not hasattr(iterable, '__iter__'):
+            raise TypeError("The source must be an iterable of dataframes.")
+        self.iterable = iterable
+        self.consumed = False
+
+    def consume(self):
+        if self.consumed:
+            raise ValueError("The source has already been read.")
+        self.consumed = True
+        return iter(self.iterable)
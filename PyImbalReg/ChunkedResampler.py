@@ -0,0 +1,575 @@
+# Loading dependencies
+import numpy as np
+import pandas as pd
+
+from .ChunkReader import ChunkReader
+from .DataHandler import DataHandler
+from .GN import GaussianNoise
+from .ResampleResult import ResampleResult
+from .relevance import default_relevance, evaluate_relevance
+
+
+class ChunkedResampler:
+
+    methods = ('RO', 'RU', 'GN', 'GNHF')
+
+    def __init__(self, **params):
+        """Resample a dataset that does not fit in memory, chunk by chunk.
+
+        fit() reads the source a few times, keeping only O(bins) state:
+        the target statistics, the rare/normal bin boundaries (or the
+        histogram edges for GNHF) and per-bin column statistics. get()
+        then reads it once more and yields the resampled output one chunk
+        at a time, so peak memory depends on chunk_size, not on the size
+        of the dataset.
+
+        The bins are the same as for the in-memory resamplers. Per-bin
+        sample sizes are the same too; the rows are spread over the chunks
+        with sequential hypergeometric (without replacement) and binomial
+        (with replacement) draws.
+
+        Args:
+            source: A .csv or .parquet path, a list of DataFrames, or a
+                callable returning a fresh iterator of DataFrames.
+            method: 'RO', 'RU', 'GN' or 'GNHF'.
+            y_col_name: The name of the Y column header.
+            rel_func: The relevance function, 'default' by default.
+                Not used by GNHF.
+            threshold: Threshold to determine the normal and rare samples.
+            o_percentage: Oversampling factor for rare samples.
+            u_percentage: Fraction of normal samples removed.
+            perm_amp: Permutation amplitude for the added noise.
+            categorical_columns: Columns treated as categorical.
+            bins: Number of bins for the GNHF target histogram.
+            chunk_size: Number of rows per chunk when reading files.
+            random_state: None, an int or a np.random.SeedSequence.
+            index_labels: 'provenance' (default) for an (origin,
+                source_position) MultiIndex, where source_position counts
+                the rows of the whole source, or 'string' for the labels of
+                the chunks and "OverSampled-{i}-{label}" style labels.
+        """
+        source = params.pop("source", None)
+        method = params.pop("method", "RO")
+        y_col_name = params.pop("y_col_name", None)
+        rel_func = params.pop("rel_func", "default")
+        threshold = params.pop("threshold", 0.9)
+        o_percentage = params.pop("o_percentage", 2)
+        u_percentage = params.pop("u_percentage", 0.2)
+        perm_amp = params.pop("perm_amp", 0.1)
+        categorical_columns = params.pop("categorical_columns", None)
+        bins = params.pop("bins", 10)
+        chunk_size = params.pop("chunk_size", 100_000)
+        random_state = params.pop("random_state", None)
+        index_labels = params.pop("index_labels", "provenance")
+
+        if method not in self.methods:
+            raise ValueError(f"The method must be one of {self.methods}")
+        self.method = method
+
+        self.reader = ChunkReader(source, chunk_size)
+
+        if y_col_name is not None and not isinstance(y_col_name, str):
+            raise TypeError("y must be either None or a string")
+        self.y_col_name = y_col_name
+
+        if not (rel_func == 'default' or rel_func is None or callable(rel_func)):
+            raise TypeError("The rel_func is expected to be a function, but it's not")
+        self.rel_func = rel_func
+
+        self.threshold = DataHandler._is_threshold_correct(threshold)
+        self.o_percentage = DataHandler._is_o_percentage_correct(o_percentage)
+        self.u_percentage = DataHandler._is_u_percentage_correct(u_percentage)
+        self.perm_amp = DataHandler._is_perm_amp_correct(perm_amp)
+        self.bins = DataHandler._is_bins_correct(bins)
+        self.categorical_columns = categorical_columns
+        self.index_labels = DataHandler._is_index_labels_correct(index_labels)
+
+        self.random_state = random_state
+        if not isinstance(random_state, np.random.SeedSequence):
+            random_state = np.random.SeedSequence(random_state)
+        self.seed_sequence = random_state
+
+        self.is_fitted = False
+
+    def fit(self):
+        """Gather the target statistics, the bins and the per-bin statistics."""
+        self._fit_target()
+
+        if self.method == 'GNHF':
+            self._fit_histogram()
+        else:
+            self._fit_relevance_bins()
+
+        self.is_fitted = True
+        return self
+
+    def get(self):
+        """Yield the resampled data as a sequence of DataFrames."""
+        if not self.is_fitted:
+            self.fit()
+
+        rng = np.random.default_rng(self.seed_sequence.spawn(1)[0])
+        keep_all, keep, draws = self._get_bin_targets()
+
+        # What is still to be seen, kept and drawn in each bin
+        remaining = self.bin_counts.copy()
+        keep_remaining = keep.copy()
+        draws_remaining = draws.copy()
+        n_synthetic = 0
+        offset = 0
+        provenance = self.index_labels == 'provenance'
+        synthetic_kind = ResampleResult.OVERSAMPLED if self.method == 'RO' else ResampleResult.NOISY
+
+        for chunk in self.reader:
+            y, values, codes = self._prepare(chunk)
+            ids = self._assign_bins(y)
+            counts = np.bincount(ids, minlength = self.n_bins)
+
+            # Rows of bins that are undersampled: hypergeometric share of what is left
+            selected = np.where(keep_all, counts, 0)
+            sel = ~keep_all & (counts > 0)
+            selected[sel] = rng.hypergeometric(counts[sel], remaining[sel] - counts[sel],
+                                               keep_remaining[sel])
+
+            # Random rows within each bin, up to the selected number
+            order = np.lexsort((rng.random(len(ids)), ids))
+            starts = np.cumsum(counts) - counts
+            rank = np.arange(len(ids)) - starts[ids[order]]
+            kept_rows = np.sort(order[rank < selected[ids[order]]])
+
+            # Draws with replacement: binomial share of the draws that are left
+            drawn = np.zeros(self.n_bins, dtype = np.int64)
+            with_draws = (draws_remaining > 0) & (counts > 0)
+            drawn[with_draws] = rng.binomial(draws_remaining[with_draws],
+                                             counts[with_draws] / remaining[with_draws])
+
+            labels = np.repeat(np.arange(self.n_bins), drawn)
+            offsets = (rng.random(len(labels)) * counts[labels]).astype(np.int64)
+            grouped_rows = np.argsort(ids, kind = 'stable')
+            source_rows = grouped_rows[starts[labels] + offsets]
+
+            remaining -= counts
+            keep_remaining -= np.where(keep_all, 0, selected)
+            draws_remaining -= drawn
+
+            out = [self._reorder(chunk.take(kept_rows))]
+            if len(labels):
+                new_df = self._get_synthetic(chunk, values, source_rows, labels,
+                                             n_synthetic, rng)
+                n_synthetic += len(labels)
+                out.append(new_df)
+
+            out = pd.concat(out, ignore_index = provenance) if len(out) > 1 else out[0]
+            if provenance:
+                kind = np.repeat(np.array([ResampleResult.ORIGINAL, synthetic_kind], dtype = np.int8),
+                                 [len(kept_rows), len(labels)])
+                positions = offset + np.concatenate((kept_rows, source_rows))
+                out.index = ResampleResult.provenance_index(kind, positions, self.n_rows)
+            offset += len(chunk)
+
+            if self.method in ('GN', 'GNHF'):
+                out = self._as_categorical(out)
+
+            yield out
+
+    def to_csv(self, path, **kwargs):
+        """Write the resampled data to a csv file, one chunk at a time."""
+        for i, df in enumerate(self.get()):
+            df.to_csv(path, mode = 'w' if i == 0 else 'a', header = i == 0, **kwargs)
+
+    def to_parquet(self, path):
+        """Write the resampled data to a parquet file, one chunk at a time."""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Writing parquet files requires pyarrow.") from e
+
+        writer = None
+        try:
+            for df in self.get():
+                table = pa.Table.from_pandas(df, preserve_index = False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table.cast(writer.schema))
+        finally:
+            if writer is not None:
+                writer.close()
+
+    # First pass: columns, target statistics and categories
+    def _fit_target(self):
+
+        n, mean, m2 = 0, 0.0, 0.0
+        y_min, y_max = np.inf, -np.inf
+        self.columns = None
+
+        for chunk in self.reader:
+
+            if self.columns is None:
+                self._set_columns(chunk)
+            elif set(chunk.columns) != set(self.columns):
+                raise ValueError("All chunks must have the same columns.")
+
+            # The data must not contain any Nan values
+            if chunk.isnull().values.any():
+                raise ValueError("The dataframe consists NaN values. "\
+                                    "Please consider removing them.")
+
+            y = chunk[self.y_col_name].to_numpy(dtype = np.float64)
+
+            # Merging the mean and the sum of squares of the chunk
+            mean_chunk = y.mean()
+            n, mean, m2 = _merge_moments(n, mean, m2, len(y), mean_chunk,
+                                         np.square(y - mean_chunk).sum())
+
+            y_min, y_max = min(y_min, y.min()), max(y_max, y.max())
+
+            # Categories in order of appearance
+            for col, categories in self.categories.items():
+                new = pd.Index(pd.unique(chunk[col]))
+                self.categories[col] = categories.append(new[~new.isin(categories)])
+
+        if n == 0:
+            raise ValueError("The source does not contain any rows.")
+
+        self.n_rows = n
+        self.n_categories = np.array([len(categories) for categories in self.categories.values()],
+                                     dtype = np.int64)
+        self.y_mean, self.y_std = mean, np.sqrt(m2 / (n - 1)) if n > 1 else np.nan
+        self.y_min, self.y_max = y_min, y_max
+
+        if self.rel_func == 'default' or self.rel_func is None:
+            self.rel_func = default_relevance(self.y_mean, self.y_std)
+
+    # Finding the output column order and the categorical columns from the first chunk
+    def _set_columns(self, chunk):
+
+        if self.y_col_name is None:
+            self.y_col_name = chunk.columns.values[-1]
+        elif self.y_col_name not in chunk.columns.values:
+            raise ValueError("y must be a column name, but it's not")
+
+        self.columns, _ = DataHandler._get_column_order(chunk, self.y_col_name)
+
+        if self.categorical_columns is None:
+            self.categorical_columns = DataHandler.get_categorical_cols(chunk)
+
+        self.categories = {col: pd.Index([]) for col in self.columns
+                            if col in self.categorical_columns}
+        self.numeric_columns = [col for col in self.columns
+                                if col not in self.categorical_columns]
+
+    # Second and third passes: rare/normal bins and their statistics
+    def _fit_relevance_bins(self):
+
+        anchors = np.empty(0)
+        status = np.empty(0, dtype = bool)
+        bounds = np.empty(0)
+
+        for chunk in self.reader:
+            # The relevance only depends on the value, so the unique values are enough
+            values = np.unique(chunk[self.y_col_name].to_numpy(dtype = np.float64))
+            utility = evaluate_relevance(self.rel_func, values)
+
+            if (utility > 1).any() or (utility < 0).any():
+                raise ValueError("It is expected that the relevance function returns\
+                                values between [0, 1]. But it doesn't. Please re-define your relevance function")
+
+            anchors, status, bounds = _merge_runs(anchors, status, bounds, values,
+                                                  utility >= self.threshold)
+
+        # Every row falls in the interval starting at the largest anchor below it
+        self.anchors = anchors
+        self._fit_bin_stats(len(anchors))
+
+        # Dropping empty intervals and merging neighbours of the same status
+        non_empty = np.flatnonzero(self._stats.counts > 0)
+        non_empty_status = status[non_empty]
+        new_bin = np.ones(len(non_empty), dtype = bool)
+        new_bin[1:] = non_empty_status[1:] != non_empty_status[:-1]
+        bin_ids = np.cumsum(new_bin) - 1
+
+        self.interval_to_bin = np.full(len(anchors), -1, dtype = np.int64)
+        self.interval_to_bin[non_empty] = bin_ids
+        self.bin_is_rare = non_empty_status[new_bin]
+        self._set_bin_stats(self._stats.combine(non_empty, bin_ids))
+
+    # Second pass for GNHF: histogram bins and their statistics
+    def _fit_histogram(self):
+
+        self.edges = np.linspace(self.y_min, self.y_max, self.bins + 1)
+        self._fit_bin_stats(self.bins)
+
+        if (self._stats.counts <= 1).any():
+            raise ValueError(
+                "A bin with 1 or 0 samples was found. "
+                "Consider changing the number of bins."
+            )
+
+        self.bin_is_rare = np.zeros(self.bins, dtype = bool)
+        self._set_bin_stats(self._stats)
+
+    # Reading the source once to gather the statistics of every interval
+    def _fit_bin_stats(self, n_intervals):
+
+        self.n_bins = n_intervals
+        self.interval_to_bin = None
+        self._stats = _BinStats(n_intervals, len(self.numeric_columns), self.n_categories)
+
+        for chunk in self.reader:
+            y, values, codes = self._prepare(chunk)
+            self._stats.add(self._assign_bins(y), values, codes)
+
+    def _set_bin_stats(self, stats):
+        self.n_bins = len(stats.counts)
+        self.bin_counts = stats.counts
+        self.bin_std = stats.std()
+        self.bin_category_counts = stats.category_counts
+        del self._stats
+
+    # Splitting a chunk into the target, the numeric block and the categorical codes
+    def _prepare(self, chunk):
+
+        y = chunk[self.y_col_name].to_numpy(dtype = np.float64)
+        values = chunk.loc[:, self.numeric_columns].to_numpy(dtype = np.float64)
+
+        codes = np.empty((len(chunk), len(self.categories)), dtype = np.int64)
+        for j, (col, categories) in enumerate(self.categories.items()):
+            codes[:, j] = pd.Categorical(chunk[col], categories = categories).codes
+
+        return y, values, codes
+
+    # Finding the bin of every target value
+    def _assign_bins(self, y):
+
+        if self.method == 'GNHF':
+            # Same edges and right-closed last bin as np.histogram
+            ids = np.searchsorted(self.edges, y, side = 'right') - 1
+            return np.clip(ids, 0, self.bins - 1)
+
+        ids = np.searchsorted(self.anchors, y, side = 'right') - 1
+        if self.interval_to_bin is None:
+            return ids
+
+        ids = self.interval_to_bin[ids]
+        if (ids < 0).any():
+            raise ValueError("The source changed between the passes over it.")
+        return ids
+
+    # Number of rows to keep (without replacement) and to draw (with replacement) per bin
+    def _get_bin_targets(self):
+
+        counts = self.bin_counts
+        keep_all = np.ones(self.n_bins, dtype = bool)
+        keep = counts.copy()
+        draws = np.zeros(self.n_bins, dtype = np.int64)
+        rare = self.bin_is_rare
+
+        if self.method == 'RO':
+            draws[rare] = np.round((self.o_percentage - 1) * counts[rare])
+
+        elif self.method in ('RU', 'GN'):
+            keep_all[~rare] = False
+            keep[~rare] = np.round((1 - self.u_percentage) * counts[~rare])
+            if self.method == 'GN':
+                draws[rare] = ((self.o_percentage - 1) * counts[rare]).astype(np.int64)
+
+        else:
+            ratio = counts.mean() / counts
+            under = ratio < 1
+            keep_all[under] = False
+            keep[under] = np.round(ratio[under] * counts[under])
+            draws[~under] = ((ratio[~under] - 1) * counts[~under]).astype(np.int64)
+
+        return keep_all, keep.astype(np.int64), draws
+
+    # Building the drawn rows: copies for RO, Gaussian noise for GN and GNHF
+    def _get_synthetic(self, chunk, values, source_rows, labels, n_synthetic, rng):
+
+        if self.method == 'RO':
+            new_df = self._reorder(chunk.take(source_rows))
+            if self.index_labels == 'string':
+                new_df.index = [f"OverSampled-{n_synthetic + i}-{x}"
+                                    for i, x in enumerate(new_df.index)]
+            return new_df
+
+        noise = rng.standard_normal(size = (len(labels), len(self.numeric_columns)))
+        noise *= self.bin_std[labels] * self.perm_amp
+        noise += values[source_rows]
+        new_df = pd.DataFrame(noise, columns = self.numeric_columns)
+
+        # The categories follow the frequencies of the whole bin
+        codes = np.empty((len(labels), len(self.categories)), dtype = np.int64)
+        for b in np.unique(labels):
+            in_bin = labels == b
+            codes[in_bin] = GaussianNoise._sample_from_category_counts(
+                self.bin_category_counts[b], self.n_categories, in_bin.sum(), rng)
+        for j, (col, categories) in enumerate(self.categories.items()):
+            new_df[col] = pd.Categorical.from_codes(codes[:, j], categories = categories)
+
+        new_df = new_df.loc[:, self.columns]
+        if self.index_labels == 'string':
+            new_df.index = [f"GN-{n_synthetic + i}-{x}"
+                                for i, x in enumerate(chunk.index.take(source_rows))]
+        return new_df
+
+    # Putting Y as the last column
+    def _reorder(self, df):
+        if df.columns.tolist() == self.columns:
+            return df
+        return df.loc[:, self.columns]
+
+    # Storing the categorical columns with the categories of the whole source
+    def _as_categorical(self, df):
+        dtypes = {col: pd.CategoricalDtype(categories)
+                    for col, categories in self.categories.items()}
+        return df.astype(dtypes) if dtypes else df
+
+
+class _BinStats:
+
+    def __init__(self, n_bins, n_numeric, n_categories):
+        """Count, mean and sum of squared deviations of every bin, merged chunk by chunk."""
+        self.counts = np.zeros(n_bins, dtype = np.int64)
+        self.means = np.zeros((n_bins, n_numeric))
+        self.m2 = np.zeros((n_bins, n_numeric))
+        self.n_categories = n_categories
+        self.category_counts = np.zeros((n_bins, int(n_categories.sum())), dtype = np.int64)
+
+    def add(self, ids, values, codes):
+
+        n_bins, n_numeric = self.means.shape
+        counts = np.bincount(ids, minlength = n_bins)
+        safe_counts = np.maximum(counts, 1)[:, None]
+
+        means = np.column_stack([np.bincount(ids, weights = values[:, j], minlength = n_bins)
+                                    for j in range(n_numeric)]) / safe_counts \
+                    if n_numeric else np.zeros((n_bins, 0))
+        deviations = np.square(values - means[ids])
+        m2 = np.column_stack([np.bincount(ids, weights = deviations[:, j], minlength = n_bins)
+                                for j in range(n_numeric)]) \
+                if n_numeric else np.zeros((n_bins, 0))
+
+        # Merging with what was gathered so far
+        _, self.means, self.m2 = _merge_moments(self.counts[:, None], self.means, self.m2,
+                                                counts[:, None], means, m2)
+        self.counts = self.counts + counts
+
+        # Category counts of all columns side by side, for every bin
+        width = self.category_counts.shape[1]
+        if width:
+            flat = ids[:, None] * width + codes + \
+                    np.concatenate(([0], np.cumsum(self.n_categories)[:-1]))
+            self.category_counts += np.bincount(
+                flat.ravel(), minlength = n_bins * width).reshape(n_bins, width)
+
+    # Merging the given bins into groups
+    def combine(self, bins, groups):
+
+        n_groups = groups.max() + 1 if len(groups) else 0
+        combined = _BinStats(n_groups, self.means.shape[1], self.n_categories)
+
+        counts = self.counts[bins]
+        combined.counts = np.bincount(groups, weights = counts, minlength = n_groups).astype(np.int64)
+        safe_counts = np.maximum(combined.counts, 1)[:, None]
+
+        for j in range(self.means.shape[1]):
+            means = self.means[bins, j]
+            combined.means[:, j] = np.bincount(groups, weights = counts * means,
+                                               minlength = n_groups) / safe_counts[:, 0]
+            spread = self.m2[bins, j] + counts * np.square(means - combined.means[groups, j])
+            combined.m2[:, j] = np.bincount(groups, weights = spread, minlength = n_groups)
+
+        for j in range(combined.category_counts.shape[1]):
+            combined.category_counts[:, j] = np.bincount(
+                groups, weights = self.category_counts[bins, j], minlength = n_groups)
+
+        return combined
+
+    # Sample std (ddof = 1) of every numeric column in every bin
+    def std(self):
+        with np.errstate(invalid = 'ignore', divide = 'ignore'):
+            return np.sqrt(self.m2 / (self.counts[:, None] - 1))
+
+
+def _merge_moments(n, mean, m2, n_new, mean_new, m2_new):
+    """Merge the count, mean and sum of squared deviations of two parts.
+
+    Ref: Chan et al., Updating Formulae and a Pairwise Algorithm for
+        Computing Sample Variances, 1979.
+
+    The deviations of each part are taken from its own mean, so large
+    offsets do not cancel. Works elementwise on arrays; a part without
+    rows leaves the other one as it is.
+
+    Returns:
+        The count, mean and sum of squared deviations of the union.
+    """
+    total = n + n_new
+    delta = mean_new - mean
+    weight = n_new / np.maximum(total, 1)
+    return total, mean + delta * weight, m2 + m2_new + delta * delta * n * weight
+
+
+def _merge_runs(anchors, status, bounds, values, is_rare):
+    """Merge the rare/normal runs of a chunk into the runs seen so far.
+
+    The runs are kept as sorted anchors: every value belongs to the run
+    starting at the largest anchor below or equal to it, and all values
+    seen in a run have the same status. bounds holds an upper bound of the
+    values seen in each run. When a chunk value falls in a run of the other
+    status, a new run starts at it; if earlier values may lie above it, the
+    old run resumes just after it. Runs that end up empty are dropped once
+    the rows have been counted.
+
+    Args:
+        anchors: Sorted start values of the runs seen so far.
+        status: Whether each run is rare.
+        bounds: Upper bound of the values seen in each run.
+        values: Sorted unique target values of the chunk.
+        is_rare: Whether each value of the chunk is rare.
+
+    Returns:
+        The merged anchors, status and bounds.
+    """
+    k = np.searchsorted(anchors, values, side = 'right') - 1
+    inside = k >= 0
+    k = np.where(inside, k, 0)
+
+    if len(anchors):
+        old_status, old_bound = status[k], bounds[k]
+    else:
+        old_status, old_bound = is_rare.copy(), np.full(len(values), -np.inf)
+
+    mismatch = inside & (is_rare != old_status)
+    resume = mismatch & (old_bound > values)
+
+    # Chunk values come first, then the old anchors, then the resumed runs
+    point_values = np.concatenate((values, anchors, np.nextafter(values[resume], np.inf)))
+    point_status = np.concatenate((is_rare, status, old_status[resume]))
+    point_bounds = np.concatenate((values, bounds, old_bound[resume]))
+    priority = np.repeat([0, 1, 2], [len(values), len(anchors), resume.sum()])
+
+    order = np.lexsort((priority, point_values))
+    point_values, point_status, point_bounds = \
+        point_values[order], point_status[order], point_bounds[order]
+
+    # For equal values, the status of the first one (a seen value if any) is kept
+    first = np.ones(len(point_values), dtype = bool)
+    first[1:] = point_values[1:] != point_values[:-1]
+    head_status = point_status[first][np.cumsum(first) - 1]
+    keep = point_status == head_status
+    point_values, point_status, point_bounds = \
+        point_values[keep], point_status[keep], point_bounds[keep]
+
+    # Consecutive points with the same status form one run
+    starts = np.ones(len(point_values), dtype = bool)
+    starts[1:] = point_status[1:] != point_status[:-1]
+    groups = np.cumsum(starts) - 1
+
+    new_anchors = point_values[starts]
+    new_bounds = np.full(len(new_anchors), -np.inf)
+    np.maximum.at(new_bounds, groups, point_bounds)
+    new_bounds = np.minimum(new_bounds, np.append(new_anchors[1:], np.inf))
+
+    return new_anchors, point_status[starts], new_bounds
@@ -0,0 +1,254 @@
+# Loading dependencies
+import numpy as np
+import pandas as pd
+
+from .ChunkReader import ChunkReader
+from .ChunkedResampler import _merge_moments
+from .DataHandler import DataHandler
+from .ResampleResult import ResampleResult
+from .relevance import default_relevance, evaluate_relevance
+
+
+class ChunkedWERCS:
+
+    def __init__(self, **params):
+        """WERCS over a stream of chunks with weighted reservoir sampling.
+
+        Ref: Branco et al., Neurocomputing 343, pp.76-99, 2019.
+        Ref: Efraimidis and Spirakis, Information Processing Letters 97(5),
+            pp.181-185, 2006.
+
+        The oversampling draw is (o_percentage - 1) * n rows with
+        replacement, weighted by relevance: every output slot is a weighted
+        reservoir of one row. The undersampling draw is (1 - u_percentage)
+        * n rows without replacement, weighted by 1 - relevance, kept with
+        A-Res: the rows with the largest keys log(u) / w. Only rows whose key
+        beats the smallest key in the reservoir are looked at, so memory is
+        O(sample size) on top of one chunk.
+
+        The source is read once when rel_func is a callable and n_rows is
+        given. Otherwise a first pass counts the rows and finds the mean and
+        std of Y for the default relevance, and the source must be
+        re-readable.
+
+        Args:
+            source: A .csv or .parquet path, a list of DataFrames, a callable
+                returning a fresh iterator of DataFrames, or (single pass
+                only) any iterable of DataFrames.
+            y_col_name: The name of the Y column header.
+            rel_func: The relevance function, 'default' by default.
+            o_percentage: Oversampling factor for high-relevance samples.
+            u_percentage: Fraction of (low-relevance) samples removed when
+                undersampling.
+            n_rows: Number of rows of the source, if known.
+            chunk_size: Number of rows per chunk when reading files.
+            random_state: None, an int or a np.random.SeedSequence.
+            index_labels: 'provenance' (default) for an (origin,
+                source_position) MultiIndex, where source_position counts
+                the rows of the whole source, or 'string' for the labels of
+                the chunks and "OverSampled-{i}-{label}" style labels.
+        """
+        source = params.pop("source", None)
+        y_col_name = params.pop("y_col_name", None)
+        rel_func = params.pop("rel_func", "default")
+        o_percentage = params.pop("o_percentage", 2)
+        u_percentage = params.pop("u_percentage", 0.2)
+        n_rows = params.pop("n_rows", None)
+        chunk_size = params.pop("chunk_size", 100_000)
+        random_state = params.pop("random_state", None)
+        index_labels = params.pop("index_labels", "provenance")
+
+        if not (rel_func == 'default' or rel_func is None or callable(rel_func)):
+            raise TypeError("The rel_func is expected to be a function, but it's not")
+        self.rel_func = rel_func
+
+        if n_rows is not None and (not isinstance(n_rows, int) or n_rows < 1):
+            raise ValueError("The n_rows must be a positive integer")
+        self.n_rows = n_rows
+
+        self.single_pass = callable(rel_func) and n_rows is not None
+        self.reader = ChunkReader(source, chunk_size, single_pass = self.single_pass)
+
+        if y_col_name is not None and not isinstance(y_col_name, str):
+            raise TypeError("y must be either None or a string")
+        self.y_col_name = y_col_name
+
+        self.o_percentage = DataHandler._is_o_percentage_correct(o_percentage)
+        self.u_percentage = DataHandler._is_u_percentage_correct(u_percentage)
+        self.index_labels = DataHandler._is_index_labels_correct(index_labels)
+
+        self.random_state = random_state
+        if not isinstance(random_state, np.random.SeedSequence):
+            random_state = np.random.SeedSequence(random_state)
+        self.seed_sequence = random_state
+
+    def get(self):
+        """Yield the original chunks, then the oversampled and undersampled rows."""
+        if not self.single_pass:
+            self._fit_target()
+
+        rng = np.random.default_rng(self.seed_sequence.spawn(1)[0])
+        n_over = round((self.o_percentage - 1) * self.n_rows)
+        n_under = round((1 - self.u_percentage) * self.n_rows)
+
+        over, over_weight = None, 0.0
+        under, under_keys = None, np.empty(0)
+        columns = None
+        offset = 0
+        provenance = self.index_labels == 'provenance'
+
+        for chunk in self.reader:
+
+            if columns is None:
+                if self.y_col_name is None:
+                    self.y_col_name = chunk.columns.values[-1]
+                elif self.y_col_name not in chunk.columns.values:
+                    raise ValueError("y must be a column name, but it's not")
+                columns, _ = DataHandler._get_column_order(chunk, self.y_col_name)
+
+            if chunk.isnull().values.any():
+                raise ValueError("The dataframe consists NaN values. "\
+                                    "Please consider removing them.")
+
+            if offset + len(chunk) > self.n_rows:
+                raise ValueError("The source has more rows than n_rows.")
+
+            chunk = chunk.loc[:, columns]
+            # The reservoirs keep the position of their rows in the source as index
+            if provenance:
+                chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            utility = evaluate_relevance(self.rel_func, chunk[self.y_col_name].values)
+            if (utility > 1).any() or (utility < 0).any():
+                raise ValueError("It is expected that the relevance function returns\
+                                values between [0, 1]. But it doesn't. Please re-define your relevance function")
+
+            over, over_weight = self._update_slots(over, over_weight, chunk, utility,
+                                                   n_over, rng)
+            under, under_keys = self._update_reservoir(under, under_keys, chunk,
+                                                       1 - utility, n_under, rng)
+
+            yield self._label(chunk, ResampleResult.ORIGINAL) if provenance else chunk
+
+        # The draw sizes were taken from n_rows, so a shorter source is an error too
+        if offset < self.n_rows:
+            raise ValueError("The source has fewer rows than n_rows.")
+
+        if over is not None:
+            over = pd.DataFrame(over[0], index = over[1])
+            if provenance:
+                over = self._label(over, ResampleResult.OVERSAMPLED)
+            else:
+                over.index = [f"OverSampled-{i}-{x}" for i, x in enumerate(over.index)]
+            yield over
+
+        if under is not None:
+            if provenance:
+                under = self._label(under, ResampleResult.UNDERSAMPLED)
+            else:
+                under.index = [f"UnderSampled-{i}-{x}" for i, x in enumerate(under.index)]
+            yield under
+
+    # Turning the source positions held in the index into the provenance index
+    def _label(self, df, kind):
+        return df.set_axis(ResampleResult.provenance_index(
+            np.full(len(df), kind, dtype = np.int8), df.index.values, self.n_rows))
+
+    # A pass over the source for the number of rows and the default relevance
+    def _fit_target(self):
+
+        n, mean, m2 = 0, 0.0, 0.0
+        for chunk in self.reader:
+            y_col_name = self.y_col_name if self.y_col_name is not None \
+                            else chunk.columns.values[-1]
+            y = chunk[y_col_name].to_numpy(dtype = np.float64)
+            if len(y) == 0:
+                continue
+
+            # Merging the mean and the sum of squares of the chunk
+            mean_chunk = y.mean()
+            n, mean, m2 = _merge_moments(n, mean, m2, len(y), mean_chunk,
+                                         np.square(y - mean_chunk).sum())
+
+        if n == 0:
+            raise ValueError("The source does not contain any rows.")
+
+        self.n_rows = n
+        if self.rel_func == 'default' or self.rel_func is None:
+            std = np.sqrt(m2 / (n - 1)) if n > 1 else np.nan
+            self.rel_func = default_relevance(mean, std)
+
+    # Weighted sampling with replacement: each slot is a weighted reservoir of one row
+    @staticmethod
+    def _update_slots(slots, seen_weight, chunk, weights, n_slots, rng):
+
+        chunk_weight = weights.sum()
+        if n_slots == 0 or chunk_weight == 0:
+            return slots, seen_weight
+
+        # Every slot takes a row of this chunk with probability chunk_weight / seen_weight
+        seen_weight += chunk_weight
+        replaced = np.flatnonzero(rng.random(n_slots) < chunk_weight / seen_weight) \
+                    if slots is not None else np.arange(n_slots)
+
+        new_rows = chunk.take(rng.choice(len(chunk), size = len(replaced),
+                                         p = weights / chunk_weight))
+
+        # The slots are one array per column and one of labels, filled by the first ...
+        # ... chunk; later chunks only write the replaced slots, in place
+        if slots is None:
+            return ({col: ChunkedWERCS._column_array(new_rows[col], new_rows[col].dtype)
+                        for col in new_rows.columns},
+                    new_rows.index.to_numpy().copy()), seen_weight
+
+        columns, labels = slots
+        for col, array in columns.items():
+            values = new_rows[col]
+            # A column a later chunk widens (e.g. int to float) is widened once
+            if values.dtype != array.dtype:
+                dtype = pd.concat([pd.Series(array[:0]), values.iloc[:0]]).dtype
+                array = columns[col] = ChunkedWERCS._column_array(pd.Series(array), dtype)
+            array[replaced] = values.to_numpy() if isinstance(array, np.ndarray) else values.array
+        labels[replaced] = new_rows.index.to_numpy()
+
+        return slots, seen_weight
+
+    # A writable copy of a column: a NumPy array, or an extension array for other dtypes
+    @staticmethod
+    def _column_array(values, dtype):
+        values = values.astype(dtype)
+        if isinstance(dtype, np.dtype):
+            return values.to_numpy(copy = True)
+        return values.array.copy()
+
+    # A-Res: weighted sampling without replacement, keeping the rows with the largest keys
+    @staticmethod
+    def _update_reservoir(reservoir, keys, chunk, weights, size, rng):
+
+        if size == 0:
+            return reservoir, keys
+
+        with np.errstate(divide = 'ignore'):
+            chunk_keys = np.log(rng.random(len(chunk))) / weights
+
+        # Rows with zero weight are never sampled
+        candidates = np.isfinite(chunk_keys)
+        if len(keys) == size:
+            candidates &= chunk_keys > keys.min()
+        candidates = np.flatnonzero(candidates)
+
+        if len(candidates) == 0:
+            return reservoir, keys
+
+        new_rows = chunk.take(candidates)
+        if reservoir is not None:
+            new_rows = pd.concat([reservoir, new_rows])
+            keys = np.concatenate((keys, chunk_keys[candidates]))
+        else:
+            keys = chunk_keys[candidates]
+
+        if len(keys) > size:
+            top = np.argpartition(keys, len(keys) - size)[len(keys) - size:]
+            new_rows, keys = new_rows.take(top), keys[top]
+
+        return new_rows, keys
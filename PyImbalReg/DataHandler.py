@@ -1,8 +1,14 @@
 # Loading dependencies
 import numpy as np
 import pandas as pd
+import os
 import warnings
-from scipy.stats import norm
+from contextlib import nullcontext
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from .FittedState import FittedState
+from .Profiler import Profiler
+from .containers import get_container, to_pandas
+from .relevance import boxplot_control_points, default_relevance, evaluate_relevance, pchip_relevance
 
 
 class DataHandler:
@@ -14,14 +20,57 @@ class DataHandler:
         Processes include checking for NaN, data types, etc.
 
         Args:
-            df: The data as a pandas DataFrame.
-            y_col_name: The name of the Y column header.
-            rel_func: The relevance function.
+            df: The data as a pandas or polars DataFrame, a pyarrow Table,
+                or a 2-D or structured NumPy array. The columns of non-pandas
+                inputs are used without copying, and get() returns the same
+                container type. y_col_name is the column index for 2-D arrays.
+                A scipy.sparse matrix is taken as the features, with the
+                target in y; it is never densified and get() returns a
+                (CSR matrix, target array) pair.
+            y: The target vector of a sparse df.
+            y_col_name: The name of the Y column header, or of the target of
+                a sparse df ('y' by default).
+            rel_func: The relevance function. Functions decorated with
+                vectorized_relevance are called once on the whole target array.
+                'default' is one minus the scaled normal pdf of Y, and 'pchip'
+                interpolates control points at the median and the adjusted
+                boxplot adjacent values of Y, see pchip_relevance.
             threshold: Threshold to determine the normal and rare samples.
             should_log_transform: Useful when there is a huge difference
                 between the order of the target values.
+            random_state: None, an int, a np.random.SeedSequence or a
+                np.random.Generator. Each resampler draws only from its own
+                generator, so resamplers can run in separate threads.
+            n_jobs: Number of workers used to resample the bins. 1 runs
+                sequentially and -1 uses all CPUs. The output does not
+                depend on n_jobs, since every bin has its own child stream.
+            executor: 'thread', 'process' or a concurrent.futures.Executor
+                to run the bins on when n_jobs is not 1.
+            index_labels: 'provenance' (default) indexes the output with an
+                (origin, source_position) MultiIndex: the ResampleResult
+                origin code of each row and the position of its source row.
+                'string' keeps the original labels and the
+                "OverSampled-{i}-{label}" style labels of earlier versions.
+            profiler: A Profiler, or a callable receiving every stage record,
+                to time the stages of the fit and of get(). None by default.
+            dense_columns: Columns of a sparse df that GN perturbs in every
+                row, implicit zeros included. The other columns only get
+                noise on their stored values.
+            dtype_policy: The dtypes of the output. None (default) gives
+                float64 for the numeric columns that get noise. 'preserve'
+                keeps the dtype of every input column, rounding the noisy
+                values of integer columns. 'float32' stores the float64
+                columns as float32 and generates the noise in float32;
+                integer columns keep their dtype, with noisy values rounded.
+                Both store the categorical columns as category.
+            state: A FittedState from another resampler. When given, df, y,
+                y_col_name, categorical_columns, rel_func, threshold,
+                dense_columns and dtype_policy are taken from it and nothing
+                is re-computed. Passing dense_columns or dtype_policy with
+                it is an error.
         """
         df = params.pop("df", None)
+        y = params.pop("y", None)
         y_col_name = params.pop("y_col_name", None)
         rel_func = params.pop("rel_func", None)
         threshold = params.pop("threshold", 0.9)
@@ -32,67 +81,108 @@ class DataHandler:
         bins = params.pop("bins", 10)
         should_log_transform = params.pop("should_log_transform", False)
         random_state = params.pop("random_state", None)
+        n_jobs = params.pop("n_jobs", 1)
+        executor = params.pop("executor", "thread")
+        index_labels = params.pop("index_labels", "provenance")
         self.should_sort = params.pop("should_sort", True)
+        state = params.pop("state", None)
+        profiler = params.pop("profiler", None)
+        dense_columns = params.pop("dense_columns", None)
+        dtype_policy = params.pop("dtype_policy", None)
 
+        # Every resampler owns its random generator; the global numpy state is never used
+        self.set_random_state(random_state)
 
-        self.random_state = random_state
-        np.random.seed(random_state)
-
-        # The current version of PyImbalReg is designed to work only with pandas dataframes
-        if not isinstance(df, pd.DataFrame):
-            raise TypeError("The current version of PyImbalReg can "\
-                                "only work on pandas dataframes.")
-
-        # The data must not contain any Nan values
-        if df.isnull().values.any():
-            raise ValueError("The dataframe consists NaN values. "\
-                                    "Please consider removing them.")
+        self.o_percentage = self._is_o_percentage_correct(o_percentage)
+        self.u_percentage = self._is_u_percentage_correct(u_percentage)
+        self.perm_amp = self._is_perm_amp_correct(perm_amp)
+        self.bins = self._is_bins_correct(bins)
+        self.n_jobs = self._is_n_jobs_correct(n_jobs)
+        self.executor = self._is_executor_correct(executor)
+        self.index_labels = self._is_index_labels_correct(index_labels)
+        self.profiler = self._is_profiler_correct(profiler)
+        self.dtype_policy = self._is_dtype_policy_correct(dtype_policy)
+
+        # Reusing the state of an already fitted resampler
+        if state is not None:
+            if not isinstance(state, FittedState):
+                raise TypeError("The state must be a FittedState.")
+            if dense_columns is not None or dtype_policy is not None:
+                raise ValueError("The dense_columns and dtype_policy are taken from the state; "\
+                                    "they can't be passed with it.")
+            state.assign_to(self)
+            self.state = state
+            return
+
+        with self._stage('validation'):
+            # NumPy arrays, pyarrow tables and polars dataframes are wrapped without copying
+            self.container = get_container(df)
+            if self.container is None:
+                raise TypeError("PyImbalReg works on pandas or polars dataframes, "\
+                                    "pyarrow tables, 2-D or structured NumPy arrays "\
+                                    "and scipy.sparse matrices.")
+
+            # A sparse matrix stays as CSR; the fit only sees a dataframe of the target
+            self.features = None
+            if self.container == 'sparse':
+                self.features, df, y_col_name = self._split_sparse(df, y, y_col_name)
+                if categorical_columns is None:
+                    categorical_columns = []
+            elif y is not None:
+                raise ValueError("The y is only used with a sparse matrix. "\
+                                    "Please pass y_col_name instead.")
+            else:
+                df = to_pandas(df, self.container)
+            self.dense_columns = self._is_dense_columns_correct(dense_columns, self.features)
 
-        # Getting the Y column
-        if y_col_name is None:
-            y_col_name = df.columns.values[-1]
+            # The data must not contain any Nan values
+            if df.isnull().values.any():
+                raise ValueError("The dataframe consists NaN values. "\
+                                        "Please consider removing them.")
 
-        # y should be either None or string
-        elif not isinstance(y_col_name, str):
-            raise TypeError("y must be either None or a string")
+            # Getting the Y column
+            if y_col_name is None:
+                y_col_name = df.columns.values[-1]
 
-        # if y is not one of the data columns
-        elif y_col_name not in df.columns.values:
-            raise ValueError("y must be a column name, but it's not")
+            # y should be either None or string, or the column index of a 2-D array
+            elif not (isinstance(y_col_name, str) or
+                        self.container == 'numpy' and isinstance(y_col_name, (int, np.integer))):
+                raise TypeError("y must be either None or a string")
 
-        self.y_col_name = y_col_name
+            # if y is not one of the data columns
+            elif y_col_name not in df.columns.values:
+                raise ValueError("y must be a column name, but it's not")
 
-        # Rearrange the dataframe so the last column is Y
-        if df.columns.values[-1] != y_col_name:
-            cols = df.columns.tolist()
-            idx = cols.index(y_col_name)
-            cols = cols[:idx] + cols[idx+1:] + [cols[idx]]
-            df = df[cols]
+            self.y_col_name = y_col_name
 
-        self.df = df
+            # The caller's dataframe is never modified or copied here. Y is moved to ...
+            # ... the last column only when rows are gathered for the output.
+            self.df = df
+            self.columns, self.column_positions = self._get_column_order(df, y_col_name)
 
         # Relevance function maps Y to [0, 1]. Values u(Y) > threshold are rare.
         # Ref: Branco et al., Neurocomputing 343, pp.76-99, 2019.
 
-        self.o_percentage = self._is_o_percentage_correct(o_percentage)
-        self.u_percentage = self._is_u_percentage_correct(u_percentage)
-        self.perm_amp = self._is_perm_amp_correct(perm_amp)
-        self.bins = self._is_bins_correct(bins)
-
         # Finding the categorical columns
-        if categorical_columns is None:
-            categorical_columns = self.get_categorical_cols(df)
-        self.categorical_columns = categorical_columns
+        with self._stage('categorical_detection', len(df)):
+            if categorical_columns is None:
+                categorical_columns = self.get_categorical_cols(df)
+            self.categorical_columns = categorical_columns
 
         # Setting the relevance function, normal bins, rare bins, ...
         # Some algorithms do not need rel_func.
         if rel_func is not None:
             # Setting the relevance function and threshold
-            self.set_relevance_function(rel_func, threshold)
+            with self._stage('relevance_function', len(df)):
+                self.set_relevance_function(rel_func, threshold)
 
             # Finding the rare and normal values
             self.find_normal_rare_values()
 
+        # Keeping everything computed so far for sampling many times
+        self.state = FittedState.from_handler(self)
+        self.state.assign_to(self)
+
     # Set the undersampling percentage
     def set_u_percentage(self, u_percentage):
         self.u_percentage = self._is_u_percentage_correct(u_percentage)
@@ -101,20 +191,98 @@ class DataHandler:
     def set_o_percentage(self, o_percentage):
         self.o_percentage = self._is_o_percentage_correct(o_percentage)
 
+    # Set the random generator used by the next get()
+    def set_random_state(self, random_state):
+        # random_state: None, an int, a SeedSequence or a Generator to draw from
+
+        self.random_state = random_state
+
+        if isinstance(random_state, np.random.Generator):
+            self.seed_sequence = None
+            self.rng = random_state
+        else:
+            if not isinstance(random_state, np.random.SeedSequence):
+                random_state = np.random.SeedSequence(random_state)
+            self.seed_sequence = random_state
+            self.rng = np.random.default_rng(random_state)
+
+    # Creating independent child seed sequences of this resampler's stream
+    def spawn_seed_sequences(self, n_children):
+
+        if self.seed_sequence is None:
+            # A generator was passed; its next draw seeds the children
+            self.seed_sequence = np.random.SeedSequence(
+                self.rng.integers(0, 2**63, size = 4))
+
+        return self.seed_sequence.spawn(n_children)
+
+    # Creating independent child generators, e.g. one per thread or process
+    def spawn_generators(self, n_children):
+        return [np.random.default_rng(seed) for seed in self.spawn_seed_sequences(n_children)]
+
+    # Creating resamplers that share the fitted state but have their own child streams
+    def spawn(self, n_children):
+        return [type(self)(state = self.state,
+                           o_percentage = self.o_percentage,
+                           u_percentage = self.u_percentage,
+                           perm_amp = self.perm_amp,
+                           bins = self.bins,
+                           n_jobs = self.n_jobs,
+                           executor = self.executor,
+                           index_labels = self.index_labels,
+                           profiler = self.profiler,
+                           random_state = seed)
+                for seed in self.spawn_seed_sequences(n_children)]
+
+    # Precision of the generated noise and offsets
+    @property
+    def noise_dtype(self):
+        return np.float32 if self.dtype_policy == 'float32' else np.float64
+
+    # Timing a stage of the run when a profiler is set; a no-op otherwise
+    def _stage(self, name, rows = None):
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.stage(name, rows, resampler = type(self).__name__)
+
+    # Returning the lazy result, or building it in the container type of the input
+    def _build(self, result, lazy):
+        if lazy:
+            return result
+        with self._stage('build', len(result)):
+            return result.to_native(self.index_labels)
+
+    # Running func over the bins, sequentially or on a worker pool
+    def _map_bins(self, func, *iterables):
+        # func must be picklable (e.g. a staticmethod) for the process executor
+
+        if self.n_jobs == 1:
+            return list(map(func, *iterables))
+
+        if isinstance(self.executor, Executor):
+            return list(self.executor.map(func, *iterables))
+
+        n_workers = os.cpu_count() if self.n_jobs == -1 else self.n_jobs
+        pool = ThreadPoolExecutor if self.executor == 'thread' else ProcessPoolExecutor
+        with pool(max_workers = n_workers) as executor:
+            return list(executor.map(func, *iterables))
+
     # Assigning the relevance function and the threshold
     def set_relevance_function(self, rel_func, threshold):
 
         # The default behaviour
         if rel_func == 'default' or rel_func is None:
-            average, std = self.df.loc[:, self.y_col_name].mean(), self.df.loc[:, self.y_col_name].std()
+            y = self.df.loc[:, self.y_col_name].values
+            average, std = y.mean(), y.std(ddof = 1)
 
             # Default relevance function is based on probability distribution function ...
-            # ... of normal distribution
-            def default_rel_func(x, average = average, std = std):
-                return 1 - norm.pdf(x, loc = average, scale = std) / \
-                             norm.pdf(average, loc = average, scale = std)
+            # ... of normal distribution, written in closed form
+            self.rel_func = default_relevance(average, std)
 
-            self.rel_func = default_rel_func
+        # PCHIP over control points derived from the adjusted boxplot of Y
+        elif rel_func == 'pchip':
+            y = self.df.loc[:, self.y_col_name].values
+            self.rel_func = pchip_relevance(boxplot_control_points(y))
 
         # Check if the rel_fun is a function
         elif not callable(rel_func):
@@ -124,69 +292,171 @@ class DataHandler:
         else:
             self.rel_func = rel_func
 
-        # Check if the threshold is a float
-        if not isinstance(threshold, (float)):
-            raise ValueError("The threshold must be float")
-        # Check if the threshold is between 0 and 1
-        elif not (threshold > 0 and threshold < 1):
-            raise ValueError("The threshold must be between [0,1]. But it's not.")
-
-        self.threshold = threshold
+        self.threshold = self._is_threshold_correct(threshold)
 
     # Finding the relevance value of the Y
     def find_normal_rare_values(self):
 
-        # Finding bins with the normal Y and rare Y
-        self.rare_bins_indices, self.normal_bins_indices = [], []
+        y = self.df.loc[:, self.y_col_name].values
 
-        if self.should_sort:
-            # Sorting the values of df
-            self.df.sort_values(self.df.columns[-1], inplace = True)
-        
-        # Resetting index for correct splitting in the following steps
-        self.df.reset_index(drop = False, inplace = True)
+        # Positions of the rows in sorted order; bins are slices of this array.
+        # The permutation is kept instead of sorting the dataframe itself.
+        with self._stage('sort', len(y)):
+            if self.should_sort:
+                self.order = np.argsort(y, kind = 'stable').astype(np.int64, copy = False)
+            else:
+                self.order = np.arange(len(y), dtype = np.int64)
 
-        # Finding the relevance value of the Y
-        self.df['utility'] = self.df.loc[:, self.y_col_name].apply(self.rel_func)
+        # Finding the relevance value of the Y in one call over the whole column
+        with self._stage('relevance', len(y)):
+            utility = evaluate_relevance(self.rel_func, y)
 
-        if any(self.df.loc[:, 'utility'] > 1) or any(self.df.loc[:, 'utility'] < 0):
+        if (utility > 1).any() or (utility < 0).any():
             raise ValueError("It is expected that the relevance function returns\
                                 values between [0, 1]. But it doesn't. Please re-define your relevance function")
 
-        # Assuming all samples are normal at the beginning: Normal = 1
-        # And adding the 'R/N' columns for next steps
-        self.df.loc[:, 'R/N'] = 1
-
-        # Finding the rare values
-        self.df.loc[self.df['utility'] >= self.threshold, 'R/N'] = -1
-
-        # Shifting the R/N and multiplying it with the original one
-        # Those places where this value is equal to -1 are the boundaries of bins
-        changing_points = self.df.loc[:, 'R/N'] * self.df.loc[:, 'R/N'].shift(periods = 1)
-        
-        # Finding the changing points indices (left side of each bin)
-        changing_points_idx = self.df[changing_points == -1].index.tolist()
-
-        # Add 0 and len(df) for indexing
-        changing_points_idx = [0] + changing_points_idx + [len(self.df)]
-        for left, right in zip(changing_points_idx[:-1], changing_points_idx[1:]):
-            
-            # Selecting the bins' indices
-            selected_bin = self.df.loc[:, 'index'].iloc[left:right].tolist()
-            if self.df.loc[left, 'R/N'] == 1:
-                self.normal_bins_indices.append(selected_bin)
+        # Finding bins with the normal Y and rare Y as (start, stop) offsets into self.order
+        with self._stage('bins', len(y)):
+            self.rare_bins, self.normal_bins = self._find_bins(utility[self.order] >= self.threshold)
+
+        # Keeping the utility for future use
+        self.Y_utility = pd.Series(utility, index = self.df.index, name = 'utility')
+
+    # Gathering rows by position, with Y as the last column
+    def _take(self, positions):
+        if self.column_positions is None:
+            return self.df.take(positions)
+        return self.df.iloc[positions, self.column_positions]
+
+    # Gathering the rows of one bin by position
+    def _take_bin(self, start, stop):
+        return self._take(self.order[start:stop])
+
+    # Std of the numeric columns in each rare bin, once per fitted state
+    def get_rare_bins_std(self):
+        # Only the noise-based resamplers need it, so it is not part of the fit
+
+        if self.state.rare_bins_std is None:
+            numeric_columns = [col for col in self.df.columns
+                                if col not in self.categorical_columns
+                                and pd.api.types.is_numeric_dtype(self.df[col].dtype)]
+            with self._stage('bin_std', int(np.diff(self.rare_bins, axis = 1).sum())):
+                self.state.rare_bins_std = [self._take_bin(start, stop).loc[:, numeric_columns].std()
+                                                for start, stop in self.rare_bins]
+
+        self.rare_bins_std = self.state.rare_bins_std
+
+        return self.rare_bins_std
+
+    # Encoding the categorical columns as integer codes, once per fitted state
+    def get_categorical_codes(self):
+
+        if self.state.categorical_codes is None:
+            self.state.categorical_codes, self.state.categories = \
+                self._encode_categorical(self.df, self.categorical_columns)
+
+        self.categorical_codes = self.state.categorical_codes
+        self.categories = self.state.categories
+
+        return self.categorical_codes, self.categories
+
+    # Storing the categorical columns of an output with the fitted categories
+    def _as_categorical(self, df):
+        dtypes = {col: pd.CategoricalDtype(categories)
+                    for col, categories in self.categories.items()}
+        return df.astype(dtypes) if dtypes else df
+
+    # Factorizing the categorical columns of a dataframe
+    @staticmethod
+    def _encode_categorical(df, categorical_columns):
+        # Returns an (n, c) array of codes and a dict of column -> categories
+
+        columns = [col for col in df.columns if col in categorical_columns]
+        codes = np.empty((len(df), len(columns)), dtype = np.int32)
+        categories = {}
+
+        for j, col in enumerate(columns):
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                codes[:, j] = df[col].cat.codes.values
+                categories[col] = df[col].cat.categories
             else:
-                self.rare_bins_indices.append(selected_bin)
+                codes[:, j], categories[col] = pd.factorize(df[col])
+
+        return codes, categories
 
-        # Setting the original index as the index one more time
-        self.df.set_index('index', drop = True, inplace = True)
+    # Checking a sparse feature matrix and its target
+    @staticmethod
+    def _split_sparse(X, y, y_col_name):
+        # Returns the CSR matrix, a one-column dataframe of y and the name of y
 
-        # Slicing the utility for future use
-        self.Y_utility = self.df.loc[:, 'utility'].copy()
+        # tocsr does not copy a CSR matrix
+        X = X.tocsr()
+        if y is None:
+            raise ValueError("The y must be passed with a sparse matrix.")
 
-        # dropping the newly created columns
-        self.df.drop(columns = ['R/N', 'utility'], inplace = True)
+        y = np.asarray(y)
+        if y.ndim != 1 or len(y) != X.shape[0]:
+            raise ValueError("The y must be a vector with one value per row of the matrix.")
 
+        # Only the stored values can be NaN
+        if pd.isnull(X.data).any():
+            raise ValueError("The matrix consists NaN values. "\
+                                "Please consider removing them.")
+
+        if y_col_name is None:
+            y_col_name = 'y'
+        elif not isinstance(y_col_name, str):
+            raise TypeError("y must be either None or a string")
+
+        return X, pd.DataFrame({y_col_name: y}, copy = False), y_col_name
+
+    # Finding the output column order, where Y is the last column
+    @staticmethod
+    def _get_column_order(df, y_col_name):
+
+        cols = df.columns.tolist()
+        if cols[-1] == y_col_name:
+            return cols, None
+
+        idx = cols.index(y_col_name)
+        positions = np.arange(len(cols), dtype = np.int64)
+        positions = np.concatenate((positions[:idx], positions[idx+1:], positions[idx:idx+1]))
+
+        return [cols[i] for i in positions], positions
+
+    # Splitting a rare mask into runs of rare and normal samples
+    @staticmethod
+    def _find_bins(is_rare):
+        # is_rare: boolean mask of the samples in sorted order
+
+        if len(is_rare) == 0:
+            empty = np.empty((0, 2), dtype = np.int64)
+            return empty, empty.copy()
+
+        # The left side of each bin is where the mask changes its value
+        changing_points = np.flatnonzero(is_rare[1:] != is_rare[:-1]) + 1
+        starts = np.concatenate(([0], changing_points)).astype(np.int64)
+        stops = np.concatenate((changing_points, [len(is_rare)])).astype(np.int64)
+
+        bins = np.column_stack((starts, stops))
+        rare_runs = is_rare[starts]
+
+        return bins[rare_runs], bins[~rare_runs]
+
+
+    # Checking if the threshold is correct
+    @staticmethod
+    def _is_threshold_correct(threshold):
+        # threshold: relevance above which the samples are rare
+
+        # Check if the threshold is a float
+        if not isinstance(threshold, (float)):
+            raise ValueError("The threshold must be float")
+        # Check if the threshold is between 0 and 1
+        elif not (threshold > 0 and threshold < 1):
+            raise ValueError("The threshold must be between [0,1]. But it's not.")
+
+        return threshold
 
     # Checking if the o_percentage is correct
     @staticmethod
@@ -225,6 +495,71 @@ class DataHandler:
 
         return perm_amp
 
+    # Checking if the number of workers is correct
+    @staticmethod
+    def _is_n_jobs_correct(n_jobs):
+        # n_jobs: number of workers, -1 for all CPUs
+        if not isinstance(n_jobs, int) or isinstance(n_jobs, bool):
+            raise ValueError("The n_jobs must be integer")
+        elif not (n_jobs >= 1 or n_jobs == -1):
+            raise ValueError("The n_jobs must be a positive integer or -1")
+
+        return n_jobs
+
+    # Checking if the executor is supported
+    @staticmethod
+    def _is_executor_correct(executor):
+        # executor: 'thread', 'process' or a concurrent.futures.Executor
+        if not (isinstance(executor, Executor) or executor in ('thread', 'process')):
+            raise ValueError("The executor must be 'thread', 'process' or an Executor")
+
+        return executor
+
+    # Checking if the profiler is a Profiler, a callback or None
+    @staticmethod
+    def _is_profiler_correct(profiler):
+        # profiler: a Profiler, a callable receiving every record, or None
+        if profiler is None or isinstance(profiler, Profiler):
+            return profiler
+        if callable(profiler):
+            return Profiler(callback = profiler)
+
+        raise TypeError("The profiler must be a Profiler, a callable or None")
+
+    # Checking if the index labels mode is supported
+    @staticmethod
+    def _is_index_labels_correct(index_labels):
+        # index_labels: 'provenance' or 'string'
+        if index_labels not in ('provenance', 'string'):
+            raise ValueError("The index_labels must be 'provenance' or 'string'")
+
+        return index_labels
+
+    # Checking if the dtype policy is supported
+    @staticmethod
+    def _is_dtype_policy_correct(dtype_policy):
+        # dtype_policy: None, 'preserve' or 'float32'
+        if dtype_policy not in (None, 'preserve', 'float32'):
+            raise ValueError("The dtype_policy must be None, 'preserve' or 'float32'")
+
+        return dtype_policy
+
+    # Checking if the dense columns are columns of the sparse matrix
+    @staticmethod
+    def _is_dense_columns_correct(dense_columns, features):
+        # dense_columns: column positions of the sparse matrix, or None
+
+        if dense_columns is None:
+            return np.empty(0, dtype = np.int64)
+        if features is None:
+            raise ValueError("The dense_columns is only used with a sparse matrix")
+
+        dense_columns = np.unique(np.asarray(dense_columns, dtype = np.int64))
+        if ((dense_columns < 0) | (dense_columns >= features.shape[1])).any():
+            raise ValueError("The dense_columns must be column positions of the matrix")
+
+        return dense_columns
+
     # Checking if the bins is an integer
     @staticmethod
     def _is_bins_correct(bins):
@@ -251,8 +586,9 @@ class DataHandler:
         categorical_columns = []
         for col in df.columns:
 
-            # Adding the string, boolean, and datetimes columns
-            if df[col].dtypes in nominal_dtypes:
+            # Adding the string, boolean, and datetimes columns; pandas 3 stores ...
+            # ... strings in a str dtype rather than object
+            if df[col].dtypes in nominal_dtypes or pd.api.types.is_string_dtype(df[col].dtypes):
                 categorical_columns.append(col)
 
             # Checking the integer columns
@@ -0,0 +1,101 @@
+# Loading dependencies
+import numpy as np
+import pandas as pd
+
+
+class FittedState:
+
+    # The attributes a DataHandler computes once and the resamplers only read
+    fitted_attributes = (
+        "df",
+        "container",
+        "features",
+        "dense_columns",
+        "dtype_policy",
+        "y_col_name",
+        "columns",
+        "column_positions",
+        "categorical_columns",
+        "rel_func",
+        "threshold",
+        "Y_utility",
+        "order",
+        "rare_bins",
+        "normal_bins",
+        "rare_bins_std",
+        "feature_scale",
+        "histogram_bins",
+        "categorical_codes",
+        "categories",
+    )
+
+    def __init__(self, **params):
+        """Hold everything a DataHandler computes before sampling.
+
+        Validation, column reordering, categorical detection, sorting,
+        relevance evaluation and bin discovery are done once. The result
+        can be passed to any resampler with state=..., so that get() only
+        draws the samples.
+
+        Args:
+            df: The validated data, exactly as the caller passed it, or a
+                pandas DataFrame viewing its buffers.
+            container: The container type of the caller's data, see
+                containers.get_container.
+            features: The CSR feature matrix of a sparse input, whose target
+                is then the only column of df; None for other inputs.
+            dense_columns: Columns of features that GN perturbs in every row.
+            dtype_policy: None, 'preserve' or 'float32', the dtypes of the
+                output columns, see DataHandler.
+            y_col_name: The name of the Y column header.
+            columns: The output column order, with Y as the last column.
+            column_positions: Positions of columns in df, or None when
+                Y is already the last column.
+            categorical_columns: Columns treated as categorical.
+            rel_func: The relevance function, or None.
+            threshold: Threshold to determine the normal and rare samples.
+            Y_utility: The relevance of each row, or None.
+            order: int64 positions of the rows of df in sorted order.
+            rare_bins: int64 array of (start, stop) offsets into order,
+                one row per rare bin.
+            normal_bins: int64 array of (start, stop) offsets into order,
+                one row per normal bin.
+            rare_bins_std: Std of the numeric columns in each rare bin,
+                filled on first use by the noise-based resamplers.
+            feature_scale: Range of the numeric features over all rows,
+                filled on first use by SmoteR and SMOGN.
+            histogram_bins: (bins, positions, std) of the target histogram
+                of GNHF: the positions in df and the std of the numeric
+                columns of every bin, filled on first use.
+            categorical_codes: (n, c) int32 codes of the categorical columns,
+                filled on first use by the noise-based resamplers.
+            categories: Dict of categorical column -> its categories.
+        """
+        for attr in self.fitted_attributes:
+            setattr(self, attr, params.pop(attr, None))
+
+        if not isinstance(self.df, pd.DataFrame):
+            raise TypeError("The fitted state must hold a pandas dataframe.")
+
+        if self.container is None:
+            self.container = "pandas"
+        if self.dense_columns is None:
+            self.dense_columns = np.empty(0, dtype=np.int64)
+        if self.columns is None:
+            self.columns = self.df.columns.tolist()
+        if self.order is None:
+            self.order = np.arange(len(self.df), dtype=np.int64)
+        if self.rare_bins is None:
+            self.rare_bins = np.empty((0, 2), dtype=np.int64)
+        if self.normal_bins is None:
+            self.normal_bins = np.empty((0, 2), dtype=np.int64)
+
+    # Building the state from a fitted DataHandler
+    @classmethod
+    def from_handler(cls, handler):
+        return cls(**{attr: getattr(handler, attr, None) for attr in cls.fitted_attributes})
+
+    # Copying the fitted attributes onto a DataHandler
+    def assign_to(self, handler):
+        for attr in self.fitted_attributes:
+            setattr(handler, attr, getattr(self, attr))
@@ -1,7 +1,10 @@
 # Loading dependencies
+from itertools import repeat
+
 import numpy as np
 import pandas as pd
 from .DataHandler import DataHandler
+from .ResampleResult import ResampleResult
 from .RU import RandomUndersampling
 
 class GaussianNoise(DataHandler):
@@ -11,8 +14,12 @@ class GaussianNoise(DataHandler):
 
         Ref: Branco et al., Neurocomputing 343, pp.76-99, 2019.
 
+        The output holds the undersampled normal bins and every rare case
+        once, followed by (o_percentage - 1) noisy cases per rare case, as
+        in the chunked GN of ChunkedResampler.
+
         Args:
-            df: Data as pandas DataFrame.
+            df: Data as a pandas or polars DataFrame, a pyarrow Table or a NumPy array.
             y_col_name: The name of the Y column header.
             rel_func: The relevance function.
             threshold: Threshold to determine the normal and rare samples.
@@ -20,74 +27,222 @@ class GaussianNoise(DataHandler):
             o_percentage: Oversampling factor for rare samples.
             perm_amp: Permutation amplitude for added noise.
             categorical_columns: Columns treated as categorical for sampling.
+            dense_columns: Columns of a sparse df that get noise in every
+                row; the other columns only get it on their stored values.
         """
         super().__init__(**params)
 
-    def get(self):
-        """Return the resampled DataFrame (undersampled normal + GN oversampled rare)."""
-        ru = RandomUndersampling(**self.__dict__)
-        undersample_df = ru.get()
-        oversample_df = self._oversample_with_GN()
+    def get(self, lazy=False):
+        """Return the resampled DataFrame (undersampled normal + GN oversampled rare).
 
-        # Concatenating the undersample normal samples and rare samples
-        df = pd.concat([undersample_df, oversample_df])
-
-        return df
+        Args:
+            lazy: Whether to return a ResampleResult holding the row
+                positions and the noise instead of building the DataFrame.
+        """
+        # Sharing the fitted state, so only the undersampling draw is done
+        ru = RandomUndersampling(
+            state=self.state,
+            u_percentage=self.u_percentage,
+            n_jobs=self.n_jobs,
+            executor=self.executor,
+            index_labels=self.index_labels,
+            random_state=self.spawn_seed_sequences(1)[0],
+        )
+        with self._stage('undersampling', len(self.df)):
+            segments = [(ResampleResult.ORIGINAL, positions)
+                            for positions in ru._undersample_normal_bins()]
+        self.get_rare_bins_std()
+        with self._stage('noise', int(np.diff(self.rare_bins, axis=1).sum())):
+            segments += self._oversample_with_GN()
+
+        result = ResampleResult.from_segments(self.state, segments, noisy=True)
+        return self._build(result, lazy)
 
     def _oversample_with_GN(self):
-        """Oversample rare bins by adding Gaussian noise."""
-        oversampled_bins = []
-
-        for rare_indices in self.rare_bins_indices:
-            df = self.df.loc[rare_indices, :]
-            new_df = self._get_new_noisy_points(df, self.categorical_columns, self.o_percentage, self.perm_amp)
-            oversampled_bins += [df, new_df]
-
-        return pd.concat(oversampled_bins)
+        """Oversample rare bins by adding Gaussian noise, as result segments."""
+        if self.features is not None:
+            return self._oversample_sparse_with_GN()
+
+        codes, categories = self.get_categorical_codes()
+        n_categories = np.array([len(cats) for cats in categories.values()], dtype=np.int64)
+        numeric_columns = [col for col in self.columns if col not in self.categorical_columns]
+        rare_positions = [self.order[start:stop] for start, stop in self.rare_bins]
+
+        # Every bin draws from its own child stream, whatever the number of workers
+        noisy_bins = self._map_bins(
+            self._noisy_bin,
+            rare_positions,
+            [np.asarray(std[numeric_columns], dtype=np.float64) for std in self.get_rare_bins_std()],
+            [codes[positions] for positions in rare_positions],
+            repeat(n_categories),
+            repeat(self.o_percentage),
+            repeat(self.perm_amp),
+            repeat(self.noise_dtype),
+            self.spawn_generators(len(rare_positions)),
+        )
+
+        segments = []
+        for positions, noisy in zip(rare_positions, noisy_bins):
+            segments += [(ResampleResult.ORIGINAL, positions),
+                         (ResampleResult.NOISY,) + noisy]
+
+        return segments
+
+    def _oversample_sparse_with_GN(self):
+        """Oversample the rare bins of a sparse matrix, as result segments."""
+        self.get_categorical_codes()
+        rare_positions = [self.order[start:stop] for start, stop in self.rare_bins]
+
+        noisy_bins = self._map_bins(
+            self._noisy_sparse_bin,
+            [self.features[positions] for positions in rare_positions],
+            [np.asarray(std, dtype=np.float64) for std in self.get_rare_bins_std()],
+            repeat(self.dense_columns),
+            repeat(self.o_percentage),
+            repeat(self.perm_amp),
+            repeat(self.noise_dtype),
+            self.spawn_generators(len(rare_positions)),
+        )
+
+        segments = []
+        for positions, (rows, noise, codes, feature_noise) in zip(rare_positions, noisy_bins):
+            segments += [(ResampleResult.ORIGINAL, positions),
+                         (ResampleResult.NOISY, positions[rows], noise, codes, feature_noise)]
+
+        return segments
 
     @staticmethod
-    def _get_new_noisy_points(df, categorical_columns, o_percentage, perm_amp):
-        """Generate new synthetic points by adding Gaussian noise.
+    def _noisy_sparse_bin(features, std, dense_columns, o_percentage, perm_amp, dtype, rng):
+        """Draw the noisy points of one bin of a sparse matrix.
+
+        Only the stored values of the source rows get noise, so the new rows
+        keep their sparsity, except for the dense columns, which get noise
+        in every row. The column std of the bin counts the implicit zeros.
 
         Args:
-            df: Source DataFrame.
-            categorical_columns: List of categorical column names.
+            features: (m, f) CSR rows of the bin.
+            std: Std of Y in the bin.
+            dense_columns: Columns that get noise in every row.
             o_percentage: Oversampling factor.
             perm_amp: Noise scale (fraction of column std).
+            dtype: The float dtype of the noise.
+            rng: The np.random.Generator to draw from.
+
+        Returns:
+            The source rows (offsets into the bin), the (n, 1) noise of Y,
+            the (n, 0) categorical codes and the (n, f) CSR noise of the
+            features.
+        """
+        from scipy import sparse
+
+        m, f = features.shape
+        n = int((o_percentage - 1) * m)
+
+        # Column std from the stored values centred on the column mean, without ...
+        # ... densifying; each implicit zero is mean away from it
+        if m > 1:
+            counts = np.bincount(features.indices, minlength=f)
+            mean = np.bincount(features.indices, weights=features.data, minlength=f) / m
+            centred = features.data - mean[features.indices]
+            squares = np.bincount(features.indices, weights=centred * centred, minlength=f)
+            column_std = np.sqrt((squares + (m - counts) * mean ** 2) / (m - 1))
+        else:
+            column_std = np.full(f, np.nan)
+
+        rows = rng.integers(0, max(m, 1), size=n)
+        noise = rng.standard_normal(size=(n, 1), dtype=dtype)
+        noise *= (std * perm_amp).astype(dtype)
+
+        # The noise of the stored values has the sparsity of the source rows
+        source = features[rows]
+        values = rng.standard_normal(source.nnz, dtype=dtype)
+        values *= (column_std * perm_amp).astype(dtype)[source.indices]
+        values[np.isin(source.indices, dense_columns)] = 0
+        feature_noise = sparse.csr_matrix((values, source.indices, source.indptr), shape=(n, f))
+
+        # The dense columns get noise in every row, implicit zeros included
+        if len(dense_columns):
+            block = rng.standard_normal(size=(n, len(dense_columns)), dtype=dtype)
+            block *= (column_std[dense_columns] * perm_amp).astype(dtype)
+            feature_noise = feature_noise + sparse.csr_matrix(
+                (block.ravel(), np.tile(dense_columns, n),
+                 np.arange(0, n * len(dense_columns) + 1, len(dense_columns))),
+                shape=(n, f))
+
+        return rows, noise, np.empty((n, 0), dtype=np.int64), feature_noise.tocsr()
+
+    @staticmethod
+    def _noisy_bin(positions, std, codes, n_categories, o_percentage, perm_amp, dtype, rng):
+        """Draw the noisy points of one bin.
 
         Returns:
-            New DataFrame with synthetic noisy samples.
+            The source positions, the (n, k) noise of the numeric columns and
+            the (n, c) categorical codes of the new points.
         """
-        new_df = pd.DataFrame(columns=df.columns)
-        n = int((o_percentage - 1) * len(df))
+        n = int((o_percentage - 1) * len(positions))
+        rows, noise, sampled_codes = GaussianNoise._draw_noise(
+            len(positions), std, codes, n_categories, n, perm_amp, rng, dtype
+        )
+        return positions[rows], noise, sampled_codes
 
-        for col in df.columns:
+    @staticmethod
+    def _draw_noise(m, std, codes, n_categories, n, perm_amp, rng, dtype=np.float64):
+        """Draw n source rows out of m, their noise and their categorical codes.
 
-            if col in categorical_columns:
-                counts = df[col].value_counts(normalize=True)
-                weights = counts.values  # already probabilities (sum=1)
+        The numeric columns are handled as one (n, k) block: the source rows
+        are drawn once and the noise matrix is generated in one call, in
+        the given float dtype.
+        """
+        rows = rng.integers(0, max(m, 1), size=n)
+        noise = rng.standard_normal(size=(n, len(std)), dtype=dtype)
+        noise *= (std * perm_amp).astype(dtype)
 
-                new_df[col] = np.random.choice(
-                    counts.index.tolist(),
-                    size=n,
-                    replace=True,
-                    p=weights,
-                )
+        # The categorical columns are sampled together from their codes
+        sampled_codes = GaussianNoise._sample_categorical_codes(codes, n_categories, n, rng)
 
-            else:
-                oversampled_values = np.random.choice(
-                    df[col].values, size=n, replace=True
-                )
-                std = df[col].std()
-                noise = np.random.normal(
-                    loc=0, scale=std * perm_amp, size=n
-                )
-                new_df[col] = oversampled_values + noise
+        return rows, noise, sampled_codes
 
-        new_df.index = [f"GN-{i}-{x}" for i, x in enumerate(new_df.index)]
+    @staticmethod
+    def _sample_categorical_codes(codes, n_categories, n, rng):
+        """Draw codes for all categorical columns with their bin frequencies.
 
-        return new_df
+        Args:
+            codes: (m, c) integer codes of the source rows.
+            n_categories: Number of categories of each of the c columns.
+            n: Number of rows to draw.
+            rng: The np.random.Generator to draw from.
 
+        Returns:
+            (n, c) int64 array of sampled codes.
+        """
+        counts = GaussianNoise._count_categorical_codes(codes, n_categories)
+        return GaussianNoise._sample_from_category_counts(counts, n_categories, n, rng)
 
+    @staticmethod
+    def _count_categorical_codes(codes, n_categories):
+        """Count the codes of all categorical columns in one bincount.
+
+        The counts of every column are laid side by side, so column j
+        occupies sum(n_categories[:j]) ... sum(n_categories[:j + 1]).
+        """
+        offsets = np.concatenate(([0], np.cumsum(n_categories)[:-1])).astype(np.int64)
+        return np.bincount((codes + offsets).ravel(), minlength=int(n_categories.sum()))
+
+    @staticmethod
+    def _sample_from_category_counts(counts, n_categories, n, rng):
+        """Draw codes for all categorical columns from side-by-side counts.
+
+        One uniform draw per value is mapped back to a code with a single
+        searchsorted over the cumulative counts.
+        """
+        c = len(n_categories)
+        m = counts.sum() // c if c else 0
+        if c == 0 or m == 0:
+            return np.empty((n, c), dtype=np.int64)
 
+        offsets = np.concatenate(([0], np.cumsum(n_categories)[:-1])).astype(np.int64)
+        cum_counts = np.cumsum(counts)
 
+        # Every column holds m counts, starting after the counts of the previous ones
+        targets = rng.random((n, c)) * m + np.arange(c) * m
+        return np.searchsorted(cum_counts, targets, side="right") - offsets
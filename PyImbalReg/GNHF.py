@@ -1,8 +1,10 @@
 # Loading dependencies
+from itertools import repeat
+
 import numpy as np
-import pandas as pd
 from .DataHandler import DataHandler
 from .GN import GaussianNoise
+from .ResampleResult import ResampleResult
 
 class GNHF(DataHandler):
 
@@ -13,7 +15,7 @@ class GNHF(DataHandler):
         uses Gaussian noise for oversampling.
 
         Args:
-            df: Data as pandas DataFrame.
+            df: Data as a pandas or polars DataFrame, a pyarrow Table or a NumPy array.
             y_col_name: The name of the Y column header.
             threshold: Threshold for binning (if used).
             perm_amp: Permutation amplitude for noise.
@@ -24,36 +26,87 @@ class GNHF(DataHandler):
             raise ValueError("GNHF does not use rel_func; pass None.")
         super().__init__(**params)
 
-    def get(self):
-        """Return the resampled DataFrame (histogram-balanced with GN oversampling)."""
-        freqs, edges = np.histogram(
-            self.df.loc[:, self.y_col_name], bins=self.bins
-        )
-        if any(val <= 1 for val in freqs):
-            raise ValueError(
-                "A bin with 1 or 0 samples was found. "
-                "Consider changing the number of bins."
-            )
+        if self.features is not None:
+            raise TypeError("GNHF does not support sparse matrices.")
+
+    def get(self, lazy=False):
+        """Return the resampled DataFrame (histogram-balanced with GN oversampling).
+
+        Args:
+            lazy: Whether to return a ResampleResult holding the row
+                positions and the noise instead of building the DataFrame.
+        """
+        bin_positions, bin_std = self.get_histogram_bins()
+        freqs = np.array([len(positions) for positions in bin_positions])
 
         mean_freq = np.mean(freqs)
-        holder = []
-
-        for freq, left_edge, right_edge in zip(freqs, edges[:-1], edges[1:]):
-            bin_df = self.df[
-                (self.df.loc[:, self.y_col_name] >= left_edge)
-                & (self.df.loc[:, self.y_col_name] <= right_edge)
-            ]
-            ratio = mean_freq / freq
-            if ratio < 1:
-                new_df = bin_df.sample(frac=ratio)
-                holder.append(new_df)
-            else:
-                new_df = GaussianNoise._get_new_noisy_points(
-                    bin_df,
-                    self.categorical_columns,
-                    ratio,
-                    self.perm_amp,
+        codes, categories = self.get_categorical_codes()
+        n_categories = np.array([len(cats) for cats in categories.values()], dtype=np.int64)
+
+        with self._stage('sampling', len(self.df)):
+            # Every bin draws from its own child stream, whatever the number of workers
+            holder = self._map_bins(
+                self._resample_bin,
+                bin_positions,
+                mean_freq / freqs,
+                bin_std,
+                [codes[positions] for positions in bin_positions],
+                repeat(n_categories),
+                repeat(self.perm_amp),
+                repeat(self.noise_dtype),
+                self.spawn_generators(len(bin_positions)),
+            )
+
+        result = ResampleResult.from_segments(
+            self.state, [segment for segments in holder for segment in segments], noisy=True
+        )
+        return self._build(result, lazy)
+
+    # Rows and std of the numeric columns of every histogram bin, once per fitted state
+    def get_histogram_bins(self):
+
+        # The layout is kept with its number of bins, for states shared by other GNHFs
+        if self.state.histogram_bins is None or self.state.histogram_bins[0] != self.bins:
+            with self._stage('bins', len(self.df)):
+                y = self.df.loc[:, self.y_col_name].values
+                edges = np.histogram_bin_edges(y, bins=self.bins)
+
+                # Each row is assigned to a bin once, with the same right-closed last bin as ...
+                # ... np.histogram; the rows of every bin are then a contiguous range of order
+                bin_ids = np.clip(np.searchsorted(edges, y, side="right") - 1, 0, self.bins - 1)
+                order = np.argsort(bin_ids, kind="stable")
+                freqs = np.bincount(bin_ids, minlength=self.bins)
+                bounds = np.concatenate(([0], np.cumsum(freqs)))
+
+            if any(val <= 1 for val in freqs):
+                raise ValueError(
+                    "A bin with 1 or 0 samples was found. "
+                    "Consider changing the number of bins."
                 )
-                holder += [new_df, bin_df]
 
-        return pd.concat(holder)
\ No newline at end of file
+            bin_positions = [order[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+            numeric_columns = [self.df[col].to_numpy() for col in self.columns
+                                if col not in self.categorical_columns]
+
+            # Only the rows of one bin are gathered at a time
+            with self._stage('bin_std', len(self.df)):
+                bin_std = [np.std(np.column_stack([col[positions] for col in numeric_columns])
+                                    .astype(np.float64, copy=False), axis=0, ddof=1)
+                           for positions in bin_positions]
+
+            self.state.histogram_bins = (self.bins, bin_positions, bin_std)
+
+        return self.state.histogram_bins[1:]
+
+    @staticmethod
+    def _resample_bin(positions, ratio, std, codes, n_categories, perm_amp, dtype, rng):
+        """Undersample (ratio < 1) or oversample with GN one histogram bin, as result segments."""
+        if ratio < 1:
+            n = round(ratio * len(positions))
+            kept = positions[rng.choice(len(positions), size=n, replace=False)]
+            return [(ResampleResult.ORIGINAL, kept)]
+
+        noisy = GaussianNoise._noisy_bin(
+            positions, std, codes, n_categories, ratio, perm_amp, dtype, rng
+        )
+        return [(ResampleResult.NOISY,) + noisy, (ResampleResult.ORIGINAL, positions)]
@@ -0,0 +1,126 @@
+# Loading dependencies
+import glob
+import hashlib
+import os
+import re
+import tempfile
+
+import numpy as np
+
+
+class NeighborCache:
+
+    # Number of rows sent to one cKDTree query, to bound its memory
+    query_batch_size = 100_000
+
+    def __init__(self, directory=None):
+        """Cache of the k nearest neighbour graphs of rare bins.
+
+        A graph is keyed by a fingerprint of the bin's features (a hash of
+        their bytes, shape and dtype), so the same rare bin gets the same
+        graph whatever the seed, percentages or resampler. Graphs are kept
+        in memory, and with a directory also as .npy files that later runs
+        and parallel workers open memory-mapped instead of rebuilding the
+        tree. A graph with more neighbours serves requests for fewer.
+
+        Args:
+            directory: A local directory for the .npy files, created if
+                needed. None keeps the graphs in memory only.
+        """
+        if directory is not None:
+            directory = os.fspath(directory)
+            os.makedirs(directory, exist_ok = True)
+
+        self.directory = directory
+        self.graphs = {}
+
+    def get(self, features, k, workers=1):
+        """Return the distances and positions of the k nearest neighbours of every row.
+
+        Args:
+            features: (m, f) features of the rows.
+            k: Number of neighbours; at most m - 1 are returned.
+            workers: Number of workers of the cKDTree queries.
+
+        Returns:
+            (m, k) float64 distances and (m, k) int64 positions in features,
+            read-only, the row itself excluded and the nearest first.
+        """
+        features = np.ascontiguousarray(features, dtype = np.float64)
+        k = min(k, len(features) - 1)
+        if k <= 0:
+            return np.empty((len(features), 0)), np.empty((len(features), 0), dtype = np.int64)
+
+        fingerprint = self.fingerprint(features)
+        graph = self.graphs.get(fingerprint)
+        if graph is None or graph[1].shape[1] < k:
+            graph = self._load(fingerprint, k)
+        if graph is None:
+            graph = self.find_neighbours(features, k, workers)
+            self._save(fingerprint, graph)
+        self.graphs[fingerprint] = graph
+
+        distances, indices = graph
+        return distances[:, :k], indices[:, :k]
+
+    # Hash of the feature values, shape and dtype
+    @staticmethod
+    def fingerprint(features):
+        digest = hashlib.blake2b(digest_size = 16)
+        digest.update(repr((features.shape, features.dtype.str)).encode())
+        digest.update(memoryview(features).cast('B'))
+        return digest.hexdigest()
+
+    # Building the k-NN graph with a cKDTree, querying the rows in batches
+    @staticmethod
+    def find_neighbours(features, k, workers=1):
+        from scipy.spatial import cKDTree
+
+        tree = cKDTree(features)
+        distances = np.empty((len(features), k))
+        indices = np.empty((len(features), k), dtype = np.int64)
+
+        for start in range(0, len(features), NeighborCache.query_batch_size):
+            stop = min(start + NeighborCache.query_batch_size, len(features))
+            found_distances, found = tree.query(features[start:stop], k = k + 1, workers = workers)
+
+            # A row is dropped from its own neighbours; with duplicate rows it is
+            # not always the first, or even among the k + 1, and then the last goes
+            own = found == np.arange(start, stop)[:, None]
+            own[~own.any(axis = 1), -1] = True
+            distances[start:stop] = found_distances[~own].reshape(-1, k)
+            indices[start:stop] = found[~own].reshape(-1, k)
+
+        return distances, indices
+
+    # Opening the stored graph with the fewest neighbours that is large enough
+    def _load(self, fingerprint, k):
+
+        if self.directory is None:
+            return None
+
+        stored = []
+        for path in glob.glob(os.path.join(self.directory, f"{fingerprint}-k*-indices.npy")):
+            match = re.search(r"-k(\d+)-indices\.npy$", path)
+            if match and int(match.group(1)) >= k:
+                stored.append(int(match.group(1)))
+        if not stored:
+            return None
+
+        prefix = os.path.join(self.directory, f"{fingerprint}-k{min(stored)}")
+        return (np.load(prefix + "-distances.npy", mmap_mode = 'r'),
+                np.load(prefix + "-indices.npy", mmap_mode = 'r'))
+
+    # Writing the graph; the indices file is renamed last and marks it as complete
+    def _save(self, fingerprint, graph):
+
+        if self.directory is None:
+            return
+
+        prefix = os.path.join(self.directory, f"{fingerprint}-k{graph[1].shape[1]}")
+        # Every writer gets its own temporary file, threads of one process included
+        for suffix, array in zip(("-distances.npy", "-indices.npy"), graph):
+            with tempfile.NamedTemporaryFile(dir = self.directory, suffix = ".tmp",
+                                             delete = False) as f:
+                np.save(f, array)
+            os.replace(f.name, prefix + suffix)
@@ -0,0 +1,77 @@
+# Loading dependencies
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+
+class Profiler:
+
+    # The fields of every record
+    fields = ("resampler", "stage", "seconds", "rows", "peak_bytes")
+
+    def __init__(self, callback=None, trace_memory=False):
+        """Record the wall time, row count and memory peak of each stage of a run.
+
+        Pass it to any resampler with profiler=..., one profiler can be
+        shared by several resamplers. The stages are the validation,
+        categorical detection, relevance function, sort, relevance
+        evaluation and bin discovery of the fit, and the sampling, bin std
+        (on the first noisy draw), noise and build stages of get().
+        Without a profiler, none of this is measured.
+
+        Args:
+            callback: Called with every record (a dict) as soon as its stage
+                ends, e.g. to push it to a metrics system.
+            trace_memory: Whether to record the tracemalloc peak of every
+                stage, in bytes above the memory in use when it started.
+                tracemalloc slows down allocations a lot while tracing.
+        """
+        if callback is not None and not callable(callback):
+            raise TypeError("The callback must be callable.")
+
+        self.callback = callback
+        self.trace_memory = trace_memory
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, rows=None, resampler=None):
+        """Time the code run inside the with block as one stage."""
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            elif hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            memory_at_start = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+
+            peak_bytes = None
+            if self.trace_memory:
+                peak_bytes = max(tracemalloc.get_traced_memory()[1] - memory_at_start, 0)
+                if started_tracing:
+                    tracemalloc.stop()
+
+            record = dict(zip(self.fields, (resampler, name, seconds, rows, peak_bytes)))
+            self.records.append(record)
+            if self.callback is not None:
+                self.callback(record)
+
+    # The records as a DataFrame, one row per stage
+    def to_pandas(self):
+        return pd.DataFrame(self.records, columns = list(self.fields))
+
+    # Total seconds spent in every stage
+    def summary(self):
+        return self.to_pandas().groupby(["resampler", "stage"], sort = False, dropna = False)["seconds"].sum()
+
+    # Forgetting the records
+    def reset(self):
+        self.records = []
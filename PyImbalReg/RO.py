@@ -1,6 +1,8 @@
 # Loading dependencies
-import pandas as pd
+from itertools import repeat
+
 from .DataHandler import DataHandler
+from .ResampleResult import ResampleResult
 
 class RandomOversampling(DataHandler):
 
@@ -10,7 +12,7 @@ class RandomOversampling(DataHandler):
         Ref: Branco et al., Neurocomputing 343, pp.76-99, 2019.
 
         Args:
-            df: Data as pandas DataFrame.
+            df: Data as a pandas or polars DataFrame, a pyarrow Table or a NumPy array.
             y_col_name: The name of the Y column header.
             rel_func: The relevance function.
             threshold: Threshold to determine the normal and rare samples.
@@ -18,24 +20,36 @@ class RandomOversampling(DataHandler):
         """
         super().__init__(**params)
 
-    def get(self):
-        """Return the oversampled DataFrame."""
-        oversampled_bins = []
+    def get(self, lazy=False):
+        """Return the oversampled DataFrame.
+
+        Args:
+            lazy: Whether to return a ResampleResult holding the row
+                positions instead of building the DataFrame.
+        """
+        rare_positions = [self.order[start:stop] for start, stop in self.rare_bins]
 
-        for rare_indices in self.rare_bins_indices:
-            df = self.df.loc[rare_indices, :]
-            oversample_df = df.sample(
-                frac=self.o_percentage - 1,
-                replace=True,
-                random_state=self.random_state,
+        with self._stage('sampling', len(self.df)):
+            # Every bin draws from its own child stream, whatever the number of workers
+            oversampled_positions = self._map_bins(
+                self._oversample_bin,
+                rare_positions,
+                repeat(self.o_percentage),
+                self.spawn_generators(len(rare_positions)),
             )
-            oversample_df.index = [
-                f"OverSampled-{i}-{x}" for i, x in enumerate(oversample_df.index)
-            ]
-            oversampled_bins += [oversample_df, df]
-
-        normal_bins = [
-            self.df.loc[normal_indices, :]
-            for normal_indices in self.normal_bins_indices
-        ]
-        return pd.concat(oversampled_bins + normal_bins)
\ No newline at end of file
+
+        segments = []
+        for positions, oversampled in zip(rare_positions, oversampled_positions):
+            segments += [(ResampleResult.OVERSAMPLED, oversampled),
+                         (ResampleResult.ORIGINAL, positions)]
+        segments += [(ResampleResult.ORIGINAL, self.order[start:stop])
+                        for start, stop in self.normal_bins]
+
+        result = ResampleResult.from_segments(self.state, segments)
+        return self._build(result, lazy)
+
+    @staticmethod
+    def _oversample_bin(positions, o_percentage, rng):
+        """Draw (o_percentage - 1) * len(positions) rows of one rare bin with replacement."""
+        n = round((o_percentage - 1) * len(positions))
+        return positions[rng.choice(len(positions), size=n, replace=True)]
@@ -1,6 +1,8 @@
 # Loading dependencies
-import pandas as pd
+from itertools import repeat
+
 from .DataHandler import DataHandler
+from .ResampleResult import ResampleResult
 
 class RandomUndersampling(DataHandler):
 
@@ -10,7 +12,7 @@ class RandomUndersampling(DataHandler):
         Ref: Branco et al., Neurocomputing 343, pp.76-99, 2019.
 
         Args:
-            df: Data as pandas DataFrame.
+            df: Data as a pandas or polars DataFrame, a pyarrow Table or a NumPy array.
             y_col_name: The name of the Y column header.
             rel_func: The relevance function.
             threshold: Threshold to determine the normal and rare samples.
@@ -18,19 +20,37 @@ class RandomUndersampling(DataHandler):
         """
         super().__init__(**params)
 
-    def get(self):
-        """Return the undersampled DataFrame."""
-        undersampled_bins = []
-        for normal_indices in self.normal_bins_indices:
-            df = self.df.loc[normal_indices, :]
-            undersampled_bins.append(
-                df.sample(
-                    frac=1 - self.u_percentage,
-                    random_state=self.random_state,
-                )
-            )
-        rare_bins = [
-            self.df.loc[rare_indices, :]
-            for rare_indices in self.rare_bins_indices
-        ]
-        return pd.concat(undersampled_bins + rare_bins)
\ No newline at end of file
+    def get(self, lazy=False):
+        """Return the undersampled DataFrame.
+
+        Args:
+            lazy: Whether to return a ResampleResult holding the row
+                positions instead of building the DataFrame.
+        """
+        with self._stage('sampling', len(self.df)):
+            segments = [(ResampleResult.ORIGINAL, positions)
+                            for positions in self._undersample_normal_bins()]
+        segments += [(ResampleResult.ORIGINAL, self.order[start:stop])
+                        for start, stop in self.rare_bins]
+
+        result = ResampleResult.from_segments(self.state, segments)
+        return self._build(result, lazy)
+
+    def _undersample_normal_bins(self):
+        """Return the source positions kept in each normal bin."""
+        normal_positions = [self.order[start:stop] for start, stop in self.normal_bins]
+
+        # Every bin draws from its own child stream, whatever the number of workers
+        undersampled_positions = self._map_bins(
+            self._undersample_bin,
+            normal_positions,
+            repeat(self.u_percentage),
+            self.spawn_generators(len(normal_positions)),
+        )
+        return undersampled_positions
+
+    @staticmethod
+    def _undersample_bin(positions, u_percentage, rng):
+        """Keep (1 - u_percentage) * len(positions) rows of one normal bin."""
+        n = round((1 - u_percentage) * len(positions))
+        return positions[rng.choice(len(positions), size=n, replace=False)]
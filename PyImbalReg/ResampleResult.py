@@ -0,0 +1,333 @@
+# Loading dependencies
+import numpy as np
+import pandas as pd
+
+from .containers import from_pandas
+
+
+class ResampleResult:
+
+    # The origin of the rows of a segment
+    ORIGINAL = 0
+    OVERSAMPLED = 1
+    UNDERSAMPLED = 2
+    NOISY = 3
+    INTERPOLATED = 4
+
+    # The origins whose rows are built from a source row plus an offset block
+    synthetic_kinds = (NOISY, INTERPOLATED)
+
+    # The origin level of the provenance index
+    origins = pd.Index([ORIGINAL, OVERSAMPLED, UNDERSAMPLED, NOISY, INTERPOLATED], dtype = np.int8)
+
+    # The index label prefix of the rows drawn by the resamplers, for string labels
+    label_prefixes = {OVERSAMPLED: "OverSampled", UNDERSAMPLED: "UnderSampled", NOISY: "GN",
+                      INTERPOLATED: "SmoteR"}
+
+    def __init__(self, **params):
+        """The output of a resampler as row positions, built into a table on request.
+
+        The rows are stored as segments of one origin each: copies of the
+        source rows (original, oversampled or undersampled) only keep
+        their positions in the source. The noisy rows of GN and GNHF and
+        the interpolated rows of SmoteR keep the position of their source
+        row, the offset of their numeric columns from it (the noise block)
+        and the codes of their categorical columns.
+
+        Args:
+            state: The FittedState of the resampler.
+            positions: int64 source positions of the output rows.
+            bounds: int64 start offsets of the segments, followed by the
+                number of rows.
+            kinds: int8 origin of the rows of each segment.
+            label_starts: int64 counter of the first index label of each
+                segment.
+            noise: (m, k) float64 offsets of the numeric columns of the
+                synthetic rows, or None if the resampler makes none.
+            codes: (m, c) int codes of the categorical columns of the
+                synthetic rows, or None if the resampler makes none.
+            feature_noise: (m, f) CSR offsets of the sparse features of the
+                synthetic rows, when the input is a sparse matrix.
+        """
+        self.state = params.pop("state", None)
+        self.positions = params.pop("positions", None)
+        self.bounds = params.pop("bounds", None)
+        self.kinds = params.pop("kinds", None)
+        self.label_starts = params.pop("label_starts", None)
+        self.noise = params.pop("noise", None)
+        self.codes = params.pop("codes", None)
+        self.feature_noise = params.pop("feature_noise", None)
+
+    # Building the result from a list of (kind, positions[, noise, codes[, feature_noise]]) segments
+    @classmethod
+    def from_segments(cls, state, segments, noisy=False):
+
+        segments = [segment for segment in segments if len(segment[1])]
+        lengths = np.array([len(segment[1]) for segment in segments], dtype = np.int64)
+
+        params = {
+            "state": state,
+            "positions": np.concatenate([segment[1] for segment in segments]
+                                        + [np.empty(0, dtype = np.int64)]).astype(np.int64),
+            "bounds": np.concatenate(([0], np.cumsum(lengths))).astype(np.int64),
+            "kinds": np.array([segment[0] for segment in segments], dtype = np.int8),
+            "label_starts": np.zeros(len(segments), dtype = np.int64),
+        }
+
+        if noisy:
+            numeric_columns = [col for col in state.columns if col not in state.categorical_columns]
+            # The empty block only stands in when there is none, to keep the noise dtype
+            params["noise"] = np.concatenate(
+                [segment[2] for segment in segments if segment[0] in cls.synthetic_kinds]
+                or [np.empty((0, len(numeric_columns)))])
+            params["codes"] = np.concatenate(
+                [segment[3] for segment in segments if segment[0] in cls.synthetic_kinds]
+                or [np.empty((0, len(state.categories)), dtype = np.int64)])
+
+            # The offsets of a sparse matrix are sparse too, with the rows of their sources
+            if state.features is not None:
+                from scipy import sparse
+
+                params["feature_noise"] = sparse.vstack(
+                    [segment[4] for segment in segments if segment[0] in cls.synthetic_kinds]
+                    + [sparse.csr_matrix((0, state.features.shape[1]))], format = "csr")
+
+        return cls(**params)
+
+    def __len__(self):
+        return len(self.positions)
+
+    # Slicing the rows without building the table
+    def __getitem__(self, key):
+
+        if not isinstance(key, slice) or key.step not in (None, 1):
+            raise TypeError("A ResampleResult can only be sliced with a step of 1.")
+
+        start, stop, _ = key.indices(len(self))
+        stop = max(start, stop)
+
+        starts = np.clip(self.bounds[:-1], start, stop)
+        stops = np.clip(self.bounds[1:], start, stop)
+        kept = stops > starts
+
+        params = {
+            "state": self.state,
+            "positions": self.positions[start:stop],
+            "bounds": np.concatenate(([0], np.cumsum(stops[kept] - starts[kept]))),
+            "kinds": self.kinds[kept],
+            "label_starts": (self.label_starts + starts - self.bounds[:-1])[kept],
+        }
+
+        if self.noise is not None:
+            noise_start, noise_stop = self._noisy_rows_before(start), self._noisy_rows_before(stop)
+            params["noise"] = self.noise[noise_start:noise_stop]
+            params["codes"] = self.codes[noise_start:noise_stop]
+            if self.feature_noise is not None:
+                params["feature_noise"] = self.feature_noise[noise_start:noise_stop]
+
+        return type(self)(**params)
+
+    # The origin of every output row
+    @property
+    def kind(self):
+        return np.repeat(self.kinds, np.diff(self.bounds))
+
+    # The source positions of the rows drawn by the resampler
+    @property
+    def synthetic_positions(self):
+        return self.positions[self.kind != self.ORIGINAL]
+
+    # (origin, source_position) index built from the codes, without factorizing
+    @classmethod
+    def provenance_index(cls, kind, positions, n_source):
+        return pd.MultiIndex(levels = [cls.origins, pd.RangeIndex(n_source)],
+                             codes = [kind, positions],
+                             names = ["origin", "source_position"],
+                             verify_integrity = False)
+
+    def to_pandas(self, index_labels='provenance'):
+        """Build the resampled DataFrame.
+
+        Args:
+            index_labels: 'provenance' for an (origin, source_position)
+                MultiIndex, or 'string' for the original labels of the
+                source rows and "OverSampled-{i}-{label}" style labels for
+                the drawn rows.
+        """
+        if self.state.features is not None:
+            raise TypeError("The result of a sparse matrix is built with to_sparse().")
+
+        provenance = index_labels == 'provenance'
+        dtypes = self._output_dtypes()
+        frames = []
+        noise_start = 0
+
+        for kind, label_start, start, stop in zip(self.kinds, self.label_starts,
+                                                  self.bounds[:-1], self.bounds[1:]):
+            positions = self.positions[start:stop]
+
+            if kind in self.synthetic_kinds:
+                noise_stop = noise_start + len(positions)
+                df = self._build_noisy(positions, self.noise[noise_start:noise_stop],
+                                       self.codes[noise_start:noise_stop])
+                noise_start = noise_stop
+            else:
+                df = self._take(positions)
+
+            if kind != self.ORIGINAL and not provenance:
+                labels = df.index if kind not in self.synthetic_kinds \
+                            else range(label_start, label_start + len(df))
+                df.index = [f"{self.label_prefixes[kind]}-{i}-{x}"
+                            for i, x in enumerate(labels, start = label_start)]
+
+            frames.append(self._as_output(df, dtypes))
+
+        df = pd.concat(frames, ignore_index = provenance) if frames \
+                else self._as_output(self._take(np.empty(0, dtype = np.int64)), dtypes)
+        if provenance:
+            df.index = self.provenance_index(self.kind, self.positions, len(self.state.df))
+
+        # Every frame already has the dtypes of the policy
+        if self.noise is None or dtypes is not None:
+            return df
+
+        dtypes = {col: pd.CategoricalDtype(categories)
+                    for col, categories in self.state.categories.items()}
+        return df.astype(dtypes) if dtypes else df
+
+    def to_native(self, index_labels='provenance'):
+        """Build the resampled rows in the container type of the resampler's input."""
+        if self.state.container == "sparse":
+            return self.to_sparse()
+        return from_pandas(self.to_pandas(index_labels), self.state.container)
+
+    def to_sparse(self):
+        """Build the resampled rows of a sparse matrix input, without densifying it.
+
+        Returns:
+            The CSR matrix of the features, gathered row by row from the
+            source, with the sparse offsets added to the synthetic rows,
+            and the target array.
+        """
+        if self.state.features is None:
+            raise TypeError("Only the result of a sparse matrix can be built with to_sparse().")
+
+        X = self.state.features[self.positions]
+        y = self.state.df.iloc[:, 0].to_numpy()[self.positions]
+        if self.noise is None or not len(self.noise):
+            return self._as_sparse_output(X, y)
+
+        from scipy import sparse
+
+        # Every offset row is moved to the output row of its synthetic case
+        synthetic = np.flatnonzero(np.isin(self.kind, self.synthetic_kinds))
+        placement = sparse.csr_matrix((np.ones(len(synthetic)), (synthetic, np.arange(len(synthetic)))),
+                                      shape = (len(self), len(synthetic)))
+
+        y = y.astype(self.noise.dtype)
+        y[synthetic] += self.noise[:, -1]
+        return self._as_sparse_output((X + placement @ self.feature_noise).tocsr(), y)
+
+    def to_numpy(self, dtype=None):
+        """Build the resampled rows as a NumPy array."""
+        return self.to_pandas().to_numpy(dtype = dtype)
+
+    def to_arrow(self):
+        """Build the resampled rows as a pyarrow Table, without the index."""
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError("Building an Arrow table requires pyarrow.") from e
+
+        return pa.Table.from_pandas(self.to_pandas(), preserve_index = False)
+
+    # Gathering source rows in the output column order
+    def _take(self, positions):
+        if self.state.column_positions is None:
+            return self.state.df.take(positions)
+        return self.state.df.iloc[positions, self.state.column_positions]
+
+    # Adding the offsets to the numeric columns of the source rows
+    def _build_noisy(self, positions, noise, codes):
+
+        numeric_columns = [col for col in self.state.columns
+                            if col not in self.state.categorical_columns]
+        values = self.state.df.iloc[positions, self.state.df.columns.get_indexer(numeric_columns)] \
+                    .to_numpy(dtype = noise.dtype) + noise
+
+        data = {col: values[:, j] for j, col in enumerate(numeric_columns)}
+        for j, (col, categories) in enumerate(self.state.categories.items()):
+            data[col] = pd.Categorical.from_codes(codes[:, j], categories = categories)
+
+        return pd.DataFrame(data, columns = self.state.columns)
+
+    # The output dtype of every column under the dtype policy, or None without one
+    def _output_dtypes(self):
+
+        if self.state.dtype_policy is None:
+            return None
+
+        df = self.state.df
+        categories = self.state.categories or {}
+        dtypes = {}
+        for col in self.state.columns:
+            dtype = df[col].dtype
+
+            # Categorical columns are dictionary-encoded with the fitted categories
+            if col in self.state.categorical_columns:
+                if col in categories:
+                    dtype = pd.CategoricalDtype(categories[col])
+                elif not isinstance(dtype, pd.CategoricalDtype):
+                    dtype = pd.CategoricalDtype(pd.unique(df[col]))
+
+            # Only wider floats are downcast; integer columns keep their dtype
+            elif self.state.dtype_policy == 'float32' and self._is_number(dtype) \
+                    and dtype.kind == 'f' and dtype.itemsize > 4:
+                dtype = np.dtype(np.float32)
+
+            dtypes[col] = dtype
+
+        return dtypes
+
+    # Casting a frame to the output dtypes
+    @classmethod
+    def _as_output(cls, df, dtypes):
+
+        if dtypes is None:
+            return df
+
+        # The noisy values of integer columns are rounded, not truncated
+        for col, dtype in dtypes.items():
+            if cls._is_number(dtype) and dtype.kind in 'iu' and df[col].dtype.kind == 'f':
+                df[col] = np.rint(df[col].to_numpy())
+
+        return df.astype(dtypes)
+
+    # Casting the matrix and the target of a sparse input to the output dtypes
+    def _as_sparse_output(self, X, y):
+
+        if self.state.dtype_policy is None:
+            return X, y
+
+        # As for tables, 'float32' only downcasts wider floats
+        x_dtype, y_dtype = self.state.features.dtype, self.state.df.dtypes.iloc[0]
+        if self.state.dtype_policy == 'float32':
+            x_dtype, y_dtype = [np.dtype(np.float32) if dtype.kind == 'f' else dtype
+                                for dtype in (x_dtype, y_dtype)]
+
+        if x_dtype.kind in 'iu' and X.dtype.kind == 'f':
+            X.data = np.rint(X.data)
+        if y_dtype.kind in 'iu' and y.dtype.kind == 'f':
+            y = np.rint(y)
+
+        return X.astype(x_dtype), y.astype(y_dtype)
+
+    # Whether a dtype is a NumPy integer or float dtype
+    @staticmethod
+    def _is_number(dtype):
+        return isinstance(dtype, np.dtype) and dtype.kind in 'iuf'
+
+    # Number of synthetic rows before an output offset
+    def _noisy_rows_before(self, offset):
+        lengths = np.clip(offset - self.bounds[:-1], 0, np.diff(self.bounds))
+        return int(lengths[np.isin(self.kinds, self.synthetic_kinds)].sum())
@@ -0,0 +1,161 @@
+# Loading dependencies
+from itertools import repeat
+
+import numpy as np
+
+from .GN import GaussianNoise
+from .ResampleResult import ResampleResult
+from .RU import RandomUndersampling
+from .SmoteR import SmoteR
+
+class SMOGN(SmoteR):
+
+    def __init__(self, **params):
+        """Undersample normal cases and oversample rare cases by interpolation or Gaussian noise.
+
+        Ref: Branco et al., LIDTA 2017, PMLR 74, pp.36-50.
+
+        Every rare case seeds (o_percentage - 1) new cases on average, each
+        with one of the k nearest neighbours of the seed in its rare bin.
+        The safe distance of a seed is half the median distance to its k
+        neighbours. A neighbour within the safe distance is interpolated
+        with as in SmoteR; otherwise the seed gets Gaussian noise as in GN,
+        scaled by the bin std times min(safe distance, perm_amp), and
+        categorical values drawn with their bin frequencies. Distances are
+        measured on the numeric columns scaled by their range.
+
+        Args:
+            df: Data as a pandas or polars DataFrame, a pyarrow Table or a NumPy array.
+            y_col_name: The name of the Y column header.
+            rel_func: The relevance function.
+            threshold: Threshold to determine the normal and rare samples.
+            u_percentage: Fraction of normal samples removed.
+            o_percentage: Oversampling factor for rare samples.
+            perm_amp: Largest noise scale, as a fraction of the bin std.
+            k: Number of nearest neighbours.
+            categorical_columns: Columns treated as categorical.
+            n_jobs: Number of workers, -1 for all CPUs.
+            neighbor_cache: A NeighborCache, or a directory to keep the
+                neighbour graphs in as memory-mapped .npy files.
+        """
+        super().__init__(**params)
+
+    def get(self, lazy=False):
+        """Return the resampled DataFrame (undersampled normal + SMOGN oversampled rare).
+
+        Args:
+            lazy: Whether to return a ResampleResult holding the row
+                positions and the offsets of the new cases instead of
+                building the DataFrame.
+        """
+        # Sharing the fitted state, so only the undersampling draw is done
+        ru = RandomUndersampling(
+            state=self.state,
+            u_percentage=self.u_percentage,
+            n_jobs=self.n_jobs,
+            executor=self.executor,
+            index_labels=self.index_labels,
+            random_state=self.spawn_seed_sequences(1)[0],
+        )
+        with self._stage('undersampling', len(self.df)):
+            segments = [(ResampleResult.ORIGINAL, positions)
+                            for positions in ru._undersample_normal_bins()]
+        self.get_rare_bins_std()
+        segments += self._oversample_with_SMOGN()
+
+        result = ResampleResult.from_segments(self.state, segments, noisy=True)
+        return self._build(result, lazy)
+
+    def _oversample_with_SMOGN(self):
+        """Oversample rare bins by interpolation or Gaussian noise, as result segments."""
+        codes, categories = self.get_categorical_codes()
+        n_categories = np.array([len(cats) for cats in categories.values()], dtype=np.int64)
+        numeric_columns = [col for col in self.columns if col not in self.categorical_columns]
+        scale = self.get_feature_scale()
+
+        rare_positions = [self.order[start:stop] for start, stop in self.rare_bins]
+        values = self._numeric_values(rare_positions)
+        n_rare = int(np.diff(self.rare_bins, axis=1).sum())
+
+        # The neighbour searches run one after the other with n_jobs query workers
+        with self._stage('neighbours', n_rare):
+            graphs = [self.neighbor_cache.get(bin_values[:, :-1] / scale, self.k, self.n_jobs)
+                        for bin_values in values]
+
+        # Every bin draws from its own child stream, whatever the number of workers
+        with self._stage('generation', n_rare):
+            new_bins = self._map_bins(
+                self._smogn_bin,
+                values,
+                graphs,
+                [np.asarray(std[numeric_columns], dtype=np.float64) for std in self.get_rare_bins_std()],
+                [codes[positions] for positions in rare_positions],
+                repeat(n_categories),
+                repeat(self.o_percentage),
+                repeat(self.perm_amp),
+                self.spawn_generators(len(rare_positions)),
+            )
+
+        segments = []
+        for positions, (interpolated, noisy) in zip(rare_positions, new_bins):
+            segments += [(ResampleResult.ORIGINAL, positions),
+                         (ResampleResult.INTERPOLATED, positions[interpolated[0]]) + interpolated[1:],
+                         (ResampleResult.NOISY, positions[noisy[0]]) + noisy[1:]]
+
+        return segments
+
+    @staticmethod
+    def _smogn_bin(values, graph, std, codes, n_categories, o_percentage, perm_amp, rng):
+        """Generate the SMOGN cases of one rare bin in vectorized blocks.
+
+        Args:
+            values: (m, f + 1) numeric columns of the bin, with Y last.
+            graph: (m, k) distances and positions in the bin of the nearest neighbours.
+            std: Std of the numeric columns of the bin.
+            codes: (m, c) codes of the categorical columns of the bin.
+            n_categories: Number of categories of each of the c columns.
+            o_percentage: Oversampling factor.
+            perm_amp: Largest noise scale, as a fraction of std.
+            rng: The np.random.Generator to draw from.
+
+        Returns:
+            The seeds (offsets into the bin), numeric offsets from their
+            seeds and categorical codes of the interpolated cases, and the
+            same for the noisy cases.
+        """
+        distances, neighbours = graph
+        m, k = neighbours.shape
+        n = int((o_percentage - 1) * m)
+
+        # Every case seeds the same number of new cases, the remainder at random
+        per_case, remainder = divmod(n, m) if m else (0, 0)
+        seeds = np.concatenate((np.repeat(np.arange(m), per_case),
+                                rng.choice(m, size=remainder, replace=False)))
+
+        # A case alone in its bin has no neighbour and always gets noise
+        if k == 0:
+            safe_distance = np.full(m, np.inf)
+            interpolate = np.zeros(n, dtype=bool)
+        else:
+            safe_distance = np.median(distances, axis=1) / 2
+            picked = rng.integers(0, k, size=n)
+            interpolate = distances[seeds, picked] < safe_distance[seeds]
+
+        # Interpolation between the seed and its neighbour, Y included
+        close = seeds[interpolate]
+        if k > 0:
+            chosen = neighbours[close, picked[interpolate]]
+            offsets = values[chosen] - values[close]
+            offsets *= rng.random(len(close))[:, None]
+            from_seed = rng.random((len(close), codes.shape[1])) < 0.5
+            interpolated_codes = np.where(from_seed, codes[close], codes[chosen])
+        else:
+            offsets, interpolated_codes = np.empty((0, values.shape[1]), dtype=values.dtype), codes[close]
+
+        # Gaussian noise for the seeds whose neighbour is too far
+        far = seeds[~interpolate]
+        noise = rng.standard_normal(size=(len(far), len(std)), dtype=values.dtype)
+        noise *= (std * np.minimum(safe_distance[far], perm_amp)[:, None]).astype(values.dtype)
+        noisy_codes = GaussianNoise._sample_categorical_codes(codes, n_categories, len(far), rng)
+
+        return (close, offsets, interpolated_codes), (far, noise, noisy_codes)
@@ -0,0 +1,193 @@
+# Loading dependencies
+import os
+
+import numpy as np
+
+from .DataHandler import DataHandler
+from .NeighborCache import NeighborCache
+from .ResampleResult import ResampleResult
+from .RU import RandomUndersampling
+
+class SmoteR(DataHandler):
+
+    def __init__(self, **params):
+        """Undersample normal cases and oversample rare cases by interpolation.
+
+        Ref: Torgo et al., EPIA 2013, LNCS 8154, pp.378-389.
+
+        Every rare case seeds (o_percentage - 1) new cases on average. A new
+        case lies on the segment between its seed and one of the k nearest
+        neighbours of the seed in the same rare bin; its categorical values
+        are taken from either of the two, and its target is the average of
+        their targets weighted by the inverse distances to the new case.
+        The neighbours are found with a cKDTree over the numeric columns
+        scaled by their range (the numeric part of the HEOM distance of
+        the paper); categorical columns are not used for the search. The
+        neighbour graphs come from a NeighborCache, so a rare bin seen
+        before is not searched again.
+
+        Args:
+            df: Data as a pandas or polars DataFrame, a pyarrow Table or a NumPy array.
+            y_col_name: The name of the Y column header.
+            rel_func: The relevance function.
+            threshold: Threshold to determine the normal and rare samples.
+            u_percentage: Fraction of normal samples removed.
+            o_percentage: Oversampling factor for rare samples.
+            k: Number of nearest neighbours to interpolate with.
+            categorical_columns: Columns treated as categorical.
+            n_jobs: Number of workers of the neighbour queries, -1 for all CPUs.
+            neighbor_cache: A NeighborCache, or a directory to keep the
+                neighbour graphs in as memory-mapped .npy files. By default
+                the graphs are kept in memory by this resampler.
+        """
+        k = params.pop("k", 5)
+        if not isinstance(k, int) or isinstance(k, bool) or k < 1:
+            raise ValueError("The k must be a positive integer")
+        self.k = k
+
+        neighbor_cache = params.pop("neighbor_cache", None)
+        if neighbor_cache is None or isinstance(neighbor_cache, (str, os.PathLike)):
+            neighbor_cache = NeighborCache(neighbor_cache)
+        elif not isinstance(neighbor_cache, NeighborCache):
+            raise TypeError("The neighbor_cache must be a NeighborCache or a directory path")
+        self.neighbor_cache = neighbor_cache
+
+        super().__init__(**params)
+
+        # Distances between sparse rows would need the dense features
+        if self.features is not None:
+            raise TypeError(f"{type(self).__name__} does not support sparse matrices.")
+
+    def get(self, lazy=False):
+        """Return the resampled DataFrame (undersampled normal + SmoteR oversampled rare).
+
+        Args:
+            lazy: Whether to return a ResampleResult holding the row
+                positions and the interpolation offsets instead of building
+                the DataFrame.
+        """
+        # Sharing the fitted state, so only the undersampling draw is done
+        ru = RandomUndersampling(
+            state=self.state,
+            u_percentage=self.u_percentage,
+            n_jobs=self.n_jobs,
+            executor=self.executor,
+            index_labels=self.index_labels,
+            random_state=self.spawn_seed_sequences(1)[0],
+        )
+        with self._stage('undersampling', len(self.df)):
+            segments = [(ResampleResult.ORIGINAL, positions)
+                            for positions in ru._undersample_normal_bins()]
+        with self._stage('interpolation', int(np.diff(self.rare_bins, axis=1).sum())):
+            segments += self._oversample_with_SmoteR()
+
+        result = ResampleResult.from_segments(self.state, segments, noisy=True)
+        return self._build(result, lazy)
+
+    # Children share k and the neighbour cache
+    def spawn(self, n_children):
+        children = super().spawn(n_children)
+        for child in children:
+            child.k, child.neighbor_cache = self.k, self.neighbor_cache
+        return children
+
+    def _oversample_with_SmoteR(self):
+        """Oversample rare bins by interpolating between neighbours, as result segments."""
+        codes, categories = self.get_categorical_codes()
+        scale = self.get_feature_scale()
+
+        rare_positions = [self.order[start:stop] for start, stop in self.rare_bins]
+        generators = self.spawn_generators(len(rare_positions))
+
+        # The bins run one after the other; n_jobs goes to the neighbour queries
+        segments = []
+        for positions, bin_values, rng in zip(rare_positions, self._numeric_values(rare_positions),
+                                              generators):
+            _, neighbours = self.neighbor_cache.get(bin_values[:, :-1] / scale, self.k, self.n_jobs)
+            seeds, offsets, sampled_codes = self._interpolate_bin(
+                bin_values,
+                neighbours,
+                codes[positions],
+                self.o_percentage,
+                rng,
+            )
+            segments += [(ResampleResult.ORIGINAL, positions),
+                         (ResampleResult.INTERPOLATED, positions[seeds], offsets, sampled_codes)]
+
+        return segments
+
+    def _numeric_values(self, rare_positions):
+        """Return the numeric columns of every rare bin in output order, Y last.
+
+        Only the rows of the rare bins are gathered, column by column, so
+        the normal rows are never copied.
+
+        Args:
+            rare_positions: int64 positions in df of the rows of each rare bin.
+        """
+        numeric_columns = [col for col in self.columns if col not in self.categorical_columns]
+        positions = np.concatenate(list(rare_positions) + [np.empty(0, dtype=np.int64)])
+
+        values = np.empty((len(positions), len(numeric_columns)), dtype=self.noise_dtype)
+        for i, col in enumerate(numeric_columns):
+            values[:, i] = self.df[col].to_numpy()[positions]
+
+        return np.split(values, np.cumsum([len(bin_positions) for bin_positions in rare_positions])[:-1])
+
+    # Range of the numeric features over all rows, once per fitted state
+    def get_feature_scale(self):
+
+        if self.state.feature_scale is None:
+            features = [col for col in self.columns[:-1] if col not in self.categorical_columns]
+            scale = np.array([float(self.df[col].max()) - float(self.df[col].min()) for col in features])
+            scale[scale == 0] = 1
+            self.state.feature_scale = scale.astype(self.noise_dtype)
+
+        self.feature_scale = self.state.feature_scale
+
+        return self.feature_scale
+
+    @staticmethod
+    def _interpolate_bin(values, neighbours, codes, o_percentage, rng):
+        """Generate the SmoteR cases of one rare bin in vectorized blocks.
+
+        Args:
+            values: (m, f + 1) numeric columns of the bin, with Y last.
+            neighbours: (m, k) positions in the bin of the nearest neighbours.
+            codes: (m, c) codes of the categorical columns of the bin.
+            o_percentage: Oversampling factor.
+            rng: The np.random.Generator to draw from.
+
+        Returns:
+            The seed of every new case (offsets into the bin), the (n, f + 1)
+            offsets of their numeric columns from their seeds and their
+            (n, c) categorical codes.
+        """
+        m = len(values)
+        n = int((o_percentage - 1) * m)
+
+        # Every case seeds the same number of new cases, the remainder at random
+        per_case, remainder = divmod(n, m) if m else (0, 0)
+        seeds = np.concatenate((np.repeat(np.arange(m), per_case),
+                                rng.choice(m, size=remainder, replace=False)))
+
+        # A case alone in its bin has no neighbour
+        k = neighbours.shape[1]
+        if k == 0:
+            return seeds, np.zeros((n, values.shape[1]), dtype=values.dtype), codes[seeds]
+
+        chosen = neighbours[seeds, rng.integers(0, k, size=n)]
+        gap = rng.random(n)
+
+        # The new features lie on the segment from the seed to its neighbour. With ...
+        # ... d1 = gap * d and d2 = (1 - gap) * d the distances of the new case to ...
+        # ... them, the target (d2 * y_seed + d1 * y_neighbour) / (d1 + d2) is ...
+        # ... y_seed + gap * (y_neighbour - y_seed), so Y gets the same offset
+        offsets = values[chosen] - values[seeds]
+        offsets *= gap[:, None]
+
+        # Each categorical value comes from the seed or the neighbour
+        from_seed = rng.random((n, codes.shape[1])) < 0.5
+        sampled_codes = np.where(from_seed, codes[seeds], codes[chosen])
+
+        return seeds, offsets, sampled_codes
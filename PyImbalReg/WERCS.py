@@ -1,6 +1,7 @@
 # Loading dependencies
-import pandas as pd
+import numpy as np
 from .DataHandler import DataHandler
+from .ResampleResult import ResampleResult
 
 class WERCS(DataHandler):
 
@@ -10,7 +11,7 @@ class WERCS(DataHandler):
         Ref: Branco et al., Neurocomputing 343, pp.76-99, 2019.
 
         Args:
-            df: Data as pandas DataFrame.
+            df: Data as a pandas or polars DataFrame, a pyarrow Table or a NumPy array.
             y_col_name: The name of the Y column header.
             rel_func: The relevance function.
             threshold: Threshold for rare vs normal.
@@ -19,24 +20,34 @@ class WERCS(DataHandler):
         """
         super().__init__(**params)
 
-    def get(self):
-        """Return the combined DataFrame (original + oversampled + undersampled)."""
-        oversample_df = self.df.sample(
-            frac=self.o_percentage - 1,
-            replace=True,
-            weights=self.Y_utility,
-            random_state=self.random_state,
-        )
-        oversample_df.index = [
-            f"OverSampled-{i}-{x}" for i, x in enumerate(oversample_df.index)
-        ]
-        undersample_df = self.df.sample(
-            frac=1 - self.u_percentage,
-            replace=True,
-            weights=1 - self.Y_utility,
-            random_state=self.random_state,
-        )
-        undersample_df.index = [
-            f"UnderSampled-{i}-{x}" for i, x in enumerate(undersample_df.index)
-        ]
-        return pd.concat([self.df, oversample_df, undersample_df])
\ No newline at end of file
+    def get(self, lazy=False):
+        """Return the combined DataFrame (original + oversampled + undersampled).
+
+        Args:
+            lazy: Whether to return a ResampleResult holding the row
+                positions instead of building the DataFrame.
+        """
+        # Sampling row positions, so only the output rows are copied
+        n = len(self.df)
+        utility = self.Y_utility.values
+
+        with self._stage('sampling', n):
+            oversampled = self.rng.choice(
+                n,
+                size=round((self.o_percentage - 1) * n),
+                replace=True,
+                p=utility / utility.sum(),
+            )
+            undersampled = self.rng.choice(
+                n,
+                size=round((1 - self.u_percentage) * n),
+                replace=True,
+                p=(1 - utility) / (1 - utility).sum(),
+            )
+
+        result = ResampleResult.from_segments(self.state, [
+            (ResampleResult.ORIGINAL, np.arange(n)),
+            (ResampleResult.OVERSAMPLED, oversampled),
+            (ResampleResult.UNDERSAMPLED, undersampled),
+        ])
+        return self._build(result, lazy)
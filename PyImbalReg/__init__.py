@@ -2,21 +2,44 @@
 
 __version__ = "0.0.3"
 
+from .ChunkedResampler import ChunkedResampler
+from .ChunkedWERCS import ChunkedWERCS
+from .ChunkReader import ChunkReader
 from .DataHandler import DataHandler
+from .FittedState import FittedState
 from .GNHF import GNHF
 from .GN import GaussianNoise
+from .NeighborCache import NeighborCache
+from .Profiler import Profiler
 from .RO import RandomOversampling
 from .RU import RandomUndersampling
+from .ResampleResult import ResampleResult
+from .SMOGN import SMOGN
+from .SmoteR import SmoteR
 from .WERCS import WERCS
-from .train_test_split import train_test_split
+from .relevance import boxplot_control_points, pchip_relevance, vectorized_relevance
+from .train_test_split import StratifiedKFold, train_test_split
 
 __all__ = [
+    "ChunkReader",
+    "ChunkedResampler",
+    "ChunkedWERCS",
     "DataHandler",
+    "FittedState",
     "GNHF",
     "GaussianNoise",
+    "NeighborCache",
+    "Profiler",
     "RandomOversampling",
     "RandomUndersampling",
+    "ResampleResult",
+    "SMOGN",
+    "SmoteR",
+    "StratifiedKFold",
     "WERCS",
+    "boxplot_control_points",
+    "pchip_relevance",
     "train_test_split",
+    "vectorized_relevance",
     "__version__",
 ]
\ No newline at end of file
@@ -0,0 +1,89 @@
+"""Input and output containers other than pandas DataFrames.
+
+NumPy 2-D and structured arrays, pyarrow Tables and polars DataFrames
+are wrapped in a pandas DataFrame whose columns are views of their
+buffers, so the data is not copied: sampling and gathers read the
+original memory. Numeric columns without nulls are always zero-copy;
+string columns of Arrow data are converted. The resampled output is
+turned back into the container type of the input.
+
+scipy.sparse matrices are not wrapped: they are kept as CSR next to a
+one-column DataFrame of the target, and the output is a (CSR, target)
+pair built with row gathers, see ResampleResult.to_sparse.
+
+pyarrow, polars and scipy.sparse are only imported when such an input is
+given; their inputs are recognized by the module of their type.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def get_container(data):
+    """Return 'pandas', 'numpy', 'structured', 'arrow', 'polars' or 'sparse', or None if unsupported."""
+    if isinstance(data, pd.DataFrame):
+        return "pandas"
+    if isinstance(data, np.ndarray) and data.ndim == 2 and data.dtype.names is None:
+        return "numpy"
+    if isinstance(data, np.ndarray) and data.ndim == 1 and data.dtype.names is not None:
+        return "structured"
+
+    # The optional containers are recognized by module, without importing it
+    if type(data).__module__.startswith("scipy.sparse."):
+        from scipy import sparse
+
+        if sparse.issparse(data) and data.ndim == 2:
+            return "sparse"
+
+    module = type(data).__module__.split(".")[0]
+    if module == "pyarrow" and type(data).__name__ == "Table":
+        return "arrow"
+    if module == "polars" and type(data).__name__ == "DataFrame":
+        return "polars"
+
+    return None
+
+
+def to_pandas(data, container):
+    """Wrap a supported input in a pandas DataFrame without copying it.
+
+    2-D arrays get the column positions as column names; structured
+    arrays keep their field names.
+    """
+    if container == "pandas":
+        return data
+
+    if container == "numpy":
+        return pd.DataFrame(data, copy=False)
+    if container == "structured":
+        return pd.DataFrame({name: data[name] for name in data.dtype.names}, copy=False)
+
+    # Every column is its own block, so numeric columns stay views of the Arrow buffers
+    table = data if container == "arrow" else data.to_arrow()
+    return table.to_pandas(split_blocks=True)
+
+
+def from_pandas(df, container):
+    """Turn a resampled DataFrame back into the container type of the input.
+
+    The index does not exist in the other containers and is dropped. A
+    2-D array gets its columns back in the input order, Y included.
+    """
+    if container == "pandas":
+        return df
+
+    # The column names are the positions in the input array
+    if container == "numpy":
+        return df.loc[:, np.sort(df.columns.to_numpy())].to_numpy()
+    if container == "structured":
+        return df.to_records(index=False).view(np.ndarray)
+
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if container == "arrow":
+        return table
+
+    import polars as pl
+
+    return pl.from_arrow(table)
@@ -0,0 +1,365 @@
+"""Relevance functions for imbalanced regression.
+
+A relevance function maps the target Y to [0, 1]; values above the
+threshold are treated as rare. Functions may be written for a single
+scalar or for a whole NumPy array. Array-aware functions are declared
+with the ``vectorized_relevance`` decorator (or a ``vectorized = True``
+attribute) and are evaluated with one call over the whole target column.
+
+Besides the normal-pdf default, the relevance can be a piecewise cubic
+Hermite interpolation (PCHIP) over control points, the usual relevance
+of imbalanced regression, with control points given by the user or
+derived from the median and the adjusted boxplot of the target.
+
+Ref: Branco et al., Neurocomputing 343, pp.76-99, 2019.
+Ref: Ribeiro, PhD thesis, University of Porto, 2011.
+Ref: Hubert and Vandervieren, Comput. Stat. Data Anal. 52, pp.5186-5201, 2008.
+"""
+
+import numpy as np
+
+
+# Number of target values used to probe an undeclared relevance function
+_PROBE_SIZE = 8
+
+# Number of targets the medcouple is computed on, and the seed of their sample
+_SKETCH_SIZE = 5001
+_SKETCH_SEED = 0
+
+# Largest number of control points located by comparisons instead of a binary search
+_MAX_LINEAR_KNOTS = 8
+
+
+def vectorized_relevance(func):
+    """Mark a relevance function as array in, array out.
+
+    Args:
+        func: Callable taking a 1-D NumPy array of targets and returning
+            an array of the same shape with values in [0, 1].
+
+    Returns:
+        The same callable with ``vectorized = True`` set on it.
+    """
+    func.vectorized = True
+    return func
+
+
+def is_vectorized(func):
+    """Return True if the relevance function is declared as vectorized."""
+    return bool(getattr(func, "vectorized", False))
+
+
+def default_relevance(average, std):
+    """Build the default relevance function for a target distribution.
+
+    The relevance is one minus the normal pdf scaled to 1 at the mean,
+    which in closed form is 1 - exp(-(x - average)^2 / (2 std^2)).
+
+    Args:
+        average: Mean of the target.
+        std: Standard deviation of the target.
+
+    Returns:
+        A vectorized relevance function.
+    """
+    scale = 1 / (2 * std ** 2) if std != 0 else np.inf
+
+    @vectorized_relevance
+    def default_rel_func(x):
+        with np.errstate(invalid="ignore"):
+            return 1 - np.exp(-np.square(np.asarray(x) - average) * scale)
+
+    return default_rel_func
+
+
+def pchip_relevance(control_points):
+    """Build a PCHIP relevance function over control points.
+
+    The relevance is the piecewise cubic Hermite interpolation of the
+    control points, constant beyond the first and the last one. The cubic
+    of every interval is computed once, so evaluating the function is one
+    searchsorted and one Horner step over the whole array.
+
+    Args:
+        control_points: (k, 2) rows of (target, relevance), with the slopes
+            chosen by the monotone Fritsch-Carlson rule as in
+            scipy.interpolate.PchipInterpolator, or (k, 3) rows of
+            (target, relevance, slope). Targets must be strictly increasing
+            and relevances in [0, 1].
+
+    Returns:
+        A vectorized relevance function.
+    """
+    points = np.asarray(control_points, dtype=np.float64)
+    if points.ndim != 2 or points.shape[1] not in (2, 3) or len(points) == 0:
+        raise ValueError("The control points must be (k, 2) or (k, 3) rows of "\
+                            "(target, relevance[, slope]).")
+
+    x, r = points[:, 0], points[:, 1]
+    if (np.diff(x) <= 0).any():
+        raise ValueError("The targets of the control points must be strictly increasing.")
+    if ((r < 0) | (r > 1)).any():
+        raise ValueError("The relevance of the control points must be between [0, 1].")
+
+    # A single control point gives the same relevance everywhere
+    if len(points) == 1:
+        @vectorized_relevance
+        def constant_rel_func(y):
+            return np.full(np.shape(y), r[0])
+
+        return constant_rel_func
+
+    slopes = points[:, 2] if points.shape[1] == 3 else _pchip_slopes(x, r)
+
+    # Cubic of every interval in powers of (y - x[k])
+    h = np.diff(x)
+    delta = np.diff(r) / h
+    c0, c1 = r[:-1], slopes[:-1]
+    c2 = (3 * delta - 2 * slopes[:-1] - slopes[1:]) / h
+    c3 = (slopes[:-1] + slopes[1:] - 2 * delta) / h ** 2
+    interior = x[1:-1]
+
+    @vectorized_relevance
+    def pchip_rel_func(y):
+        y = np.clip(np.asarray(y, dtype=np.float64), x[0], x[-1])
+
+        # The interval of every target; a few knots are cheaper to count than to search
+        if len(interior) <= _MAX_LINEAR_KNOTS:
+            k = np.zeros(y.shape, dtype=np.intp)
+            for knot in interior:
+                k += y >= knot
+        else:
+            k = np.searchsorted(interior, y, side="right")
+
+        t = y - x[k]
+        utility = c3[k] * t
+        utility += c2[k]
+        utility *= t
+        utility += c1[k]
+        utility *= t
+        utility += c0[k]
+        # A scalar target gives a NumPy scalar, which can't be clipped in place
+        if not utility.ndim:
+            return np.clip(utility, 0, 1)
+        return np.clip(utility, 0, 1, out=utility)
+
+    return pchip_rel_func
+
+
+def boxplot_control_points(y, coef=1.5, extremes="both"):
+    """Derive PCHIP control points from the median and the adjusted boxplot of y.
+
+    The median gets relevance 0 and the adjacent values (the most extreme
+    targets within the adjusted boxplot fences) relevance 1, all with slope
+    0. The fences are skewness-adjusted with the medcouple MC:
+    Q1 - coef * exp(-4 MC) * IQR and Q3 + coef * exp(3 MC) * IQR for
+    MC >= 0, with the exponents -3 and 4 for MC < 0. The quartiles and the
+    median come from one np.partition call in O(n); the medcouple is
+    selected in O(n log n) without building its quadratic kernel, on a
+    fixed-seed random sample of 5001 targets, which is the whole target
+    for smaller ones.
+
+    Args:
+        y: 1-D array-like of target values.
+        coef: The boxplot whisker coefficient.
+        extremes: 'both', 'high' or 'low', the tails that are rare.
+
+    Returns:
+        A (k, 3) array of (target, relevance, slope) control points.
+    """
+    y = np.asarray(y, dtype=np.float64).ravel()
+    if len(y) == 0:
+        raise ValueError("The control points need at least one target value.")
+    if extremes not in ("both", "high", "low"):
+        raise ValueError("The extremes must be 'both', 'high' or 'low'.")
+
+    # Quartiles as in np.quantile, interpolating between two order statistics
+    n = len(y)
+    quantile_positions = (n - 1) * np.array([0.25, 0.5, 0.75])
+    below = np.floor(quantile_positions).astype(np.int64)
+    above = np.ceil(quantile_positions).astype(np.int64)
+
+    partitioned = np.partition(y, np.unique(np.concatenate((below, above))))
+    q1, median, q3 = partitioned[below] + \
+        (partitioned[above] - partitioned[below]) * (quantile_positions - below)
+
+    # A random sample rather than a stride, which follows any order of the targets
+    sample = y
+    if n > _SKETCH_SIZE:
+        sample = y[np.random.default_rng(_SKETCH_SEED).choice(n, _SKETCH_SIZE, replace=False)]
+    mc = _medcouple(np.sort(sample))
+    iqr = q3 - q1
+    if mc >= 0:
+        low_fence, high_fence = q1 - coef * np.exp(-4 * mc) * iqr, q3 + coef * np.exp(3 * mc) * iqr
+    else:
+        low_fence, high_fence = q1 - coef * np.exp(-3 * mc) * iqr, q3 + coef * np.exp(4 * mc) * iqr
+
+    low = np.min(y, where=y >= low_fence, initial=np.inf)
+    high = np.max(y, where=y <= high_fence, initial=-np.inf)
+
+    points = [(median, 0.0, 0.0)]
+    if extremes in ("both", "low") and low < median:
+        points.insert(0, (low, 1.0, 0.0))
+    if extremes in ("both", "high") and high > median:
+        points.append((high, 1.0, 0.0))
+
+    return np.array(points)
+
+
+def evaluate_relevance(rel_func, y):
+    """Evaluate a relevance function over all target values.
+
+    Declared vectorized functions are called once on the whole array.
+    Undeclared functions are probed on a few values: if calling them on
+    an array gives the same result as calling them on each scalar, they
+    are evaluated in one call as well. Otherwise the scalar path is used.
+
+    Args:
+        rel_func: The relevance function.
+        y: 1-D array-like of target values.
+
+    Returns:
+        A float64 NumPy array with the relevance of each value in y.
+    """
+    y = np.asarray(y)
+
+    if is_vectorized(rel_func) or _behaves_vectorized(rel_func, y):
+        utility = np.asarray(rel_func(y), dtype=np.float64)
+        if utility.shape != y.shape:
+            raise ValueError("A vectorized relevance function must return "\
+                                "an array with the same shape as its input.")
+        return utility
+
+    return _evaluate_scalar(rel_func, y)
+
+
+def _pchip_slopes(x, r):
+    # Fritsch-Carlson slopes, with the end rule of scipy's PchipInterpolator
+    h = np.diff(x)
+    delta = np.diff(r) / h
+    slopes = np.zeros(len(x))
+
+    if len(x) == 2:
+        slopes[:] = delta[0]
+        return slopes
+
+    # Weighted harmonic mean of the neighbouring secants where they agree in sign
+    w1 = 2 * h[1:] + h[:-1]
+    w2 = h[1:] + 2 * h[:-1]
+    agree = delta[:-1] * delta[1:] > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        harmonic = (w1 + w2) / (w1 / delta[:-1] + w2 / delta[1:])
+    slopes[1:-1] = np.where(agree, harmonic, 0)
+
+    slopes[0] = _pchip_end_slope(h[0], h[1], delta[0], delta[1])
+    slopes[-1] = _pchip_end_slope(h[-1], h[-2], delta[-1], delta[-2])
+    return slopes
+
+
+def _pchip_end_slope(h0, h1, m0, m1):
+    # Three-point slope at an end, limited to keep the shape
+    d = ((2 * h0 + h1) * m0 - h0 * m1) / (h0 + h1)
+    if np.sign(d) != np.sign(m0):
+        return 0.0
+    if np.sign(m0) != np.sign(m1) and abs(d) > abs(3 * m0):
+        return 3 * m0
+    return d
+
+
+def _medcouple(values):
+    # Medcouple of sorted values, with the kernel of Hubert and Vandervieren. The ...
+    # ... kernel is never built: its median is selected as in Brys et al., J. Comput. ...
+    # ... Graph. Stat. 13(4), 2004, in O(n) memory and O(n log n) time
+    z = values - np.median(values)
+    upper = z[z >= 0][::-1]
+    lower = z[z <= 0][::-1]
+    n = len(upper) * len(lower)
+
+    # The two middle values of the kernel, which are the same one for an odd count
+    middle = {(n - 1) // 2, n // 2}
+    return float(np.mean([_kernel_rank(upper, lower, k) for k in middle]))
+
+
+def _kernel(upper, lower, i, j):
+    # h(upper[i], lower[j]) = (upper + lower) / (upper - lower), for decreasing upper and lower
+    u, l = upper[i], lower[j]
+    ties = (u == 0) & (l == 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        kernel = (u + l) / (u - l)
+
+    # Pairs of values equal to the median get -1, 0 or 1 by their ranks
+    return np.where(ties, np.sign(len(upper) - 1 - i - j), kernel)
+
+
+def _count_above(upper, lower, threshold, inclusive):
+    # Number of kernel values above the threshold in every row, by a binary search ...
+    # ... of all rows at once; the rows and columns of the kernel are non-increasing
+    rows = np.arange(len(upper))
+    low, high = np.zeros(len(upper), dtype=np.int64), np.full(len(upper), len(lower))
+    while (low < high).any():
+        mid = (low + high) // 2
+        value = _kernel(upper, lower, rows, np.minimum(mid, len(lower) - 1))
+        above = (mid < high) & ((value >= threshold) if inclusive else (value > threshold))
+        low, high = np.where(above, mid + 1, low), np.where(above | (mid >= high), high, mid)
+    return low
+
+
+def _kernel_rank(upper, lower, k):
+    # The k-th largest kernel value (from 0); row i has its candidates in columns ...
+    # ... [first[i], stop[i]), the columns before them are larger and those after smaller
+    first = np.zeros(len(upper), dtype=np.int64)
+    stop = np.full(len(upper), len(lower), dtype=np.int64)
+
+    while (stop - first).sum() > len(upper) + len(lower):
+        # The weighted median of the middle candidates of the rows halves the search
+        rows = np.flatnonzero(stop > first)
+        medians = _kernel(upper, lower, rows, (first[rows] + stop[rows] - 1) // 2)
+        weights = (stop - first)[rows]
+        sorted_at = np.argsort(medians)
+        cumulative = np.cumsum(weights[sorted_at])
+        threshold = medians[sorted_at[np.searchsorted(cumulative, cumulative[-1] / 2)]]
+
+        above = _count_above(upper, lower, threshold, inclusive=False)
+        at_least = _count_above(upper, lower, threshold, inclusive=True)
+        if k < above.sum():
+            stop = above
+        elif k >= at_least.sum():
+            first = at_least
+        else:
+            return threshold
+
+    # The few candidates left are ranked directly
+    counts = stop - first
+    rows = np.repeat(np.arange(len(upper)), counts)
+    columns = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts - first, counts)
+    candidates = -_kernel(upper, lower, rows, columns)
+    return -np.partition(candidates, k - first.sum())[k - first.sum()]
+
+
+def _evaluate_scalar(rel_func, y):
+    # One Python call per value, as a fallback for scalar-only functions
+    return np.fromiter((rel_func(val) for val in y.tolist()),
+                       dtype=np.float64, count=len(y))
+
+
+def _behaves_vectorized(rel_func, y):
+    # Probing an undeclared function on a small sample of the targets
+    probe = y[:_PROBE_SIZE]
+    if len(probe) == 0:
+        return False
+
+    try:
+        with np.errstate(all="ignore"):
+            vector_out = np.asarray(rel_func(probe), dtype=np.float64)
+    except Exception:
+        return False
+
+    if vector_out.shape != probe.shape:
+        return False
+
+    try:
+        scalar_out = _evaluate_scalar(rel_func, probe)
+    except Exception:
+        return False
+
+    return bool(np.allclose(vector_out, scalar_out, equal_nan=True))
@@ -1,4 +1,4 @@
-"""Stratified train/test split for regression.
+"""Stratified train/test split and K-fold for regression.
 
 Splits a DataFrame so train and test have similar target distributions,
 addressing imbalance that sklearn.model_selection.train_test_split ignores.
@@ -13,18 +13,26 @@ def train_test_split(
     test_size=None,
     bins=None,
     random_state=None,
+    return_indices=False,
 ):
     """Split a DataFrame into train and test with similar target distributions.
 
+    The rows are assigned to the bins of the target histogram in one pass
+    (the last bin is right-closed, as in np.histogram, so every row is in
+    exactly one bin) and shuffled within their bins with one grouped
+    permutation. round(test_size * count) rows of every bin go to test.
+
     Args:
         df: DataFrame with the last column as the target.
         test_size: Fraction of data for the test set (0 < test_size < 1).
-        bins: Number of bins for stratifying by target (unused but kept for API).
+        bins: Number of bins for stratifying by target.
         random_state: Seed for reproducible sampling.
+        return_indices: Whether to return the int64 row positions of train
+            and test instead of DataFrames.
 
     Returns:
-        train_df: Training DataFrame.
-        test_df: Test DataFrame.
+        train_df: Training DataFrame (or positions), in the order of df.
+        test_df: Test DataFrame (or positions), in the order of df.
     """
     if not isinstance(df, pd.DataFrame):
         raise TypeError(
@@ -36,22 +44,101 @@ def train_test_split(
         raise ValueError("test_size must be in (0, 1).")
     if random_state is not None and not isinstance(random_state, int):
         raise ValueError("random_state must be an integer or None.")
-    if not isinstance(bins, int):
-        raise ValueError("bins must be an integer.")
+    if not isinstance(bins, int) or bins < 1:
+        raise ValueError("bins must be a positive integer.")
+
+    rng = np.random.default_rng(random_state)
+    bin_ids = _get_bin_ids(df.iloc[:, -1].to_numpy(), bins)
+
+    # One sort gives the rows grouped by bin, in random order within each bin
+    order = np.lexsort((rng.random(len(bin_ids)), bin_ids))
+    counts = np.bincount(bin_ids, minlength=bins)
+    starts = np.cumsum(counts) - counts
+
+    sorted_ids = bin_ids[order]
+    rank = np.arange(len(order)) - starts[sorted_ids]
+    is_test = rank < np.round(test_size * counts)[sorted_ids]
+
+    train_positions = np.sort(order[~is_test])
+    test_positions = np.sort(order[is_test])
+
+    if return_indices:
+        return train_positions, test_positions
+    return df.take(train_positions), df.take(test_positions)
+
+
+def _get_bin_ids(y, bins):
+    """Assign every target to a histogram bin, with a right-closed last bin."""
+    edges = np.histogram_bin_edges(y, bins=bins)
+    return np.clip(np.searchsorted(edges, y, side="right") - 1, 0, bins - 1)
+
+
+class StratifiedKFold:
+
+    def __init__(self, n_splits=5, n_repeats=1, bins=10, random_state=None):
+        """K-fold splits (optionally repeated) with similar target distributions.
+
+        The target is binned once per call to split(); every repeat then
+        costs one grouped permutation, and the folds are yielded lazily as
+        int64 positions, so no fold DataFrame is built. Within every bin
+        the rows are dealt to the folds in turn, starting from a random
+        fold, so fold sizes differ by at most one row per bin.
+
+        Args:
+            n_splits: Number of folds, at least 2.
+            n_repeats: Number of times the k-fold split is repeated with a
+                new permutation.
+            bins: Number of bins for stratifying by target.
+            random_state: Seed for reproducible folds.
+        """
+        if not isinstance(n_splits, int) or n_splits < 2:
+            raise ValueError("n_splits must be an integer of at least 2.")
+        if not isinstance(n_repeats, int) or n_repeats < 1:
+            raise ValueError("n_repeats must be a positive integer.")
+        if not isinstance(bins, int) or bins < 1:
+            raise ValueError("bins must be a positive integer.")
+        if random_state is not None and not isinstance(random_state, int):
+            raise ValueError("random_state must be an integer or None.")
+
+        self.n_splits = n_splits
+        self.n_repeats = n_repeats
+        self.bins = bins
+        self.random_state = random_state
+
+    def get_n_splits(self, X=None, y=None, groups=None):
+        """Return the number of (train, test) pairs yielded by split()."""
+        return self.n_splits * self.n_repeats
+
+    def split(self, X, y=None, groups=None):
+        """Yield (train_positions, test_positions) for every fold of every repeat.
+
+        Args:
+            X: The data. Its last column is the target when y is None.
+            y: The target, if not the last column of X.
+            groups: Not used, kept for scikit-learn compatibility.
+        """
+        if y is None:
+            if not isinstance(X, pd.DataFrame):
+                raise TypeError("y must be given when X is not a pandas DataFrame.")
+            y = X.iloc[:, -1].to_numpy()
+        y = np.asarray(y)
 
-    y = df.iloc[:, -1].values
-    _, bin_edges = np.histogram(y)
+        if len(y) < self.n_splits:
+            raise ValueError("n_splits cannot be greater than the number of rows.")
 
-    test_dfs_list = []
-    train_dfs_list = []
+        rng = np.random.default_rng(self.random_state)
+        bin_ids = _get_bin_ids(y, self.bins)
+        counts = np.bincount(bin_ids, minlength=self.bins)
+        starts = np.cumsum(counts) - counts
+        folds = np.empty(len(y), dtype=np.int64)
 
-    for left_edge, right_edge in zip(bin_edges[:-1], bin_edges[1:]):
-        bin_df = df[(y > left_edge) & (y < right_edge)]
-        test_df = bin_df.sample(frac=test_size, random_state=random_state)
-        train_df = bin_df.drop(test_df.index)
-        test_dfs_list.append(test_df)
-        train_dfs_list.append(train_df)
+        for _ in range(self.n_repeats):
+            order = np.lexsort((rng.random(len(y)), bin_ids))
+            sorted_ids = bin_ids[order]
+            first_fold = rng.integers(0, self.n_splits, size=self.bins)
+            folds[order] = (np.arange(len(y)) - starts[sorted_ids]
+                            + first_fold[sorted_ids]) % self.n_splits
 
-    test_df = pd.concat(test_dfs_list)
-    train_df = pd.concat(train_dfs_list)
-    return train_df, test_df
+            for fold in range(self.n_splits):
+                is_test = folds == fold
+                yield np.flatnonzero(~is_test), np.flatnonzero(is_test)
@@ -0,0 +1,148 @@
+# Timing every resampler and train_test_split over synthetic data shapes
+#
+#   python benchmarks/bench_resamplers.py --sizes 1e3 1e4 1e5 1e6 1e7
+#   python benchmarks/bench_resamplers.py --csv now.csv --baseline before.csv
+#
+# Every case is run --repeat times and the fastest wall time is kept. With
+# --baseline, the cases that got slower than --tolerance times the baseline
+# are listed and the exit code is 1.
+
+import argparse
+import csv
+import itertools
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import PyImbalReg as pir
+
+
+METHODS = ("RO", "RU", "GN", "GNHF", "WERCS", "train_test_split")
+CASE_FIELDS = ("method", "n_rows", "n_cols", "categorical_ratio", "rare_fraction")
+
+
+def make_data(n_rows, n_cols, categorical_ratio, rare_fraction, seed = 0):
+    # n_cols features, a share of them categorical, and Y as the last column
+
+    rng = np.random.default_rng(seed)
+    n_categorical = int(round(categorical_ratio * n_cols))
+
+    df = pd.DataFrame(rng.standard_normal((n_rows, n_cols - n_categorical)),
+                      columns = [f"x{j}" for j in range(n_cols - n_categorical)])
+    for j in range(n_categorical):
+        df[f"c{j}"] = pd.Categorical.from_codes(rng.integers(0, 5, n_rows),
+                                                categories = list("abcde"))
+    df["y"] = rng.standard_normal(n_rows)
+
+    # |Y| above its (1 - rare_fraction) quantile is rare, so the rare share is exact
+    cutoff = np.quantile(np.abs(df["y"].values), 1 - rare_fraction)
+
+    @pir.vectorized_relevance
+    def rel_func(y):
+        return np.where(np.abs(y) >= cutoff, 1.0, 0.5 * np.abs(y) / cutoff)
+
+    categorical_columns = [f"c{j}" for j in range(n_categorical)]
+    return df, rel_func, categorical_columns
+
+
+def run_case(method, df, rel_func, categorical_columns, seed = 0):
+
+    if method == "train_test_split":
+        return pir.train_test_split(df = df, test_size = 0.2, bins = 10,
+                                    random_state = seed, return_indices = True)
+
+    params = dict(df = df, y_col_name = "y", categorical_columns = categorical_columns,
+                  random_state = seed)
+    if method == "GNHF":
+        return pir.GNHF(bins = 5, **params).get()
+
+    resampler = {
+        "RO": pir.RandomOversampling,
+        "RU": pir.RandomUndersampling,
+        "GN": pir.GaussianNoise,
+        "WERCS": pir.WERCS,
+    }[method]
+    return resampler(rel_func = rel_func, threshold = 0.9, **params).get()
+
+
+def time_case(method, n_rows, n_cols, categorical_ratio, rare_fraction, repeat):
+
+    df, rel_func, categorical_columns = make_data(n_rows, n_cols, categorical_ratio,
+                                                  rare_fraction)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run_case(method, df, rel_func, categorical_columns)
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+def compare(results, baseline_path, tolerance):
+    # Returning the cases slower than tolerance times the baseline
+
+    with open(baseline_path, newline = "") as f:
+        baseline = {tuple(row[field] for field in CASE_FIELDS): float(row["seconds"])
+                    for row in csv.DictReader(f)}
+
+    slower = []
+    for row in results:
+        key = tuple(str(row[field]) for field in CASE_FIELDS)
+        if key in baseline and row["seconds"] > tolerance * baseline[key]:
+            slower.append((row, baseline[key]))
+
+    return slower
+
+
+def main(argv = None):
+
+    parser = argparse.ArgumentParser(description = "Time the PyImbalReg resamplers.")
+    parser.add_argument("--methods", nargs = "+", default = list(METHODS), choices = METHODS)
+    parser.add_argument("--sizes", nargs = "+", type = float, default = [1e3, 1e4, 1e5, 1e6])
+    parser.add_argument("--cols", nargs = "+", type = int, default = [10, 50])
+    parser.add_argument("--categorical-ratios", nargs = "+", type = float, default = [0.0, 0.2])
+    parser.add_argument("--rare-fractions", nargs = "+", type = float, default = [0.01, 0.1])
+    parser.add_argument("--repeat", type = int, default = 3)
+    parser.add_argument("--csv", help = "Write the results to this csv file")
+    parser.add_argument("--baseline", help = "A csv from an earlier run to compare with")
+    parser.add_argument("--tolerance", type = float, default = 1.25)
+    args = parser.parse_args(argv)
+
+    results = []
+    header = f"{'method':<17}{'rows':>10}{'cols':>6}{'cat':>6}{'rare':>7}{'seconds':>11}{'rows/s':>14}"
+    print(header)
+    print("-" * len(header))
+
+    cases = itertools.product(args.methods, args.sizes, args.cols,
+                              args.categorical_ratios, args.rare_fractions)
+    for method, n_rows, n_cols, categorical_ratio, rare_fraction in cases:
+        n_rows = int(n_rows)
+        seconds = time_case(method, n_rows, n_cols, categorical_ratio, rare_fraction,
+                            args.repeat)
+        row = dict(zip(CASE_FIELDS, (method, n_rows, n_cols, categorical_ratio, rare_fraction)),
+                   seconds = seconds, rows_per_second = n_rows / seconds)
+        results.append(row)
+        print(f"{method:<17}{n_rows:>10,}{n_cols:>6}{categorical_ratio:>6.2f}"
+              f"{rare_fraction:>7.2f}{seconds:>11.4f}{n_rows / seconds:>14,.0f}")
+
+    if args.csv:
+        with open(args.csv, "w", newline = "") as f:
+            writer = csv.DictWriter(f, fieldnames = CASE_FIELDS + ("seconds", "rows_per_second"))
+            writer.writeheader()
+            writer.writerows(results)
+
+    if args.baseline:
+        slower = compare(results, args.baseline, args.tolerance)
+        for row, seconds in slower:
+            print(f"slower: {row['method']} rows={row['n_rows']} cols={row['n_cols']} "
+                  f"cat={row['categorical_ratio']} rare={row['rare_fraction']}: "
+                  f"{seconds:.4f} s -> {row['seconds']:.4f} s")
+        return 1 if slower else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
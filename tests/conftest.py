@@ -41,3 +41,24 @@ def sample_df_with_categorical(random_state):
         "cat": np.random.choice(["X", "Y", "Z"], size=n),
         "y": y,
     })
+
+
+def make_imbalanced_df(n=500, n_tail=30, seed=0, features=("x",), categories=None):
+    """DataFrame of N(0, 1) features and a target whose last n_tail values are a N(8, 1) tail.
+
+    Args:
+        n: Number of rows.
+        n_tail: Number of rows in the shifted tail of the target.
+        seed: Seed of the np.random.Generator.
+        features: Names of the numeric feature columns.
+        categories: Dict of categorical column -> the values it is drawn from.
+
+    Returns:
+        The features, then the categorical columns, then the target "y".
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({col: rng.normal(size=n) for col in features})
+    for col, values in (categories or {}).items():
+        df[col] = rng.choice(values, size=n)
+    df["y"] = np.concatenate([rng.normal(size=n - n_tail), rng.normal(8, 1, n_tail)])
+    return df
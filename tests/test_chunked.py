@@ -0,0 +1,258 @@
+"""Unit tests for chunked (out-of-core) resampling."""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import PyImbalReg as pir
+
+from .conftest import make_imbalanced_df
+
+
+def _split(df, size):
+    return [df.iloc[i:i + size] for i in range(0, len(df), size)]
+
+
+class TestChunkedBins(unittest.TestCase):
+    """Bins found chunk by chunk are the same as the in-memory ones."""
+
+    def test_bins_match_in_memory(self):
+        @pir.vectorized_relevance
+        def wavy_rel(y):
+            return (np.sin(3 * y) + 1) / 2
+
+        for seed in range(5):
+            df = make_imbalanced_df(1500, seed=seed, categories={"c": ["a", "b", "c"]})
+            df["y"] = df["y"].round(seed % 3)
+            for rel_func in ("default", wavy_rel):
+                ro = pir.RandomOversampling(df=df, rel_func=rel_func, threshold=0.7,
+                                            categorical_columns=["c"])
+                chunked = pir.ChunkedResampler(source=_split(df, 97 + seed), method="RO",
+                                               rel_func=rel_func, threshold=0.7,
+                                               categorical_columns=["c"]).fit()
+
+                bins = np.vstack([ro.rare_bins, ro.normal_bins])
+                bins = bins[np.argsort(bins[:, 0])]
+                np.testing.assert_array_equal(np.diff(bins, axis=1).ravel(),
+                                              chunked.bin_counts)
+                self.assertEqual(chunked.bin_is_rare.sum(), len(ro.rare_bins))
+
+    def test_bin_std_matches_in_memory(self):
+        df = make_imbalanced_df(2000, seed=7, categories={"c": ["a", "b", "c"]})
+        gn = pir.GaussianNoise(df=df, rel_func="default", threshold=0.8,
+                               categorical_columns=["c"])
+        chunked = pir.ChunkedResampler(source=_split(df, 300), method="GN",
+                                       threshold=0.8, categorical_columns=["c"]).fit()
+        expected = np.vstack([std.values for std in gn.get_rare_bins_std()])
+        np.testing.assert_allclose(chunked.bin_std[chunked.bin_is_rare], expected)
+
+
+class TestChunkedResampler(unittest.TestCase):
+    """Output sizes, dtypes and sources of the chunked resamplers."""
+
+    def setUp(self):
+        self.df = make_imbalanced_df(3000, seed=1, categories={"c": ["a", "b", "c"]})
+        self.chunks = _split(self.df, 400)
+        self.params = dict(threshold=0.8, o_percentage=3, u_percentage=0.5,
+                           categorical_columns=["c"], random_state=0)
+
+    def test_sizes_match_in_memory(self):
+        cases = [
+            ("RO", pir.RandomOversampling),
+            ("RU", pir.RandomUndersampling),
+            ("GN", pir.GaussianNoise),
+        ]
+        for method, cls in cases:
+            expected = cls(df=self.df, rel_func="default", **self.params).get()
+            chunked = pir.ChunkedResampler(source=self.chunks, method=method, **self.params)
+            result = pd.concat(list(chunked.get()))
+            self.assertEqual(len(result), len(expected))
+            self.assertEqual(list(result.columns), ["x", "c", "y"])
+
+        expected = pir.GNHF(df=self.df, bins=4, categorical_columns=["c"]).get()
+        chunked = pir.ChunkedResampler(source=self.chunks, method="GNHF", bins=4,
+                                       categorical_columns=["c"], random_state=0)
+        self.assertEqual(len(pd.concat(list(chunked.get()))), len(expected))
+
+    def test_chunks_are_yielded_one_by_one(self):
+        chunked = pir.ChunkedResampler(source=self.chunks, method="GN", **self.params)
+        outputs = list(chunked.get())
+        self.assertEqual(len(outputs), len(self.chunks))
+        for out in outputs:
+            self.assertIsInstance(out["c"].dtype, pd.CategoricalDtype)
+            self.assertEqual(out["x"].dtype, np.float64)
+
+    def test_reproducible_with_random_state(self):
+        out1 = pd.concat(list(pir.ChunkedResampler(
+            source=self.chunks, method="GN", **self.params).get()))
+        out2 = pd.concat(list(pir.ChunkedResampler(
+            source=self.chunks, method="GN", **self.params).get()))
+        pd.testing.assert_frame_equal(out1, out2)
+
+    def test_undersampling_keeps_rows_of_the_source(self):
+        chunked = pir.ChunkedResampler(source=self.chunks, method="RU", **self.params)
+        result = pd.concat(list(chunked.get()))
+        self.assertTrue(result.index.is_unique)
+        positions = result.index.get_level_values("source_position")
+        pd.testing.assert_frame_equal(result.reset_index(drop=True),
+                                      self.df.iloc[positions].reset_index(drop=True))
+
+    def test_string_index_labels(self):
+        chunked = pir.ChunkedResampler(source=self.chunks, method="RO",
+                                       index_labels="string", **self.params)
+        result = pd.concat(list(chunked.get()))
+        synthetic = result.index[result.index.astype(str).str.startswith("OverSampled-")]
+        self.assertGreater(len(synthetic), 0)
+        self.assertTrue(result.index.is_unique)
+
+    def test_csv_source_and_sink(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src, dst = os.path.join(tmp, "in.csv"), os.path.join(tmp, "out.csv")
+            self.df.to_csv(src, index=False)
+            chunked = pir.ChunkedResampler(source=src, method="RO", chunk_size=500,
+                                           **self.params)
+            chunked.to_csv(dst, index=False)
+            result = pd.read_csv(dst)
+            expected = pir.RandomOversampling(df=self.df, rel_func="default",
+                                              **self.params).get()
+            self.assertEqual(len(result), len(expected))
+
+    @unittest.skipUnless(__import__("importlib").util.find_spec("pyarrow"),
+                         "pyarrow is not installed")
+    def test_parquet_source_and_sink(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src, dst = os.path.join(tmp, "in.parquet"), os.path.join(tmp, "out.parquet")
+            self.df.to_parquet(src, index=False)
+            chunked = pir.ChunkedResampler(source=src, method="GN", chunk_size=500,
+                                           **self.params)
+            chunked.to_parquet(dst)
+            result = pd.read_parquet(dst)
+            expected = pir.GaussianNoise(df=self.df, rel_func="default",
+                                         **self.params).get()
+            self.assertEqual(len(result), len(expected))
+
+    def test_callable_source(self):
+        chunked = pir.ChunkedResampler(source=lambda: iter(self.chunks), method="RU",
+                                       **self.params)
+        self.assertGreater(len(pd.concat(list(chunked.get()))), 0)
+
+    def test_rejects_one_shot_iterator_and_bad_method(self):
+        with self.assertRaises(TypeError):
+            pir.ChunkedResampler(source=iter(self.chunks), method="RO")
+        with self.assertRaises(ValueError):
+            pir.ChunkedResampler(source=self.chunks, method="SMOTE")
+
+    def test_peak_memory_is_bounded_by_chunk_size(self):
+        import tracemalloc
+
+        n_chunks, chunk_rows, n_cols = 40, 5000, 10
+
+        def chunks():
+            for i in range(n_chunks):
+                rng = np.random.default_rng(i)
+                df = pd.DataFrame(rng.normal(size=(chunk_rows, n_cols)),
+                                  columns=[f"x{j}" for j in range(n_cols)])
+                df["y"] = rng.standard_t(3, size=chunk_rows)
+                yield df
+
+        chunked = pir.ChunkedResampler(source=chunks, method="GN", threshold=0.8,
+                                       categorical_columns=[], random_state=0)
+        tracemalloc.start()
+        n_rows = sum(len(out) for out in chunked.get())
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        dataset_bytes = n_chunks * chunk_rows * (n_cols + 1) * 8
+        self.assertGreater(n_rows, 0)
+        self.assertLess(peak, 0.2 * dataset_bytes)
+
+
+class TestChunkedWERCS(unittest.TestCase):
+    """Weighted reservoir WERCS over a stream of chunks."""
+
+    def setUp(self):
+        self.df = make_imbalanced_df(3000, seed=11)
+        self.chunks = _split(self.df, 250)
+
+    @staticmethod
+    @pir.vectorized_relevance
+    def step_rel(y):
+        return (y > 1).astype(float)
+
+    def _parts(self, **params):
+        parts = list(pir.ChunkedWERCS(source=self.chunks, y_col_name="y", **params).get())
+        return pd.concat(parts[:-2]), parts[-2], parts[-1]
+
+    def test_sizes_match_in_memory(self):
+        original, over, under = self._parts(o_percentage=1.5, u_percentage=0.3,
+                                            random_state=0)
+        expected = pir.WERCS(df=self.df, rel_func="default", o_percentage=1.5,
+                                 u_percentage=0.3).get()
+        self.assertEqual(len(original) + len(over) + len(under), len(expected))
+        self.assertEqual(len(over), round(0.5 * len(self.df)))
+        self.assertEqual(len(under), round(0.7 * len(self.df)))
+
+    def test_weights_decide_what_is_drawn(self):
+        _, over, under = self._parts(rel_func=self.step_rel, n_rows=len(self.df),
+                                     u_percentage=0.5, random_state=1)
+        self.assertTrue((over["y"] > 1).all())
+        self.assertTrue((under["y"] <= 1).all())
+        # Without replacement, every undersampled row is unique
+        self.assertFalse(under.index.get_level_values("source_position").duplicated().any())
+        np.testing.assert_array_equal(under.index.get_level_values("origin"),
+                                      pir.ResampleResult.UNDERSAMPLED)
+
+    def test_oversampling_frequency_follows_relevance(self):
+        @pir.vectorized_relevance
+        def two_level(y):
+            return np.where(y > 0, 0.75, 0.25)
+
+        _, over, _ = self._parts(rel_func=two_level, n_rows=len(self.df),
+                                 o_percentage=11, random_state=2)
+        positive = (self.df["y"] > 0).mean()
+        expected = 0.75 * positive / (0.75 * positive + 0.25 * (1 - positive))
+        self.assertAlmostEqual((over["y"] > 0).mean(), expected, delta=0.02)
+
+    def test_single_pass_accepts_one_shot_iterator(self):
+        chunked = pir.ChunkedWERCS(source=iter(self.chunks), rel_func=self.step_rel,
+                                   n_rows=len(self.df), random_state=3)
+        self.assertGreater(len(pd.concat(list(chunked.get()))), len(self.df))
+        with self.assertRaises(TypeError):
+            pir.ChunkedWERCS(source=iter(self.chunks))
+
+    def test_n_rows_must_match_the_source(self):
+        for n_rows in (len(self.df) - 1, len(self.df) + 1):
+            chunked = pir.ChunkedWERCS(source=self.chunks, rel_func=self.step_rel,
+                                       n_rows=n_rows, random_state=3)
+            with self.assertRaises(ValueError):
+                list(chunked.get())
+
+    def test_default_relevance_std_of_a_large_offset_target(self):
+        rng = np.random.default_rng(5)
+        chunks = [pd.DataFrame({"x": rng.normal(size=500), "y": 1e9 + rng.normal(size=500)})
+                  for _ in range(6)]
+        chunked = pir.ChunkedWERCS(source=chunks, y_col_name="y")
+        chunked._fit_target()
+        y = pd.concat(chunks)["y"].to_numpy()
+        expected = 1 - np.exp(-0.5)
+        self.assertAlmostEqual(float(chunked.rel_func(np.array([y.mean() + y.std(ddof=1)]))[0]),
+                               expected, delta=1e-3)
+
+    def test_slots_are_widened_by_later_chunks(self):
+        chunks = [chunk.assign(k=np.arange(len(chunk)) if i % 2 == 0 else 0.5)
+                  for i, chunk in enumerate(self.chunks)]
+        parts = list(pir.ChunkedWERCS(source=chunks, o_percentage=3, random_state=5).get())
+        over = parts[-2]
+        self.assertEqual(len(over), 2 * len(self.df))
+        self.assertEqual(over["k"].dtype, np.float64)
+        self.assertTrue((over["k"] == 0.5).any() and (over["k"] != 0.5).any())
+        positions = over.index.get_level_values("source_position")
+        np.testing.assert_array_equal(over["y"], self.df["y"].to_numpy()[positions])
+
+    def test_reproducible_with_random_state(self):
+        first = pd.concat(self._parts(random_state=4))
+        second = pd.concat(self._parts(random_state=4))
+        pd.testing.assert_frame_equal(first, second)
@@ -0,0 +1,181 @@
+"""Unit tests for NumPy, pyarrow, polars and scipy.sparse inputs."""
+
+import importlib.util
+import unittest
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+import PyImbalReg as pir
+
+from .conftest import make_imbalanced_df
+
+
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+HAS_POLARS = importlib.util.find_spec("polars") is not None
+
+
+class TestNumpyInput(unittest.TestCase):
+
+    def setUp(self):
+        # Y is not the last column, so the output has to put it back in place
+        self.df = make_imbalanced_df(400, features=("x", "z"))[["x", "y", "z"]]
+        self.values = self.df.to_numpy()
+
+    def test_2d_array_is_not_copied(self):
+        ro = pir.RandomOversampling(df=self.values, y_col_name=1, rel_func="default",
+                                    threshold=0.7, categorical_columns=[])
+        self.assertTrue(np.shares_memory(ro.df[1].to_numpy(), self.values))
+
+    def test_2d_array_output_matches_pandas(self):
+        for cls in (pir.RandomOversampling, pir.RandomUndersampling,
+                    pir.GaussianNoise, pir.WERCS):
+            result = cls(df=self.values, y_col_name=1, rel_func="default", threshold=0.7,
+                         categorical_columns=[], random_state=3).get()
+            expected = cls(df=self.df, y_col_name="y", rel_func="default", threshold=0.7,
+                           categorical_columns=[], random_state=3).get()
+            self.assertIsInstance(result, np.ndarray)
+            np.testing.assert_array_equal(result, expected[["x", "y", "z"]].to_numpy())
+
+    def test_2d_array_output_keeps_the_column_order(self):
+        params = dict(rel_func="default", threshold=0.7, categorical_columns=[], random_state=3)
+        result = pir.RandomOversampling(df=self.values, y_col_name=0, **params).get()
+        expected = pir.RandomOversampling(df=self.df, y_col_name="x", **params).get()
+        self.assertEqual(list(expected.columns), ["y", "z", "x"])
+        np.testing.assert_array_equal(result, expected[["x", "y", "z"]].to_numpy())
+
+    def test_structured_array(self):
+        records = self.df.to_records(index=False).view(np.ndarray)
+        ro = pir.RandomOversampling(df=records, y_col_name="y", rel_func="default",
+                                    threshold=0.7, categorical_columns=[], random_state=3)
+        self.assertTrue(np.shares_memory(ro.df["x"].to_numpy(), records))
+        result = ro.get()
+        self.assertEqual(result.dtype.names, ("x", "z", "y"))
+        self.assertGreater(len(result), len(records))
+
+    def test_rejects_1d_array_and_string_y_for_2d_array(self):
+        with self.assertRaises(TypeError):
+            pir.RandomOversampling(df=self.values[:, 0], rel_func="default")
+        with self.assertRaises(ValueError):
+            pir.RandomOversampling(df=self.values, y_col_name="y", rel_func="default")
+
+
+@unittest.skipUnless(HAS_PYARROW, "pyarrow is not installed")
+class TestArrowInput(unittest.TestCase):
+
+    def setUp(self):
+        import pyarrow as pa
+
+        self.df = make_imbalanced_df(400, features=("x", "z"), categories={"c": ["a", "b"]})
+        self.table = pa.Table.from_pandas(self.df, preserve_index=False)
+
+    def test_numeric_columns_are_not_copied(self):
+        ro = pir.RandomOversampling(df=self.table, y_col_name="y", rel_func="default",
+                                    categorical_columns=["c"])
+        buffer = np.frombuffer(self.table.column("x").chunks[0].buffers()[1], dtype=np.float64)
+        self.assertTrue(np.shares_memory(ro.df["x"].to_numpy(), buffer))
+
+    def test_output_is_a_table(self):
+        import pyarrow as pa
+
+        result = pir.GaussianNoise(df=self.table, y_col_name="y", rel_func="default",
+                                   threshold=0.7, categorical_columns=["c"],
+                                   random_state=3).get()
+        expected = pir.GaussianNoise(df=self.df, y_col_name="y", rel_func="default",
+                                     threshold=0.7, categorical_columns=["c"],
+                                     random_state=3).get()
+        self.assertIsInstance(result, pa.Table)
+        self.assertEqual(result.column_names, ["x", "z", "c", "y"])
+        np.testing.assert_array_equal(result.column("y").to_numpy(), expected["y"].to_numpy())
+
+
+@unittest.skipUnless(HAS_POLARS and HAS_PYARROW, "polars is not installed")
+class TestPolarsInput(unittest.TestCase):
+
+    def test_output_is_a_polars_dataframe(self):
+        import polars as pl
+
+        df = make_imbalanced_df(400, features=("x", "z"))
+        result = pir.WERCS(df=pl.from_pandas(df), y_col_name="y", rel_func="default",
+                           categorical_columns=[], random_state=3).get()
+        expected = pir.WERCS(df=df, y_col_name="y", rel_func="default",
+                             categorical_columns=[], random_state=3).get()
+        self.assertIsInstance(result, pl.DataFrame)
+        np.testing.assert_array_equal(result.to_numpy(), expected.to_numpy())
+
+
+class TestSparseInput(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.X = sparse.random(1000, 300, density=0.02, format="csr", random_state=2)
+        # Column 0 is stored in every row
+        self.X = sparse.hstack([sparse.csr_matrix(rng.normal(size=(1000, 1))), self.X],
+                               format="csr")
+        self.y = np.concatenate([rng.normal(size=950), rng.normal(8, 1, 50)])
+        self.params = dict(df=self.X, y=self.y, rel_func="default", threshold=0.7,
+                           random_state=3)
+
+    def test_gathers_match_the_rows_of_the_matrix(self):
+        for cls in (pir.RandomOversampling, pir.RandomUndersampling, pir.WERCS):
+            X, y = cls(**self.params).get()
+            positions = cls(**self.params).get(lazy=True).positions
+            self.assertTrue(sparse.issparse(X))
+            self.assertEqual((X != self.X[positions]).nnz, 0)
+            np.testing.assert_array_equal(y, self.y[positions])
+
+    def test_gn_adds_noise_to_stored_values_only(self):
+        result = pir.GaussianNoise(**self.params).get(lazy=True)
+        X, y = result.to_sparse()
+        noisy = np.flatnonzero(result.kind == pir.ResampleResult.NOISY)
+        sources = self.X[result.positions[noisy]]
+
+        self.assertEqual(X.nnz, self.X[result.positions].nnz)
+        # Same sparsity as the source rows, different values
+        self.assertEqual((((X[noisy] != 0) != (sources != 0))).nnz, 0)
+        self.assertGreater(abs(X[noisy] - sources).sum(), 0)
+        self.assertTrue(np.all(y[noisy] != self.y[result.positions[noisy]]))
+
+    def test_gn_dense_columns_get_noise_in_every_row(self):
+        # Column 1 is stored in every other row only
+        X = self.X.tolil()
+        X[::2, 1] = 1.0
+        result = pir.GaussianNoise(dense_columns=[1], **dict(self.params, df=X.tocsr())).get(lazy=True)
+        X_out, _ = result.to_sparse()
+        noisy = np.flatnonzero(result.kind == pir.ResampleResult.NOISY)
+        self.assertEqual(X_out[noisy, 1].nnz, len(noisy))
+
+    def test_gn_noise_of_large_offset_columns(self):
+        rng = np.random.default_rng(4)
+        dense = np.column_stack([1e8 + rng.normal(size=50), np.zeros(50)])
+        # Column 1 is stored in one row of five, with the same offset
+        dense[::5, 1] = 1e8 + rng.normal(size=10)
+        features = sparse.csr_matrix(dense)
+
+        rows, _, _, feature_noise = pir.GaussianNoise._noisy_sparse_bin(
+            features, np.ones(1), np.empty(0, dtype=np.int64), 401, 1.0, np.float64,
+            np.random.default_rng(0))
+        noise = feature_noise.toarray()
+        stored = features[rows].toarray() != 0
+        expected = dense.std(axis=0, ddof=1)
+        for col in range(2):
+            self.assertAlmostEqual(noise[stored[:, col], col].std() / expected[col], 1, delta=0.05)
+
+    def test_rejects_bad_inputs(self):
+        with self.assertRaises(ValueError):
+            pir.RandomOversampling(df=self.X, rel_func="default")
+        with self.assertRaises(ValueError):
+            pir.RandomOversampling(df=self.X, y=self.y[:-1], rel_func="default")
+        with self.assertRaises(ValueError):
+            pir.RandomOversampling(df=make_imbalanced_df(400), y=self.y, rel_func="default")
+        with self.assertRaises(ValueError):
+            pir.GaussianNoise(dense_columns=[301], **self.params)
+        with self.assertRaises(TypeError):
+            pir.SmoteR(**self.params)
+        with self.assertRaises(TypeError):
+            pir.RandomOversampling(**self.params).get(lazy=True).to_pandas()
+
+
+if __name__ == "__main__":
+    unittest.main()
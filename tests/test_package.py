@@ -1,5 +1,7 @@
 """Package-level tests: imports, __all__, version."""
 
+import subprocess
+import sys
 import unittest
 
 import PyImbalReg as pir
@@ -14,13 +16,26 @@ class TestPackage(unittest.TestCase):
 
     def test_all_exports(self):
         expected = {
+            "ChunkReader",
+            "ChunkedResampler",
+            "ChunkedWERCS",
             "DataHandler",
+            "FittedState",
             "GNHF",
             "GaussianNoise",
+            "NeighborCache",
+            "Profiler",
             "RandomOversampling",
             "RandomUndersampling",
+            "ResampleResult",
+            "SMOGN",
+            "SmoteR",
+            "StratifiedKFold",
             "WERCS",
+            "boxplot_control_points",
+            "pchip_relevance",
             "train_test_split",
+            "vectorized_relevance",
             "__version__",
         }
         self.assertEqual(set(pir.__all__), expected)
@@ -41,3 +56,9 @@ class TestPackage(unittest.TestCase):
         self.assertTrue(hasattr(pir.GaussianNoise, "get"))
         self.assertTrue(hasattr(pir.WERCS, "get"))
         self.assertTrue(hasattr(pir.GNHF, "get"))
+
+    def test_scipy_is_imported_on_first_use(self):
+        code = "import sys, PyImbalReg; print(any(m.startswith('scipy') for m in sys.modules))"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                check=True).stdout
+        self.assertEqual(output.strip(), "False")
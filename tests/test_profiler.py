@@ -0,0 +1,63 @@
+"""Unit tests for the per-stage Profiler."""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import PyImbalReg as pir
+
+from .conftest import make_imbalanced_df
+
+
+class TestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.df = make_imbalanced_df(categories={"c": ["a", "b"]})
+
+    def test_records_every_stage_of_gn(self):
+        profiler = pir.Profiler()
+        gn = pir.GaussianNoise(df=self.df, rel_func="default", threshold=0.7,
+                               categorical_columns=["c"], profiler=profiler, random_state=0)
+        result = gn.get()
+
+        stages = [record["stage"] for record in profiler.records]
+        self.assertEqual(stages, ["validation", "categorical_detection", "relevance_function",
+                                  "sort", "relevance", "bins",
+                                  "undersampling", "bin_std", "noise", "build"])
+        self.assertTrue(all(record["resampler"] == "GaussianNoise"
+                            for record in profiler.records))
+        self.assertTrue(all(record["seconds"] >= 0 for record in profiler.records))
+        self.assertEqual(profiler.records[-1]["rows"], len(result))
+        self.assertIsNone(profiler.records[-1]["peak_bytes"])
+
+        table = profiler.to_pandas()
+        self.assertEqual(list(table.columns), list(pir.Profiler.fields))
+        self.assertEqual(len(profiler.summary()), len(stages))
+
+    def test_callback_and_memory_peak(self):
+        received = []
+        profiler = pir.Profiler(callback=received.append, trace_memory=True)
+        ro = pir.RandomOversampling(df=self.df, rel_func="default", threshold=0.7,
+                                    categorical_columns=["c"], profiler=profiler)
+        ro.get()
+        self.assertEqual(received, profiler.records)
+        build = [record for record in received if record["stage"] == "build"][0]
+        self.assertGreater(build["peak_bytes"], 0)
+
+    def test_a_callable_is_wrapped_and_spawned_resamplers_share_it(self):
+        received = []
+        wercs = pir.WERCS(df=self.df, rel_func="default", categorical_columns=["c"],
+                          profiler=received.append)
+        self.assertIsInstance(wercs.profiler, pir.Profiler)
+        child = wercs.spawn(1)[0]
+        child.get(lazy=True)
+        self.assertEqual(received[-1]["stage"], "sampling")
+
+    def test_rejects_invalid_profiler(self):
+        with self.assertRaises(TypeError):
+            pir.RandomOversampling(df=self.df, rel_func="default", profiler="yes")
+
+
+if __name__ == "__main__":
+    unittest.main()
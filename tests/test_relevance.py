@@ -0,0 +1,204 @@
+"""Unit tests for relevance function evaluation."""
+
+import math
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import PyImbalReg as pir
+from PyImbalReg import relevance
+from PyImbalReg.relevance import (
+    _medcouple,
+    boxplot_control_points,
+    default_relevance,
+    evaluate_relevance,
+    is_vectorized,
+    pchip_relevance,
+)
+
+
+class TestEvaluateRelevance(unittest.TestCase):
+    """Vectorized, auto-detected and scalar relevance functions."""
+
+    def setUp(self):
+        self.y = np.linspace(-3.0, 3.0, 50)
+
+    def test_decorator_marks_function(self):
+        @pir.vectorized_relevance
+        def rel(y):
+            return np.clip(np.abs(y) / 3.0, 0, 1)
+
+        self.assertTrue(is_vectorized(rel))
+
+    def test_declared_function_is_called_once(self):
+        calls = []
+
+        @pir.vectorized_relevance
+        def rel(y):
+            calls.append(len(y))
+            return np.clip(np.abs(y) / 3.0, 0, 1)
+
+        utility = evaluate_relevance(rel, self.y)
+        self.assertEqual(calls, [len(self.y)])
+        np.testing.assert_allclose(utility, np.abs(self.y) / 3.0)
+
+    def test_array_friendly_function_is_detected(self):
+        def rel(y):
+            return np.abs(y) / 3.0
+
+        utility = evaluate_relevance(rel, self.y)
+        np.testing.assert_allclose(utility, np.abs(self.y) / 3.0)
+
+    def test_scalar_only_function_falls_back(self):
+        def rel(y):
+            return 1.0 if y > 0 else 0.0
+
+        utility = evaluate_relevance(rel, self.y)
+        np.testing.assert_array_equal(utility, (self.y > 0).astype(float))
+
+    def test_math_function_falls_back(self):
+        def rel(y):
+            return 1 - math.exp(-y * y)
+
+        utility = evaluate_relevance(rel, self.y)
+        np.testing.assert_allclose(utility, 1 - np.exp(-self.y ** 2))
+
+    def test_declared_function_with_wrong_shape_raises(self):
+        @pir.vectorized_relevance
+        def rel(y):
+            return 0.5
+
+        with self.assertRaises(ValueError):
+            evaluate_relevance(rel, self.y)
+
+    def test_vectorized_and_scalar_give_same_resampling(self):
+        df = pd.DataFrame({
+            "x": np.arange(30, dtype=float),
+            "y": np.concatenate([np.zeros(25), np.arange(5) + 10.0]),
+        })
+
+        def scalar_rel(y):
+            return min(abs(y) / 14.0, 1.0)
+
+        @pir.vectorized_relevance
+        def vector_rel(y):
+            return np.minimum(np.abs(y) / 14.0, 1.0)
+
+        ro1 = pir.RandomOversampling(df=df.copy(), rel_func=scalar_rel,
+                                     threshold=0.5, o_percentage=2,
+                                     categorical_columns=[], random_state=3)
+        ro2 = pir.RandomOversampling(df=df.copy(), rel_func=vector_rel,
+                                     threshold=0.5, o_percentage=2,
+                                     categorical_columns=[], random_state=3)
+        pd.testing.assert_frame_equal(ro1.get(), ro2.get())
+
+
+class TestDefaultRelevance(unittest.TestCase):
+    """Closed-form default relevance matches the normal-pdf definition."""
+
+    def test_matches_scipy_normal_pdf(self):
+        from scipy.stats import norm
+
+        rng = np.random.default_rng(0)
+        y = rng.normal(3.0, 2.0, 1000)
+        average, std = y.mean(), y.std(ddof=1)
+        expected = 1 - norm.pdf(y, loc=average, scale=std) / \
+            norm.pdf(average, loc=average, scale=std)
+
+        rel = default_relevance(average, std)
+        self.assertTrue(is_vectorized(rel))
+        np.testing.assert_allclose(rel(y), expected, atol=1e-12)
+
+    def test_values_are_in_unit_interval(self):
+        rel = default_relevance(0.0, 1.0)
+        utility = rel(np.linspace(-100, 100, 1001))
+        self.assertTrue(((utility >= 0) & (utility <= 1)).all())
+        self.assertEqual(rel(0.0), 0.0)
+
+
+class TestPchipRelevance(unittest.TestCase):
+    """PCHIP relevance over user or adjusted-boxplot control points."""
+
+    def test_matches_scipy_pchip(self):
+        from scipy.interpolate import CubicHermiteSpline, PchipInterpolator
+
+        rng = np.random.default_rng(0)
+        x = np.sort(rng.uniform(0, 10, 12))
+        r = rng.random(12)
+        t = np.linspace(x[0], x[-1], 10001)
+        np.testing.assert_allclose(pchip_relevance(np.c_[x, r])(t),
+                                   np.clip(PchipInterpolator(x, r)(t), 0, 1), atol=1e-12)
+
+        slopes = rng.normal(size=12)
+        np.testing.assert_allclose(pchip_relevance(np.c_[x, r, slopes])(t),
+                                   np.clip(CubicHermiteSpline(x, r, slopes)(t), 0, 1),
+                                   atol=1e-12)
+
+    def test_scalar_targets(self):
+        rel = pchip_relevance([[0.0, 1.0, 0.0], [1.0, 0.0, 0.0], [3.0, 1.0, 0.0]])
+        self.assertEqual(rel(3.0), 1.0)
+        self.assertEqual(rel(1), 0.0)
+        self.assertAlmostEqual(float(rel(2.0)), 0.5)
+        self.assertEqual(pchip_relevance([[0.0, 0.3]])(5.0), 0.3)
+
+    def test_constant_beyond_the_control_points(self):
+        rel = pchip_relevance([[0.0, 1.0, 0.0], [1.0, 0.0, 0.0], [3.0, 1.0, 0.0]])
+        self.assertTrue(is_vectorized(rel))
+        np.testing.assert_array_equal(rel(np.array([-5.0, 0.0, 1.0, 3.0, 50.0])),
+                                      [1.0, 1.0, 0.0, 1.0, 1.0])
+        with self.assertRaises(ValueError):
+            pchip_relevance([[1.0, 0.0], [0.0, 1.0]])
+        with self.assertRaises(ValueError):
+            pchip_relevance([[0.0, 2.0], [1.0, 1.0]])
+
+    def test_medcouple_of_symmetric_and_skewed_data(self):
+        self.assertEqual(_medcouple(np.arange(-50.0, 51.0)), 0.0)
+        # The medcouple of the exponential distribution is 1/3
+        y = np.sort(np.random.default_rng(1).exponential(size=2001))
+        self.assertAlmostEqual(_medcouple(y), 1 / 3, delta=0.05)
+
+    def test_medcouple_matches_the_full_kernel(self):
+        rng = np.random.default_rng(7)
+        for values in (rng.normal(size=301), rng.normal(size=40),
+                       rng.integers(0, 4, size=200).astype(float), np.zeros(5)):
+            values = np.sort(values)
+            z = values - np.median(values)
+            upper, lower = z[z >= 0][:, None], z[z <= 0]
+            with np.errstate(invalid="ignore"):
+                kernel = (upper + lower) / (upper - lower)
+            # Ties at the median get -1, 0 or 1 by their ranks
+            n_ties = int(np.count_nonzero(lower == 0))
+            i, j = np.indices((n_ties, n_ties))
+            kernel[:n_ties, len(lower) - n_ties:] = np.sign(i + j - (n_ties - 1))
+            self.assertAlmostEqual(_medcouple(values), np.median(kernel), places=12)
+
+    def test_boxplot_control_points(self):
+        y = np.random.default_rng(2).lognormal(size=5000)
+        points = boxplot_control_points(y)
+        np.testing.assert_array_equal(points[:, 1:], [[1, 0], [0, 0], [1, 0]])
+        self.assertEqual(points[1, 0], np.median(y))
+        self.assertTrue(points[0, 0] >= y.min() and points[2, 0] < y.max())
+
+        high = boxplot_control_points(y, extremes="high")
+        np.testing.assert_array_equal(high, points[1:])
+
+    def test_medcouple_of_a_large_target_uses_a_random_sample(self):
+        y = np.sort(np.random.default_rng(5).normal(size=100_000))
+        with mock.patch.object(relevance, "_medcouple", wraps=_medcouple) as medcouple:
+            boxplot_control_points(y)
+        sample = medcouple.call_args[0][0]
+        self.assertEqual(len(sample), relevance._SKETCH_SIZE)
+        self.assertAlmostEqual(_medcouple(sample), 0.0, delta=0.05)
+
+    def test_pchip_rel_func_in_a_resampler(self):
+        rng = np.random.default_rng(3)
+        df = pd.DataFrame({"x": rng.normal(size=1000), "y": rng.lognormal(size=1000)})
+        ro = pir.RandomOversampling(df=df, rel_func="pchip", threshold=0.8,
+                                    categorical_columns=[], random_state=0)
+        rare = df["y"].values[ro.order[np.concatenate([np.arange(a, b) for a, b in ro.rare_bins])]]
+        q1, q3 = np.quantile(df["y"], [0.25, 0.75])
+        self.assertGreater(len(rare), 0)
+        self.assertTrue(((rare < q1) | (rare > q3)).all())
+
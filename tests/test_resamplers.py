@@ -1,12 +1,18 @@
 """Unit tests for resampling methods: RO, RU, GN, WERCS, GNHF."""
 
+import os
+import shutil
+import tempfile
 import unittest
+from unittest import mock
 
 import numpy as np
 import pandas as pd
 
 import PyImbalReg as pir
 
+from .conftest import make_imbalanced_df
+
 
 class TestRandomOversampling(unittest.TestCase):
     """RandomOversampling.get() returns DataFrame with expected properties."""
@@ -67,6 +73,20 @@ class TestRandomOversampling(unittest.TestCase):
         out2 = ro2.get()
         pd.testing.assert_frame_equal(out1, out2)
 
+    def test_string_column_not_declared_categorical(self):
+        # Copies of rows need no std, so any column dtype is kept as it is
+        df = make_imbalanced_df(200, 10, seed=4, categories={"s": ["a", "b", "c"]})
+        ro = pir.RandomOversampling(df=df, rel_func="default", threshold=0.7,
+                                    categorical_columns=[], random_state=0)
+        result = ro.get()
+        self.assertGreater(len(result), len(df))
+        self.assertIsNone(ro.state.rare_bins_std)
+
+        with self.assertWarns(UserWarning):
+            gn = pir.GaussianNoise(df=df, rel_func="default", threshold=0.7, random_state=0)
+        self.assertEqual(gn.categorical_columns, ["s"])
+        self.assertEqual(set(gn.get()["s"]), {"a", "b", "c"})
+
 
 class TestRandomUndersampling(unittest.TestCase):
     """RandomUndersampling.get() returns DataFrame with expected properties."""
@@ -124,6 +144,21 @@ class TestRandomUndersampling(unittest.TestCase):
 class TestGaussianNoise(unittest.TestCase):
     """GaussianNoise.get() returns DataFrame with expected properties."""
 
+    @staticmethod
+    def _noisy_points(df, y_col_name, categorical_columns, o_percentage, perm_amp):
+        # The noisy points of one bin holding every row, built into a table
+        gn = pir.GaussianNoise(df=df, y_col_name=y_col_name, rel_func="default",
+                               categorical_columns=categorical_columns)
+        codes, categories = gn.get_categorical_codes()
+        numeric_columns = [col for col in gn.columns if col not in categorical_columns]
+        noisy = pir.GaussianNoise._noisy_bin(
+            np.arange(len(df)), df[numeric_columns].std().to_numpy(), codes,
+            np.array([len(cats) for cats in categories.values()]), o_percentage, perm_amp,
+            np.float64, np.random.default_rng(0))
+        result = pir.ResampleResult.from_segments(
+            gn.state, [(pir.ResampleResult.NOISY,) + noisy], noisy=True)
+        return result.to_pandas()
+
     def test_get_returns_dataframe(self):
         # Need enough points so at least one "rare" bin exists for GN oversampling
         df = pd.DataFrame({
@@ -144,6 +179,21 @@ class TestGaussianNoise(unittest.TestCase):
         self.assertIsInstance(result, pd.DataFrame)
         self.assertEqual(list(result.columns), ["x", "y"])
 
+    def test_rare_rows_are_kept_once(self):
+        df = make_imbalanced_df(seed=6)
+        gn = pir.GaussianNoise(df=df, rel_func="default", threshold=0.7, o_percentage=3,
+                               u_percentage=0.5, categorical_columns=[], random_state=0)
+        result = gn.get()
+
+        # Undersampled normal rows, then every rare row once plus its noisy points
+        n_normal = np.diff(gn.normal_bins, axis=1).ravel()
+        n_rare = np.diff(gn.rare_bins, axis=1).ravel()
+        expected = sum(round(0.5 * n) for n in n_normal) + 3 * n_rare.sum()
+        self.assertEqual(len(result), expected)
+
+        original = result[result.index.get_level_values("origin") == pir.ResampleResult.ORIGINAL]
+        self.assertTrue(original.index.is_unique)
+
     def test_reproducibility_with_random_state(self):
         df = pd.DataFrame({
             "x": np.random.randn(30),
@@ -171,6 +221,60 @@ class TestGaussianNoise(unittest.TestCase):
         )
         pd.testing.assert_frame_equal(gn1.get(), gn2.get())
 
+    def test_noisy_points_are_a_numeric_block(self):
+        rng = np.random.default_rng(2)
+        df = pd.DataFrame(rng.normal(size=(40, 50)),
+                          columns=[f"c{i}" for i in range(50)])
+        df["cat"] = rng.choice(["a", "b"], size=40)
+        new_df = self._noisy_points(df, "c49", ["cat"], 3, 0.1)
+        self.assertEqual(new_df.shape, (80, 51))
+        self.assertEqual(list(new_df.columns), list(df.columns[:49]) + ["cat", "c49"])
+        np.testing.assert_array_equal(new_df.index.get_level_values("origin"),
+                                      pir.ResampleResult.NOISY)
+        self.assertTrue((new_df.drop(columns="cat").dtypes == np.float64).all())
+        self.assertIsInstance(new_df["cat"].dtype, pd.CategoricalDtype)
+        self.assertTrue(set(new_df["cat"]) <= {"a", "b"})
+
+    def test_noise_is_scaled_by_column_std(self):
+        rng = np.random.default_rng(3)
+        df = pd.DataFrame({
+            "small": rng.normal(0, 0.01, 500),
+            "large": rng.normal(0, 100, 500),
+        })
+        new_df = self._noisy_points(df, "large", [], 11, 0.1)
+        ratio = new_df["large"].std() / new_df["small"].std()
+        self.assertGreater(ratio, 1e3)
+
+    def test_categorical_codes_follow_bin_frequencies(self):
+        codes = np.column_stack([
+            np.repeat([0, 1, 2], [700, 300, 0]),
+            np.repeat([0, 1], [100, 900]),
+        ])
+        sampled = pir.GaussianNoise._sample_categorical_codes(
+            codes, np.array([3, 2]), 20000, np.random.default_rng(0)
+        )
+        freq0 = np.bincount(sampled[:, 0], minlength=3) / 20000
+        freq1 = np.bincount(sampled[:, 1], minlength=2) / 20000
+        np.testing.assert_allclose(freq0, [0.7, 0.3, 0.0], atol=0.02)
+        np.testing.assert_allclose(freq1, [0.1, 0.9], atol=0.02)
+
+    def test_output_keeps_categorical_dtype(self):
+        df = pd.DataFrame({
+            "a": np.random.randn(40),
+            "cat": np.random.choice(["X", "Y", "Z"], size=40),
+            "y": np.concatenate([np.random.randn(34), np.arange(6) + 9.0]),
+        })
+        gn = pir.GaussianNoise(
+            df=df,
+            rel_func="default",
+            threshold=0.7,
+            categorical_columns=["cat"],
+            random_state=0,
+        )
+        result = gn.get()
+        self.assertIsInstance(result["cat"].dtype, pd.CategoricalDtype)
+        self.assertEqual(set(result["cat"].cat.categories), set(df["cat"]))
+
 
 class TestWERCS(unittest.TestCase):
     """WERCS.get() returns combined DataFrame."""
@@ -244,6 +348,19 @@ class TestGNHF(unittest.TestCase):
         self.assertIsInstance(result, pd.DataFrame)
         self.assertEqual(list(result.columns), ["x", "y"])
 
+    def test_categorical_columns_are_sampled_from_codes(self):
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({
+            "a": rng.normal(size=300),
+            "cat": rng.choice(["X", "Y", "Z"], size=300),
+            "y": rng.uniform(0, 3, 300),
+        })
+        gnhf = pir.GNHF(df=df, bins=3, categorical_columns=["cat"], random_state=0)
+        result = gnhf.get()
+        self.assertIsInstance(result["cat"].dtype, pd.CategoricalDtype)
+        self.assertEqual(set(result["cat"]), {"X", "Y", "Z"})
+        self.assertEqual(gnhf.categorical_codes.shape, (300, 1))
+
     def test_raises_when_bin_has_zero_or_one_sample(self):
         # Very few points and many bins -> some bins empty or single
         df = pd.DataFrame({
@@ -260,3 +377,628 @@ class TestGNHF(unittest.TestCase):
         )
         with self.assertRaises(ValueError):
             gnhf.get()
+
+    def test_bin_layout_and_std_are_kept_on_the_state(self):
+        rng = np.random.default_rng(5)
+        df = pd.DataFrame({
+            "a": rng.integers(0, 10, size=300),
+            "cat": rng.choice(["X", "Y"], size=300),
+            "y": rng.uniform(0, 3, 300),
+        })
+        profiler = pir.Profiler()
+        gnhf = pir.GNHF(df=df, bins=3, categorical_columns=["cat"], profiler=profiler,
+                        random_state=0)
+        gnhf.get()
+        n_records = len(profiler.records)
+        gnhf.get()
+        stages = [record["stage"] for record in profiler.records[n_records:]]
+        self.assertNotIn("bins", stages)
+        self.assertNotIn("bin_std", stages)
+
+        bins, positions, std = gnhf.state.histogram_bins
+        self.assertEqual(bins, 3)
+        for bin_positions, bin_std in zip(positions, std):
+            expected = df.iloc[bin_positions][["a", "y"]].to_numpy(dtype=float).std(axis=0, ddof=1)
+            np.testing.assert_allclose(bin_std, expected)
+
+    def test_rows_on_interior_edges_are_in_one_bin(self):
+        rng = np.random.default_rng(4)
+        # Bins of width 1 over [0, 4]: every integer target sits on an edge
+        df = pd.DataFrame({
+            "x": rng.normal(size=200),
+            "y": rng.integers(0, 5, size=200).astype(float),
+        })
+        result = pir.GNHF(df=df, bins=4, categorical_columns=[], random_state=0).get(lazy=True)
+        original = result.positions[result.kind == pir.ResampleResult.ORIGINAL]
+        self.assertEqual(len(original), len(np.unique(original)))
+
+        # Bins whose count is at most the mean keep all their rows
+        freqs, edges = np.histogram(df["y"], bins=4)
+        bin_ids = np.clip(np.searchsorted(edges, df["y"], side="right") - 1, 0, 3)
+        kept = np.isin(bin_ids, np.flatnonzero(freqs <= freqs.mean()))
+        self.assertTrue(set(np.flatnonzero(kept)) <= set(original))
+        self.assertEqual(len(original) - kept.sum(),
+                         sum(round(freqs.mean() / f * f) for f in freqs if f > freqs.mean()))
+
+
+class TestFittedState(unittest.TestCase):
+    """A fitted state is shared between resamplers and reused across get()."""
+
+    def setUp(self):
+        self.df = make_imbalanced_df(60, 6, seed=5)
+
+    def test_state_is_shared_without_refitting(self):
+        gn = pir.GaussianNoise(
+            df=self.df,
+            rel_func="default",
+            threshold=0.7,
+            categorical_columns=[],
+            random_state=1,
+        )
+        ro = pir.RandomOversampling(state=gn.state, o_percentage=3, random_state=1)
+        self.assertIs(ro.state, gn.state)
+        self.assertIs(ro.df, gn.df)
+        self.assertIs(ro.rare_bins, gn.rare_bins)
+        self.assertIsInstance(ro.get(), pd.DataFrame)
+
+    def test_state_gives_same_result_as_fitting(self):
+        ro1 = pir.RandomOversampling(
+            df=self.df.copy(),
+            rel_func="default",
+            threshold=0.7,
+            o_percentage=3,
+            categorical_columns=[],
+            random_state=4,
+        )
+        ro2 = pir.RandomOversampling(state=ro1.state, o_percentage=3, random_state=4)
+        pd.testing.assert_frame_equal(ro1.get(), ro2.get())
+
+    def test_repeated_get_with_new_settings(self):
+        gn = pir.GaussianNoise(
+            df=self.df,
+            rel_func="default",
+            threshold=0.7,
+            o_percentage=2,
+            categorical_columns=[],
+            random_state=1,
+        )
+        first = gn.get()
+        gn.set_o_percentage(4)
+        gn.set_random_state(2)
+        second = gn.get()
+        self.assertGreater(len(second), len(first))
+
+    def test_rejects_invalid_state(self):
+        with self.assertRaises(TypeError):
+            pir.RandomOversampling(state={"df": self.df})
+
+    def test_output_settings_come_from_the_state(self):
+        ro = pir.RandomOversampling(df=self.df, rel_func="default", threshold=0.7,
+                                    categorical_columns=[], dtype_policy="float32")
+        gn = pir.GaussianNoise(state=ro.state, random_state=1)
+        self.assertEqual(gn.dtype_policy, "float32")
+        self.assertEqual(gn.get()["x"].dtype, np.float32)
+        with self.assertRaises(ValueError):
+            pir.GaussianNoise(state=ro.state, dtype_policy="preserve")
+        with self.assertRaises(ValueError):
+            pir.GaussianNoise(state=ro.state, dense_columns=[0])
+
+
+class TestBinLayout(unittest.TestCase):
+    """Rare and normal bins are (start, stop) runs of the rare mask."""
+
+    def test_find_bins_runs(self):
+        is_rare = np.array([1, 1, 0, 0, 0, 1, 0, 1, 1], dtype=bool)
+        rare, normal = pir.DataHandler._find_bins(is_rare)
+        self.assertEqual(rare.dtype, np.int64)
+        np.testing.assert_array_equal(rare, [[0, 2], [5, 6], [7, 9]])
+        np.testing.assert_array_equal(normal, [[2, 5], [6, 7]])
+
+    def test_find_bins_empty(self):
+        rare, normal = pir.DataHandler._find_bins(np.array([], dtype=bool))
+        self.assertEqual(rare.shape, (0, 2))
+        self.assertEqual(normal.shape, (0, 2))
+
+    def test_bins_cover_all_rows(self):
+        df = pd.DataFrame({
+            "x": np.arange(40, dtype=float),
+            "y": np.concatenate([[-9.0, -8.0], np.zeros(34), [7.0, 8.0, 9.0, 10.0]]),
+        })
+        ro = pir.RandomOversampling(
+            df=df,
+            rel_func="default",
+            threshold=0.7,
+            categorical_columns=[],
+        )
+        self.assertEqual(len(ro.rare_bins), 2)
+        lengths = np.diff(np.vstack([ro.rare_bins, ro.normal_bins]), axis=1)
+        self.assertEqual(lengths.sum(), len(df))
+
+
+class TestInputIsNotModified(unittest.TestCase):
+    """The caller's DataFrame is neither changed nor copied to be sorted."""
+
+    def setUp(self):
+        # Y is the first column, so it has to be moved to the end of the output
+        self.df = make_imbalanced_df(200, 10, seed=11, features=("x1", "x2"))[["y", "x1", "x2"]]
+        self.df.index = np.random.default_rng(11).permutation(200) + 1000
+        self.original = self.df.copy()
+
+    def test_resamplers_leave_input_unchanged(self):
+        params = dict(
+            df=self.df,
+            y_col_name="y",
+            rel_func="default",
+            threshold=0.7,
+            categorical_columns=[],
+            random_state=0,
+        )
+        for cls in (pir.RandomOversampling, pir.RandomUndersampling,
+                    pir.GaussianNoise, pir.WERCS):
+            result = cls(**params).get()
+            self.assertEqual(list(result.columns), ["x1", "x2", "y"])
+            pd.testing.assert_frame_equal(self.df, self.original)
+
+        pir.GNHF(df=self.df, y_col_name="y", bins=3,
+                 categorical_columns=[], random_state=0).get()
+        pd.testing.assert_frame_equal(self.df, self.original)
+
+    def test_handler_keeps_reference_to_input(self):
+        ro = pir.RandomOversampling(
+            df=self.df,
+            y_col_name="y",
+            rel_func="default",
+            threshold=0.7,
+            categorical_columns=[],
+        )
+        self.assertIs(ro.df, self.df)
+        self.assertTrue(np.all(np.diff(self.df["y"].values[ro.order]) >= 0))
+
+    def test_fitting_does_not_copy_the_frame(self):
+        import tracemalloc
+
+        n = 100_000
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame(rng.normal(size=(n, 20)),
+                          columns=[f"x{i}" for i in range(20)])
+        df.insert(0, "y", rng.normal(size=n))
+
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        pir.RandomOversampling(
+            df=df,
+            y_col_name="y",
+            rel_func="default",
+            threshold=0.9,
+            categorical_columns=[],
+        )
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # A single copy of the frame would be df.memory_usage().sum() bytes
+        self.assertLess(peak, 0.5 * df.memory_usage().sum())
+
+
+class TestRandomGenerators(unittest.TestCase):
+    """Each resampler owns its generator; child streams are independent."""
+
+    def setUp(self):
+        self.df = make_imbalanced_df(80, 8, seed=8)
+        self.params = dict(
+            df=self.df,
+            rel_func="default",
+            threshold=0.7,
+            o_percentage=3,
+            categorical_columns=[],
+        )
+
+    def test_global_random_state_is_not_touched(self):
+        np.random.seed(0)
+        expected = np.random.random_sample(3)
+        np.random.seed(0)
+        pir.GaussianNoise(random_state=5, **self.params).get()
+        np.testing.assert_array_equal(np.random.random_sample(3), expected)
+
+    def test_accepts_seed_sequence_and_generator(self):
+        out1 = pir.RandomOversampling(
+            random_state=np.random.SeedSequence(3), **self.params).get()
+        out2 = pir.RandomOversampling(random_state=3, **self.params).get()
+        pd.testing.assert_frame_equal(out1, out2)
+
+        ro = pir.RandomOversampling(
+            random_state=np.random.default_rng(3), **self.params)
+        self.assertIsInstance(ro.get(), pd.DataFrame)
+
+    def test_spawned_children_are_reproducible_and_independent(self):
+        gn = pir.GaussianNoise(random_state=11, **self.params)
+        children = gn.spawn(3)
+        outputs = [child.get() for child in children]
+        self.assertTrue(all(child.state is gn.state for child in children))
+        self.assertFalse(outputs[0].equals(outputs[1]))
+
+        again = pir.GaussianNoise(random_state=11, **self.params).spawn(3)
+        for out, child in zip(outputs, again):
+            pd.testing.assert_frame_equal(out, child.get())
+
+    def test_thread_pool_matches_sequential_run(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        gn = pir.GaussianNoise(random_state=2, **self.params)
+        sequential = [child.get() for child in gn.spawn(8)]
+
+        gn = pir.GaussianNoise(random_state=2, **self.params)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            threaded = list(executor.map(lambda child: child.get(), gn.spawn(8)))
+
+        for out1, out2 in zip(sequential, threaded):
+            pd.testing.assert_frame_equal(out1, out2)
+
+    def test_spawn_generators(self):
+        ro = pir.RandomOversampling(random_state=4, **self.params)
+        first = [g.random() for g in ro.spawn_generators(2)]
+        self.assertNotEqual(first[0], first[1])
+        ro = pir.RandomOversampling(random_state=4, **self.params)
+        self.assertEqual(first, [g.random() for g in ro.spawn_generators(2)])
+
+
+class TestParallelBins(unittest.TestCase):
+    """Bins resampled on a worker pool give the same output as sequentially."""
+
+    def setUp(self):
+        rng = np.random.default_rng(21)
+        y = np.concatenate([
+            rng.normal(size=150), [-7.0, -6.5], [5.0, 5.5, 6.0], [9.0, 9.5, 10.0],
+        ])
+        self.df = pd.DataFrame({
+            "x": rng.normal(size=len(y)),
+            "cat": rng.choice(["a", "b"], size=len(y)),
+            "y": y,
+        })
+
+    def _run(self, cls, **params):
+        return cls(df=self.df, categorical_columns=["cat"], random_state=6, **params).get()
+
+    def test_output_does_not_depend_on_workers(self):
+        cases = [
+            (pir.RandomOversampling, dict(rel_func="default", threshold=0.8)),
+            (pir.RandomUndersampling, dict(rel_func="default", threshold=0.8)),
+            (pir.GaussianNoise, dict(rel_func="default", threshold=0.8)),
+            (pir.GNHF, dict(bins=4)),
+        ]
+        for cls, params in cases:
+            expected = self._run(cls, **params)
+            for n_jobs, executor in [(2, "thread"), (4, "thread"), (2, "process")]:
+                result = self._run(cls, n_jobs=n_jobs, executor=executor, **params)
+                pd.testing.assert_frame_equal(result, expected)
+
+    def test_accepts_executor_instance(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        expected = self._run(pir.GaussianNoise, rel_func="default", threshold=0.8)
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            result = self._run(pir.GaussianNoise, rel_func="default", threshold=0.8,
+                               n_jobs=3, executor=executor)
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_rejects_invalid_n_jobs_and_executor(self):
+        with self.assertRaises(ValueError):
+            self._run(pir.RandomOversampling, rel_func="default", n_jobs=0)
+        with self.assertRaises(ValueError):
+            self._run(pir.RandomOversampling, rel_func="default", n_jobs=2.0)
+        with self.assertRaises(ValueError):
+            self._run(pir.RandomOversampling, rel_func="default", executor="gpu")
+
+
+class TestLazyResult(unittest.TestCase):
+    """get(lazy=True) returns row positions that build the same DataFrame."""
+
+    def setUp(self):
+        self.df = make_imbalanced_df(600, 40, seed=8, features=("a",),
+                                     categories={"c": ["x", "y", "z"]})[["y", "a", "c"]]
+        self.cases = [
+            (pir.RandomOversampling, dict(rel_func="default", threshold=0.7)),
+            (pir.RandomUndersampling, dict(rel_func="default", threshold=0.7)),
+            (pir.GaussianNoise, dict(rel_func="default", threshold=0.7)),
+            (pir.WERCS, dict(rel_func="default", threshold=0.7)),
+            (pir.GNHF, dict(bins=4)),
+        ]
+
+    def _get(self, cls, lazy, **params):
+        return cls(df=self.df, y_col_name="y", categorical_columns=["c"],
+                   random_state=1, **params).get(lazy=lazy)
+
+    def test_lazy_builds_the_eager_output(self):
+        for cls, params in self.cases:
+            result = self._get(cls, True, **params)
+            self.assertIsInstance(result, pir.ResampleResult)
+            expected = self._get(cls, False, **params)
+            self.assertEqual(len(result), len(expected))
+            pd.testing.assert_frame_equal(result.to_pandas(), expected)
+
+    def test_slices_build_the_same_rows(self):
+        for cls, params in self.cases:
+            result = self._get(cls, True, **params)
+            expected = result.to_pandas()
+            for start, stop in [(0, 10), (37, 401), (len(result) - 5, len(result) + 5)]:
+                # A slice of original rows only keeps the integer index dtype
+                pd.testing.assert_frame_equal(result[start:stop].to_pandas(),
+                                              expected.iloc[start:stop],
+                                              check_index_type=False)
+
+    def test_positions_and_noise(self):
+        gn = pir.GaussianNoise(df=self.df, y_col_name="y", rel_func="default",
+                               threshold=0.7, categorical_columns=["c"], random_state=1)
+        result = gn.get(lazy=True)
+        self.assertEqual(result.positions.dtype, np.int64)
+        noisy = result.kind == pir.ResampleResult.NOISY
+        self.assertEqual(len(result.noise), noisy.sum())
+        self.assertEqual(result.noise.shape[1], 2)
+        # The noisy rows are drawn from the rare rows only
+        rare = np.concatenate([gn.order[start:stop] for start, stop in gn.rare_bins])
+        self.assertTrue(np.isin(result.synthetic_positions, rare).all())
+
+        ro = self._get(pir.RandomOversampling, True, rel_func="default", threshold=0.7)
+        self.assertIsNone(ro.noise)
+        self.assertTrue(set(ro.kind) <= {pir.ResampleResult.ORIGINAL,
+                                         pir.ResampleResult.OVERSAMPLED})
+
+    def test_to_numpy_and_arrow(self):
+        result = self._get(pir.RandomOversampling, True, rel_func="default", threshold=0.7)
+        self.assertEqual(result.to_numpy().shape, (len(result), 3))
+        self.assertEqual(result.to_arrow().num_rows, len(result))
+
+
+class TestProvenanceIndex(unittest.TestCase):
+    """The output is indexed by (origin, source_position) unless string labels are asked for."""
+
+    def setUp(self):
+        self.df = make_imbalanced_df(seed=9, features=("a",))
+        self.df.index = np.random.default_rng(9).permutation(len(self.df)) + 1000
+
+    def test_positions_point_at_the_source_rows(self):
+        for cls in (pir.RandomOversampling, pir.WERCS):
+            result = cls(df=self.df, rel_func="default", threshold=0.7,
+                         random_state=2).get()
+            self.assertEqual(result.index.names, ["origin", "source_position"])
+            self.assertEqual(result.index.codes[0].dtype, np.int8)
+            positions = result.index.get_level_values("source_position")
+            np.testing.assert_array_equal(result.values, self.df.values[positions])
+
+    def test_noisy_rows_keep_their_origin(self):
+        result = pir.GaussianNoise(df=self.df, rel_func="default", threshold=0.7,
+                                   categorical_columns=[], random_state=2).get()
+        origin = result.index.get_level_values("origin")
+        self.assertGreater((origin == pir.ResampleResult.NOISY).sum(), 0)
+        self.assertTrue(set(origin) <= {pir.ResampleResult.ORIGINAL,
+                                        pir.ResampleResult.NOISY})
+
+    def test_string_labels_are_opt_in(self):
+        result = pir.RandomOversampling(df=self.df, rel_func="default", threshold=0.7,
+                                        index_labels="string", random_state=2).get()
+        labels = result.index.astype(str)
+        self.assertGreater(labels.str.startswith("OverSampled-").sum(), 0)
+        self.assertTrue(set(self.df.index) <= set(result.index))
+        with self.assertRaises(ValueError):
+            pir.RandomOversampling(df=self.df, rel_func="default", index_labels="labels")
+
+
+class TestSmoteR(unittest.TestCase):
+    """SmoteR interpolates new rare cases between neighbours of the same bin."""
+
+    def setUp(self):
+        rng = np.random.default_rng(10)
+        n = 1500
+        self.df = pd.DataFrame({
+            "a": rng.normal(size=n),
+            "b": rng.uniform(0, 100, size=n),
+            "cat": rng.choice(["x", "y"], size=n),
+        })
+        self.df["y"] = 2 * self.df["a"] + rng.normal(scale=0.1, size=n)
+        self.params = dict(df=self.df, rel_func="default", threshold=0.8,
+                           categorical_columns=["cat"], o_percentage=3, u_percentage=0.5)
+
+    def test_new_cases_stay_inside_their_bin(self):
+        smoter = pir.SmoteR(random_state=0, **self.params)
+        result = smoter.get()
+        origin = result.index.get_level_values("origin")
+        new = result[origin == pir.ResampleResult.INTERPOLATED]
+
+        n_rare = int(np.diff(smoter.rare_bins, axis=1).sum())
+        n_normal = int(np.diff(smoter.normal_bins, axis=1).sum())
+        self.assertEqual(len(new), 2 * n_rare)
+        self.assertEqual(len(result), 3 * n_rare + round(0.5 * n_normal))
+
+        # Every new case lies within the bounding box of its bin
+        sources = new.index.get_level_values("source_position")
+        for start, stop in smoter.rare_bins:
+            bin_df = self.df.iloc[smoter.order[start:stop]]
+            in_bin = np.isin(sources, smoter.order[start:stop])
+            for col in ("a", "b", "y"):
+                values = new[col].values[in_bin]
+                self.assertTrue((values >= bin_df[col].min() - 1e-9).all())
+                self.assertTrue((values <= bin_df[col].max() + 1e-9).all())
+        self.assertTrue(set(new["cat"]) <= {"x", "y"})
+
+    def test_target_follows_the_interpolation(self):
+        result = pir.SmoteR(random_state=1, **self.params).get()
+        new = result[result.index.get_level_values("origin") == pir.ResampleResult.INTERPOLATED]
+        # y is linear in a, so interpolated cases keep the relation
+        np.testing.assert_allclose(new["y"], 2 * new["a"], atol=0.5)
+
+    def test_reproducible_and_independent_of_workers(self):
+        expected = pir.SmoteR(random_state=2, **self.params).get()
+        result = pir.SmoteR(random_state=2, n_jobs=2, **self.params).get()
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_feature_scale_is_kept_on_the_state(self):
+        smoter = pir.SmoteR(random_state=3, **self.params)
+        self.assertIsNone(smoter.state.feature_scale)
+        smoter.get()
+        np.testing.assert_allclose(smoter.state.feature_scale, np.ptp(self.df[["a", "b"]], axis=0))
+        child = pir.SMOGN(state=smoter.state, random_state=3)
+        self.assertIs(child.get_feature_scale(), smoter.state.feature_scale)
+
+    def test_small_bins_and_invalid_k(self):
+        seeds, offsets, codes = pir.SmoteR._interpolate_bin(
+            np.ones((1, 3)), np.zeros((1, 0), dtype=np.int64),
+            np.zeros((1, 0), dtype=np.int64), 4, np.random.default_rng(0))
+        self.assertEqual(len(seeds), 3)
+        self.assertFalse(offsets.any())
+        with self.assertRaises(ValueError):
+            pir.SmoteR(k=0, **self.params)
+
+
+class TestNeighborCache(unittest.TestCase):
+    """Neighbour graphs are stored once and opened memory-mapped afterwards."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.features = np.random.default_rng(0).normal(size=(300, 3))
+
+    def test_matches_a_brute_force_search(self):
+        distances, indices = pir.NeighborCache().get(self.features, 4)
+        pairwise = np.linalg.norm(self.features[:, None] - self.features[None], axis=2)
+        np.fill_diagonal(pairwise, np.inf)
+        np.testing.assert_array_equal(indices, np.argsort(pairwise, axis=1)[:, :4])
+        np.testing.assert_allclose(distances, np.sort(pairwise, axis=1)[:, :4])
+
+    def test_duplicate_rows_never_list_themselves(self):
+        features = np.repeat(self.features[:20], 6, axis=0)
+        distances, indices = pir.NeighborCache().get(features, 3)
+        self.assertFalse((indices == np.arange(len(features))[:, None]).any())
+        np.testing.assert_array_equal(distances, 0)
+        # The neighbours of a row are its own duplicates
+        self.assertTrue((indices // 6 == np.arange(len(features))[:, None] // 6).all())
+
+    def test_later_runs_load_memory_mapped_graphs(self):
+        _, expected = pir.NeighborCache(self.directory).get(self.features, 5)
+        with mock.patch.object(pir.NeighborCache, "find_neighbours") as find:
+            _, indices = pir.NeighborCache(self.directory).get(self.features, 3)
+        find.assert_not_called()
+        self.assertIsInstance(indices.base, np.memmap)
+        np.testing.assert_array_equal(indices, expected[:, :3])
+
+    def test_threads_save_the_same_graph_at_once(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        cache = pir.NeighborCache(self.directory)
+        graph = pir.NeighborCache.find_neighbours(self.features, 4)
+        fingerprint = cache.fingerprint(self.features)
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(lambda _: cache._save(fingerprint, graph), range(32)))
+
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+        _, indices = cache._load(fingerprint, 4)
+        np.testing.assert_array_equal(indices, graph[1])
+
+    def test_smoter_output_does_not_depend_on_the_cache(self):
+        df = pd.DataFrame(np.random.default_rng(1).normal(size=(600, 3)), columns=list("abc"))
+        params = dict(df=df, y_col_name="c", rel_func="default", threshold=0.7,
+                      categorical_columns=[], random_state=4)
+        expected = pir.SmoteR(**params).get()
+        pir.SmoteR(neighbor_cache=self.directory, **params).get()
+        result = pir.SmoteR(neighbor_cache=self.directory, **params).get()
+        pd.testing.assert_frame_equal(result, expected)
+        self.assertTrue(os.listdir(self.directory))
+        with self.assertRaises(TypeError):
+            pir.SmoteR(neighbor_cache=3, **params)
+
+
+class TestSMOGN(unittest.TestCase):
+    """SMOGN interpolates with close neighbours and adds noise otherwise."""
+
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        n = 1500
+        self.df = pd.DataFrame({
+            "a": rng.normal(size=n),
+            "b": rng.uniform(0, 100, size=n),
+            "cat": rng.choice(["x", "y"], size=n),
+        })
+        self.df["y"] = 2 * self.df["a"] + rng.normal(scale=0.1, size=n)
+        self.params = dict(df=self.df, rel_func="default", threshold=0.8,
+                           categorical_columns=["cat"], o_percentage=3, u_percentage=0.5)
+
+    def test_mixes_interpolated_and_noisy_cases(self):
+        smogn = pir.SMOGN(random_state=0, **self.params)
+        result = smogn.get()
+        origin = result.index.get_level_values("origin")
+        n_interpolated = int((origin == pir.ResampleResult.INTERPOLATED).sum())
+        n_noisy = int((origin == pir.ResampleResult.NOISY).sum())
+
+        n_rare = int(np.diff(smogn.rare_bins, axis=1).sum())
+        self.assertGreater(n_interpolated, 0)
+        self.assertGreater(n_noisy, 0)
+        self.assertEqual(n_interpolated + n_noisy, 2 * n_rare)
+        self.assertTrue(set(result["cat"]) <= {"x", "y"})
+
+    def test_far_neighbours_give_noise_within_perm_amp(self):
+        values = np.arange(12, dtype=np.float64).reshape(4, 3)
+        # Every row has one neighbour at distance 1 and two at 100, so the ...
+        # ... safe distance is 50 and only the first neighbour is interpolated with
+        distances = np.tile([1.0, 100.0, 100.0], (4, 1))
+        neighbours = np.array([[1, 2, 3], [0, 2, 3], [3, 0, 1], [2, 0, 1]])
+        codes = np.zeros((4, 0), dtype=np.int64)
+        (close, offsets, _), (far, noise, _) = pir.SMOGN._smogn_bin(
+            values, (distances, neighbours), np.ones(3), codes, np.zeros(0, dtype=np.int64),
+            201, 0.01, np.random.default_rng(0))
+
+        self.assertEqual(len(close) + len(far), 800)
+        self.assertAlmostEqual(len(close) / 800, 1 / 3, delta=0.06)
+        # Rows 0, 1 and 2, 3 are neighbours, 3 columns apart
+        self.assertTrue(np.all(np.abs(offsets) <= 3))
+        self.assertLess(np.abs(noise).max(), 0.01 * 6)
+
+    def test_reproducible_and_independent_of_workers(self):
+        expected = pir.SMOGN(random_state=2, **self.params).get()
+        result = pir.SMOGN(random_state=2, n_jobs=2, **self.params).get()
+        pd.testing.assert_frame_equal(result, expected)
+
+
+class TestDtypePolicy(unittest.TestCase):
+    """dtype_policy keeps the input dtypes or downcasts to float32."""
+
+    def setUp(self):
+        rng = np.random.default_rng(12)
+        n = 1000
+        self.df = pd.DataFrame({
+            "a": rng.normal(size=n).astype(np.float32),
+            "i": rng.integers(0, 1000, size=n).astype(np.int16),
+            "c": rng.choice(["x", "y"], size=n),
+            "y": rng.normal(size=n),
+        })
+        self.params = dict(df=self.df, rel_func="default", categorical_columns=["c"],
+                           random_state=0)
+
+    def test_preserve_keeps_the_input_dtypes(self):
+        for cls in (pir.GaussianNoise, pir.RandomOversampling):
+            result = cls(dtype_policy="preserve", **self.params).get()
+            self.assertEqual(result["a"].dtype, np.float32)
+            self.assertEqual(result["i"].dtype, np.int16)
+            self.assertEqual(result["y"].dtype, np.float64)
+            self.assertIsInstance(result["c"].dtype, pd.CategoricalDtype)
+
+    def test_float32_generates_the_noise_in_float32(self):
+        gn = pir.GaussianNoise(dtype_policy="float32", **self.params)
+        lazy = gn.get(lazy=True)
+        self.assertEqual(lazy.noise.dtype, np.float32)
+
+        result = lazy.to_pandas()
+        self.assertEqual(set(result.dtypes.drop(["c", "i"])), {np.dtype(np.float32)})
+        self.assertEqual(result["i"].dtype, np.int16)
+        self.assertEqual(list(result["c"].cat.categories), list(gn.categories["c"]))
+
+    def test_float32_keeps_large_integers(self):
+        df = self.df.assign(id=2**40 + np.arange(len(self.df)))
+        result = pir.RandomOversampling(dtype_policy="float32",
+                                        **dict(self.params, df=df)).get()
+        self.assertEqual(result["id"].dtype, np.int64)
+        sources = result.index.get_level_values("source_position")
+        np.testing.assert_array_equal(result["id"].to_numpy(), df["id"].to_numpy()[sources])
+
+    def test_default_and_invalid_policy(self):
+        result = pir.GaussianNoise(**self.params).get()
+        self.assertEqual(result["a"].dtype, np.float64)
+        with self.assertRaises(ValueError):
+            pir.GaussianNoise(dtype_policy="float16", **self.params)
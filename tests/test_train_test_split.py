@@ -40,13 +40,28 @@ class TestTrainTestSplit(unittest.TestCase):
             bins=10,
             random_state=1,
         )
-        # Stratified split: train and test are disjoint; union may not equal df
-        # because histogram edges can exclude boundary points
-        combined = pd.concat([train, test])
-        self.assertEqual(len(combined), len(train) + len(test))
+        # Every row, including the ones on bin edges, is in exactly one split
+        combined = pd.concat([train, test]).sort_index()
+        pd.testing.assert_frame_equal(combined, df)
         self.assertGreater(len(train), 0)
         self.assertGreater(len(test), 0)
 
+    def test_each_bin_is_split_by_test_size(self):
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({
+            "x": rng.normal(size=1000),
+            "y": rng.integers(0, 8, size=1000).astype(float),
+        })
+        train, test = pir.train_test_split(df=df, test_size=0.3, bins=4,
+                                           return_indices=True)
+        self.assertEqual(train.dtype, np.int64)
+        np.testing.assert_array_equal(np.sort(np.concatenate([train, test])),
+                                      np.arange(len(df)))
+
+        counts, edges = np.histogram(df["y"], bins=4)
+        test_counts, _ = np.histogram(df["y"].values[test], bins=edges)
+        np.testing.assert_array_equal(test_counts, np.round(0.3 * counts))
+
     def test_reproducibility_with_random_state(self):
         df = pd.DataFrame({
             "x": np.random.randn(100),
@@ -97,3 +112,51 @@ class TestTrainTestSplit(unittest.TestCase):
                 bins=2,
                 random_state=1.5,
             )
+
+
+class TestStratifiedKFold(unittest.TestCase):
+    """StratifiedKFold yields position arrays for every fold of every repeat."""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame({
+            "x": rng.normal(size=503),
+            "y": rng.standard_t(3, size=503),
+        })
+
+    def test_folds_partition_the_rows(self):
+        splitter = pir.StratifiedKFold(n_splits=5, n_repeats=3, bins=6, random_state=1)
+        splits = list(splitter.split(self.df))
+        self.assertEqual(len(splits), splitter.get_n_splits())
+
+        for repeat in range(3):
+            tests = [test for _, test in splits[5 * repeat:5 * repeat + 5]]
+            np.testing.assert_array_equal(np.sort(np.concatenate(tests)),
+                                          np.arange(len(self.df)))
+        for train, test in splits:
+            self.assertEqual(len(np.intersect1d(train, test)), 0)
+            self.assertEqual(len(train) + len(test), len(self.df))
+
+    def test_every_bin_is_spread_evenly(self):
+        splitter = pir.StratifiedKFold(n_splits=4, bins=6, random_state=2)
+        counts, edges = np.histogram(self.df["y"], bins=6)
+        for _, test in splitter.split(self.df):
+            test_counts, _ = np.histogram(self.df["y"].values[test], bins=edges)
+            self.assertTrue((np.abs(test_counts - counts / 4) < 1).all())
+
+    def test_repeats_differ_and_are_reproducible(self):
+        first = list(pir.StratifiedKFold(n_splits=3, n_repeats=2, random_state=3)
+                     .split(self.df))
+        second = list(pir.StratifiedKFold(n_splits=3, n_repeats=2, random_state=3)
+                      .split(self.df))
+        for (train1, test1), (train2, test2) in zip(first, second):
+            np.testing.assert_array_equal(test1, test2)
+        self.assertFalse(np.array_equal(first[0][1], first[3][1]))
+
+    def test_rejects_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            pir.StratifiedKFold(n_splits=1)
+        with self.assertRaises(ValueError):
+            pir.StratifiedKFold(n_repeats=0)
+        with self.assertRaises(TypeError):
+            next(pir.StratifiedKFold().split(self.df.values))